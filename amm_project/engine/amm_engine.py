@@ -1,21 +1,46 @@
 import os
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Union, Tuple
-from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Union, Tuple, AsyncIterator
+from datetime import datetime, timedelta, timezone
 import uuid # For unique engine instance ID
 import json
 import logging # Add logging import
 import pathlib
+import random
+import time
+import asyncio
+import contextvars
+import functools
+import gzip
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 
 import google.generativeai as genai
 import lancedb
+from lancedb.index import HnswSq, IvfPq
 import sqlalchemy
 from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, desc
 from sqlalchemy.orm import declarative_base, sessionmaker, Session # For type hinting
 from dotenv import load_dotenv
 
-from amm_project.models.amm_models import AMMDesign, KnowledgeSourceType, KnowledgeSourceConfig, AdaptiveMemoryConfig, GeminiConfig, AgentPrompts, GeminiModelType
-from amm_project.models.memory_models import create_db_engine_and_tables, get_session_local, InteractionRecordORM, InteractionRecordPydantic, InteractionRecordUpdatePydantic # Added InteractionRecordUpdatePydantic
+try:
+    from google.api_core import exceptions as google_api_exceptions
+except ImportError:
+    google_api_exceptions = None
+
+from amm_project.models.amm_models import AMMDesign, KnowledgeSourceType, KnowledgeSourceConfig, AdaptiveMemoryConfig, GeminiConfig, AgentPrompts, GeminiModelType, VectorIndexType, AdaptiveMemoryStrategy, AdaptiveMemoryScope
+from amm_project.models.memory_models import ConversationSummaryPydantic, InteractionRecordPydantic, InteractionRecordUpdatePydantic # Added InteractionRecordUpdatePydantic
+from amm_project.engine.embedding_cache import EmbeddingCache, QueryEmbeddingCache, EMBEDDING_CACHE_FILENAME
+from amm_project.engine.interaction_index import InteractionVectorIndex, INTERACTION_INDEX_DIRNAME
+from amm_project.engine.interaction_writer import InteractionWriteBuffer
+from amm_project.engine.memory_store import InteractionStore, create_interaction_store
+from amm_project.engine.prompt_builder import estimate_tokens, pack_context
+from amm_project.engine.response_cache import ResponseCache
+from amm_project.engine.session_summary import build_summary_prompt, format_summary_text
+from amm_project.engine.knowledge_manifest import KnowledgeManifest, MANIFEST_FILENAME, fingerprints_match, hash_text
+from amm_project.utils.hashing import hash_file
 
 # Try to import PDF processor for PDF knowledge sources
 try:
@@ -26,6 +51,10 @@ except ImportError:
     PDF_PROCESSOR_AVAILABLE = False
 
 LANCEDB_TABLE_NAME = "fixed_knowledge_table"
+ADAPTIVE_MEMORY_ARCHIVE_DIRNAME = "adaptive_memory_archive"
+GENERATIVE_MODEL_POOL_SIZE = 4 # Configured GenerativeModel clients kept per engine (model name + generation config)
+BACKGROUND_WORKERS = 2 # Threads for deferred work (interaction indexing, session summaries); kept off the I/O executor
+
 
 class AMMEngine:
     """
@@ -58,13 +87,31 @@ class AMMEngine:
         self.ai_model_client = None
         self.lancedb_connection = None
         self.lancedb_table = None
-        self.adaptive_memory_engine = None
-        self.db_session_factory = None
+        self.memory_store: Optional[InteractionStore] = None # Adaptive memory backend (see adaptive_memory.backend)
+        self.interaction_index: Optional[InteractionVectorIndex] = None # Only for the 'relevant' adaptive memory strategy
+        self.interaction_writer: Optional[InteractionWriteBuffer] = None # Only if adaptive_memory.write_behind_enabled
 
         self.embedding_model_name: Optional[str] = None # For storing the configured embedding model
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        self.query_embedding_cache: Optional[QueryEmbeddingCache] = None
+        self.response_cache: Optional[ResponseCache] = None # Only if response_cache.enabled
+        self.pdf_processor = None
+        self.vector_index_type: Optional[str] = None # Set once an ANN index exists on the fixed knowledge table
+        self._io_executor: Optional[ThreadPoolExecutor] = None # Lazily created; runs retrieval stages and async-API blocking work
+        self._io_executor_lock = threading.Lock()
+        self._background_executor: Optional[ThreadPoolExecutor] = None # Lazily created; runs indexing and summarization
+        self._background_executor_lock = threading.Lock()
+        self._generative_models: "OrderedDict[tuple, Any]" = OrderedDict() # See _get_generative_model
+        self._generative_models_lock = threading.Lock()
+        self._retention_thread: Optional[threading.Thread] = None
+        self._retention_stop = threading.Event()
+        self._summarizing_sessions: set = set() # Sessions with a summary update in progress
+        self._summarizing_lock = threading.Lock()
 
         self._initialize_paths()
         self._initialize_gemini_client()
+        self._initialize_embedding_cache()
+        self._initialize_response_cache()
         
         print(f"DEBUG_INIT (Engine ID: {self.engine_instance_id}): About to call _initialize_fixed_knowledge.")
         self._initialize_fixed_knowledge()
@@ -155,6 +202,48 @@ class AMMEngine:
             print(f"DEBUG_GEMINI (Engine ID: {self.engine_instance_id}): Gemini API key from env var '{api_key_env_var}' not found. AI model client and embedding model set to None.")
         print(f"DEBUG_GEMINI (Engine ID: {self.engine_instance_id}): _initialize_gemini_client completed. AI Client is None: {self.ai_model_client is None}, Embedding model: {self.embedding_model_name}")
 
+    def _initialize_embedding_cache(self) -> None:
+        """Opens the persistent embedding cache in the instance data path and the in-process query embedding cache, if enabled in the design."""
+        embedding_config = self.design.embedding
+        if embedding_config.query_cache_enabled:
+            self.query_embedding_cache = QueryEmbeddingCache(
+                max_entries=embedding_config.query_cache_max_entries,
+                ttl_seconds=embedding_config.query_cache_ttl_seconds,
+                casefold=embedding_config.query_cache_casefold
+            )
+        else:
+            self.query_embedding_cache = None
+
+        if not embedding_config.cache_enabled or not self.instance_data_path:
+            print(f"DEBUG_EMBED_CACHE (Engine ID: {self.engine_instance_id}): Embedding cache disabled.")
+            self.embedding_cache = None
+            return
+
+        cache_path = self.instance_data_path / EMBEDDING_CACHE_FILENAME
+        try:
+            self.embedding_cache = EmbeddingCache(
+                cache_path,
+                max_entries=embedding_config.cache_max_entries,
+                max_size_mb=embedding_config.cache_max_size_mb
+            )
+            print(f"DEBUG_EMBED_CACHE (Engine ID: {self.engine_instance_id}): Embedding cache opened at {cache_path}. Stats: {self.embedding_cache.stats()}")
+        except Exception as e:
+            self.logger.warning(f"Embedding cache unavailable at {cache_path}: {type(e).__name__} - {e}. Continuing without cache.")
+            self.embedding_cache = None
+
+    def _initialize_response_cache(self) -> None:
+        """Creates the in-process response cache if it is enabled in the design."""
+        cache_config = self.design.response_cache
+        if not cache_config.enabled:
+            self.response_cache = None
+            return
+        self.response_cache = ResponseCache(
+            similarity_threshold=cache_config.similarity_threshold,
+            ttl_seconds=cache_config.ttl_seconds,
+            max_entries=cache_config.max_entries
+        )
+        print(f"DEBUG_RESPONSE_CACHE (Engine ID: {self.engine_instance_id}): Response cache enabled (threshold {cache_config.similarity_threshold}, TTL {cache_config.ttl_seconds}s, {cache_config.max_entries} entries).")
+
     def _embed_content(self, text_to_embed: str, task_type: str = "RETRIEVAL_DOCUMENT") -> Optional[List[float]]:
         """Generates an embedding for the given text using the configured Gemini model."""
         print(f"DEBUG_EMBED (Engine ID: {self.engine_instance_id}): _embed_content called for task_type '{task_type}'. Text length: {len(text_to_embed)}.")
@@ -162,26 +251,399 @@ class AMMEngine:
             # This case should ideally be caught before calling _embed_content by checking ai_client_available_for_embedding
             self.logger.warning(f"Embedding not attempted: AI model client or embedding model name not set.")
             return None
+
+        # Query embeddings go to the in-process LRU cache; knowledge embeddings to the persistent cache,
+        # so one-off queries can't evict knowledge embeddings that are reused on every start.
+        is_query = task_type == "RETRIEVAL_QUERY"
+        if is_query and self.query_embedding_cache is not None:
+            cached_embedding = self.query_embedding_cache.get(self.embedding_model_name, text_to_embed)
+            if cached_embedding is not None:
+                print(f"DEBUG_EMBED (Engine ID: {self.engine_instance_id}): Query embedding cache hit.")
+                return cached_embedding
+        elif not is_query and self.embedding_cache is not None:
+            cached_embedding = self.embedding_cache.get(self.embedding_model_name, task_type, text_to_embed)
+            if cached_embedding is not None:
+                print(f"DEBUG_EMBED (Engine ID: {self.engine_instance_id}): Embedding cache hit.")
+                return cached_embedding
         try:
             # Ensure the task_type is valid if the model requires it (some embedding models are task-specific)
-            result = genai.embed_content(
-                model=self.embedding_model_name, # e.g., "models/text-embedding-004"
-                content=text_to_embed,
-                task_type=task_type # e.g., "RETRIEVAL_DOCUMENT", "SEMANTIC_SIMILARITY"
-            )
-            return result['embedding']
+            result = self._request_embeddings(text_to_embed, task_type=task_type)
+            embedding = result['embedding']
+            if embedding:
+                if is_query and self.query_embedding_cache is not None:
+                    self.query_embedding_cache.put(self.embedding_model_name, text_to_embed, embedding)
+                elif not is_query and self.embedding_cache is not None:
+                    self.embedding_cache.put(self.embedding_model_name, task_type, text_to_embed, embedding)
+            return embedding
         except Exception as e:
             self.logger.error(f"ERROR generating embedding: {type(e).__name__} - {e}")
             # import traceback
             # traceback.print_exc() # Consider if full traceback is needed in prod logs
             return None
 
+    @staticmethod
+    def _is_retryable_embedding_error(error: Exception) -> bool:
+        """Returns True for rate-limit and transient service errors worth retrying."""
+        if google_api_exceptions is not None and isinstance(error, (
+                google_api_exceptions.ResourceExhausted,
+                google_api_exceptions.TooManyRequests,
+                google_api_exceptions.ServiceUnavailable,
+                google_api_exceptions.DeadlineExceeded,
+                google_api_exceptions.InternalServerError)):
+            return True
+        message = str(error).lower()
+        return "429" in message or "rate limit" in message or "quota" in message
+
+    def _embedding_retry_delay(self, attempt: int) -> float:
+        """Exponential backoff delay for the given retry attempt, with jitter."""
+        embedding_config = self.design.embedding
+        delay = min(embedding_config.retry_initial_delay_seconds * (2 ** attempt), embedding_config.retry_max_delay_seconds)
+        return delay * (0.5 + random.random()) # Jitter so concurrent workers don't retry in lockstep
+
+    def _request_embeddings(self, content: Union[str, List[str]], task_type: str) -> Dict[str, Any]:
+        """Calls genai.embed_content, retrying rate-limited requests with exponential backoff and jitter."""
+        embedding_config = self.design.embedding
+        attempt = 0
+        while True:
+            try:
+                return genai.embed_content(
+                    model=self.embedding_model_name, # e.g., "models/text-embedding-004"
+                    content=content,
+                    task_type=task_type # e.g., "RETRIEVAL_DOCUMENT", "SEMANTIC_SIMILARITY"
+                )
+            except Exception as e:
+                if attempt >= embedding_config.max_retries or not self._is_retryable_embedding_error(e):
+                    raise
+                delay = self._embedding_retry_delay(attempt)
+                attempt += 1
+                self.logger.warning(f"Embedding request rate-limited ({type(e).__name__}). Retry {attempt}/{embedding_config.max_retries} in {delay:.1f}s.")
+                time.sleep(delay)
+
+    def _embed_contents_batch(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT", use_cache: bool = True) -> List[Optional[List[float]]]:
+        """Generates embeddings for many texts using multi-content requests run through a bounded worker pool.
+
+        Returns one entry per input text, None where embedding failed. Cached and duplicate texts
+        are not sent to the API. Pass use_cache=False for texts that are embedded only once
+        (e.g. interactions), so they don't crowd knowledge out of the persistent cache.
+        """
+        print(f"DEBUG_EMBED (Engine ID: {self.engine_instance_id}): _embed_contents_batch called for {len(texts)} texts, task_type '{task_type}'.")
+        if not self.ai_model_client or not self.embedding_model_name:
+            self.logger.warning(f"Embedding not attempted: AI model client or embedding model name not set.")
+            return [None] * len(texts)
+
+        embedding_cache = self.embedding_cache if use_cache else None
+        embeddings_by_text: Dict[str, List[float]] = {}
+        if embedding_cache is not None:
+            embeddings_by_text.update(embedding_cache.get_many(self.embedding_model_name, task_type, texts))
+
+        pending_texts = [text for text in dict.fromkeys(texts) if text not in embeddings_by_text]
+        embedding_config = self.design.embedding
+        batches = [pending_texts[i:i + embedding_config.batch_size] for i in range(0, len(pending_texts), embedding_config.batch_size)]
+        print(f"DEBUG_EMBED (Engine ID: {self.engine_instance_id}): {len(texts) - len(pending_texts)} texts served from cache or duplicates, {len(pending_texts)} to embed in {len(batches)} batches.")
+
+        def embed_batch(batch: List[str]) -> Dict[str, List[float]]:
+            try:
+                result = self._request_embeddings(batch, task_type=task_type)
+                vectors = result['embedding']
+                if len(vectors) != len(batch):
+                    raise ValueError(f"expected {len(batch)} embeddings, got {len(vectors)}")
+                return dict(zip(batch, vectors))
+            except Exception as e:
+                self.logger.error(f"ERROR generating batch embeddings for {len(batch)} texts: {type(e).__name__} - {e}")
+                return {}
+
+        if batches:
+            max_workers = min(embedding_config.max_concurrent_requests, len(batches))
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="amm-embed") as executor:
+                for batch_embeddings in executor.map(embed_batch, batches):
+                    if embedding_cache is not None and batch_embeddings:
+                        embedding_cache.put_many(self.embedding_model_name, task_type, batch_embeddings)
+                    embeddings_by_text.update(batch_embeddings)
+
+        return [embeddings_by_text.get(text) for text in texts]
+
     def _get_embedding_function(self):
         """Returns the Gemini embedding function for LanceDB if an AI client is available."""
         pass
 
+    def _get_pdf_processor(self) -> Optional["PDFProcessor"]:
+        """Returns the shared PDFProcessor instance, creating it on first use."""
+        if not PDF_PROCESSOR_AVAILABLE:
+            return None
+        if self.pdf_processor is None:
+            # Cache extracted page texts and chunks so restarts do not re-extract (or re-OCR) unchanged PDFs
+            pdf_config = {"cache_dir": str(self.instance_data_path / "pdf_cache")} if self.instance_data_path else {}
+            self.pdf_processor = PDFProcessor(pdf_config)
+        return self.pdf_processor
+
+    def _fingerprint_knowledge_source(self, ks_config: KnowledgeSourceConfig, previous: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Builds a fingerprint of a knowledge source's content and ingestion settings.
+
+        Returns None if the source cannot be read. The file content hash is reused from the
+        previous fingerprint when path, size and mtime are unchanged, so unchanged files are not re-read.
+        """
+        source_identifier = f"KS ID {ks_config.id} ({ks_config.name})"
+        fingerprint: Dict[str, Any] = {"type": ks_config.type.value, "name": ks_config.name}
+
+        if ks_config.type == KnowledgeSourceType.TEXT:
+            fingerprint["content_hash"] = hash_text(ks_config.content or "")
+            return fingerprint
+
+        if ks_config.type == KnowledgeSourceType.FILE:
+            if not ks_config.path:
+                self.logger.warning(f"Path not provided for FILE source {source_identifier}. Skipping.")
+                return None
+            try:
+                file_path = Path(ks_config.path).resolve()
+                if not file_path.is_file():
+                    self.logger.warning(f"File path {file_path} for {source_identifier} is not a file or does not exist. Skipping.")
+                    return None
+                stat = file_path.stat()
+                fingerprint.update({
+                    "path": str(file_path),
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "encoding": ks_config.encoding or 'utf-8'
+                })
+                if (previous and previous.get("path") == fingerprint["path"]
+                        and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime
+                        and previous.get("content_hash")):
+                    fingerprint["content_hash"] = previous["content_hash"]
+                else:
+                    fingerprint["content_hash"] = hash_file(file_path)
+            except OSError as e:
+                self.logger.error(f"ERROR reading file {ks_config.path} for {source_identifier}: {type(e).__name__} - {e}. Skipping.")
+                return None
+
+            pdf_processor = self._get_pdf_processor() if file_path.suffix.lower() == '.pdf' else None
+            if pdf_processor is not None:
+                fingerprint["chunker"] = pdf_processor.chunker_settings()
+                # Whether scanned pages are OCRed (and how) changes the extracted text, e.g. once OCR is installed
+                fingerprint["extraction"] = pdf_processor.extraction_settings()
+            return fingerprint
+
+        self.logger.warning(f"Skipping {source_identifier} due to unhandled type: {ks_config.type.value}")
+        return None
+
+    def _build_knowledge_rows(self, ks_config: KnowledgeSourceConfig, content_hash: Optional[str] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """Reads, chunks and embeds a single knowledge source into rows for the LanceDB table.
+
+        content_hash is the file content hash from the source's fingerprint, if known; the PDF cache
+        uses it instead of hashing the file again.
+        Returns (rows, complete); complete is False if some chunks could not be embedded.
+        """
+        knowledge_rows: List[Dict[str, Any]] = []
+        text_to_embed: Optional[str] = None
+        source_identifier = f"KS ID {ks_config.id} ({ks_config.name})"
+
+        if ks_config.type == KnowledgeSourceType.TEXT:
+            text_to_embed = ks_config.content
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Processing TEXT source: {source_identifier}")
+
+        elif ks_config.type == KnowledgeSourceType.FILE:
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Processing FILE source: {source_identifier}, Path: {ks_config.path}")
+            if not ks_config.path:
+                self.logger.warning(f"Path not provided for FILE source {source_identifier}. Skipping.")
+                return [], True
+            try:
+                # Attempt to resolve the path. If relative, it's against CWD.
+                # For robustness, consider making paths relative to design file or a content root.
+                file_path = Path(ks_config.path).resolve()
+                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Resolved file path for {source_identifier} to {file_path}")
+                if not file_path.is_file():
+                    self.logger.warning(f"File path {file_path} for {source_identifier} is not a file or does not exist. Skipping.")
+                    return [], True
+
+                # Check if the file is a PDF
+                if file_path.suffix.lower() == '.pdf':
+                    pdf_processor = self._get_pdf_processor()
+                    if pdf_processor is not None:
+                        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Processing PDF file {file_path} for {source_identifier}")
+                        # Process the PDF file and get chunks
+                        pdf_chunks = pdf_processor.process_file(str(file_path), file_hash=content_hash)
+                        if not pdf_chunks:
+                            self.logger.warning(f"No text extracted from PDF {file_path} for {source_identifier}")
+                            return [], True
+
+                        # Embed all chunks through the batch path, then add each one to knowledge rows
+                        pdf_chunks = [chunk for chunk in pdf_chunks if chunk['text']]
+                        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Embedding {len(pdf_chunks)} PDF chunks from {source_identifier}")
+                        chunk_embeddings = self._embed_contents_batch([chunk['text'] for chunk in pdf_chunks], task_type="RETRIEVAL_DOCUMENT")
+                        for chunk, embedding_vector in zip(pdf_chunks, chunk_embeddings):
+                            chunk_text = chunk['text']
+                            if embedding_vector:
+                                # Chunk IDs are derived from page span and content, so this ID is stable across runs
+                                chunk_id = f"{ks_config.id}_{chunk['id']}"
+                                knowledge_rows.append({
+                                    "id": chunk_id,
+                                    "text": chunk_text,
+                                    "vector": embedding_vector,
+                                    "source": f"{ks_config.name} (PDF chunk {chunk['metadata']['chunk_index'] + 1}/{chunk['metadata']['total_chunks']})"
+                                })
+                                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully embedded PDF chunk {chunk_id} from {source_identifier}")
+                        complete = len(knowledge_rows) == len(pdf_chunks)
+                        if not complete:
+                            self.logger.warning(f"Embedded only {len(knowledge_rows)} of {len(pdf_chunks)} PDF chunks from {source_identifier}")
+                        return knowledge_rows, complete  # Skip the standard text processing below since we've handled the PDF
+                    else:
+                        self.logger.warning(f"PDF processor not available for {source_identifier}. Attempting to read as text.")
+
+                # Standard text file processing for non-PDF files or if PDF processor is not available
+                text_to_embed = file_path.read_text(encoding=ks_config.encoding or 'utf-8')
+                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully read content from file {file_path} for {source_identifier}. Length: {len(text_to_embed)}")
+            except FileNotFoundError:
+                self.logger.warning(f"FileNotFoundError for {source_identifier} at path {ks_config.path}. Skipping.")
+                return [], True
+            except Exception as e:
+                self.logger.error(f"ERROR reading file {ks_config.path} for {source_identifier}: {type(e).__name__} - {e}. Skipping.")
+                return [], True
+        else:
+            self.logger.warning(f"Skipping {source_identifier} due to unhandled type: {ks_config.type.value}")
+            return [], True
+
+        if not text_to_embed:
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Skipping {source_identifier} due to empty or unreadable content.")
+            return [], True
+
+        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Attempting to embed content from {source_identifier}: '{text_to_embed[:100]}...' using model {self.embedding_model_name}")
+        embedding_vector = self._embed_content(text_to_embed=text_to_embed, task_type="RETRIEVAL_DOCUMENT")
+        if embedding_vector:
+            knowledge_rows.append({
+                "id": str(ks_config.id), # Ensure this is a unique string for LanceDB
+                "text": text_to_embed,
+                "vector": embedding_vector,
+                "source": ks_config.name
+            })
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully embedded and prepared data for {source_identifier}.")
+        else:
+            self.logger.warning(f"Failed to get embedding for {source_identifier}. Skipping addition to DB.")
+        return knowledge_rows, bool(knowledge_rows)
+
+    @staticmethod
+    def _sql_in_clause(column: str, values: List[str]) -> str:
+        """Builds a LanceDB SQL 'IN' predicate for a list of string values."""
+        quoted = ", ".join("'" + str(value).replace("'", "''") + "'" for value in values)
+        return f"{column} IN ({quoted})"
+
+    def _apply_fixed_knowledge_changes(self, rows_to_add: List[Dict[str, Any]], stale_row_ids: List[str]) -> bool:
+        """Deletes stale rows from and upserts new rows into the fixed knowledge table, creating it if needed.
+
+        Rows are merged on their ID: a row whose ID already exists replaces it, so rows that a
+        changed source produced again are updated in place rather than deleted and re-added.
+        """
+        table_name = LANCEDB_TABLE_NAME
+        rows_by_id = {row["id"]: row for row in rows_to_add} # Duplicate IDs: the last row wins
+        rows_to_add = list(rows_by_id.values())
+        stale_row_ids = [row_id for row_id in stale_row_ids if row_id not in rows_by_id]
+        try:
+            if self.lancedb_table is None:
+                if not rows_to_add:
+                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): No knowledge data to add. LanceDB table '{table_name}' not created.")
+                    return True
+                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Creating new LanceDB table '{table_name}' with {len(rows_to_add)} items.")
+                # Create a pandas DataFrame first
+                import pandas as pd
+                df = pd.DataFrame(rows_to_add)
+                self.lancedb_table = self.lancedb_connection.create_table(table_name, data=df)
+                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully created new LanceDB table '{table_name}'.")
+                return True
+
+            # Delete rows of changed or removed sources in batches to keep predicates short
+            for i in range(0, len(stale_row_ids), 500):
+                self.lancedb_table.delete(self._sql_in_clause("id", stale_row_ids[i:i + 500]))
+            if stale_row_ids:
+                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Deleted {len(stale_row_ids)} stale rows from LanceDB table '{table_name}'.")
+
+            if rows_to_add:
+                self.lancedb_table.merge_insert("id").when_matched_update_all().when_not_matched_insert_all().execute(rows_to_add)
+                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Merged {len(rows_to_add)} items into existing LanceDB table '{table_name}'.")
+            return True
+        except Exception as e:
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): ERROR updating LanceDB table '{table_name}': {type(e).__name__} - {e}")
+            return False
+
+    def _select_vector_index_params(self, row_count: int, dimension: int) -> Dict[str, Any]:
+        """Chooses the ANN index type and its parameters for the fixed knowledge table from its size."""
+        index_config = self.design.vector_index
+        index_type = index_config.index_type.value
+        if index_config.index_type == VectorIndexType.AUTO:
+            index_type = VectorIndexType.IVF_PQ.value if row_count >= index_config.ivf_pq_min_rows else VectorIndexType.IVF_HNSW_SQ.value
+
+        params: Dict[str, Any] = {"index_type": index_type}
+        if index_type == VectorIndexType.IVF_PQ.value:
+            # ~sqrt(N) partitions keeps both the centroid scan and the per-partition scan small
+            params["num_partitions"] = index_config.num_partitions or max(1, int(row_count ** 0.5))
+            if index_config.num_sub_vectors:
+                params["num_sub_vectors"] = index_config.num_sub_vectors
+            else:
+                # Largest sub-vector count that divides the dimension with sub-vectors of >= 16 dims where possible
+                params["num_sub_vectors"] = next(dimension // sub_dim for sub_dim in (16, 8, 4, 2, 1) if dimension % sub_dim == 0)
+        else:
+            # HNSW does the fine-grained search itself, so only coarse partitions (~1M rows each) are needed
+            params["num_partitions"] = index_config.num_partitions or max(1, row_count // 1_000_000)
+        return params
+
+    @staticmethod
+    def _build_vector_index_config(params: Dict[str, Any]) -> Union[IvfPq, HnswSq]:
+        """Turns the parameters from _select_vector_index_params into a LanceDB index config object."""
+        options = {key: value for key, value in params.items() if key != "index_type"}
+        if params["index_type"] == VectorIndexType.IVF_PQ.value:
+            return IvfPq(distance_type="l2", **options)
+        return HnswSq(distance_type="l2", **options)
+
+    def _ensure_vector_index(self, rows_changed: int) -> None:
+        """Creates the ANN index once the table passes the configured size, and keeps it current after ingestion.
+
+        Small changes are folded into the existing index with table.optimize(); the index is only
+        retrained from scratch once rows_changed exceeds vector_index.rebuild_threshold of the table.
+        """
+        index_config = self.design.vector_index
+        self.vector_index_type = None
+        if not index_config.enabled or self.lancedb_table is None:
+            return
+
+        try:
+            row_count = int(self.lancedb_table.count_rows())
+            existing_index = next(
+                (index for index in self.lancedb_table.list_indices() if "vector" in (getattr(index, "columns", None) or [])),
+                None
+            )
+        except Exception as e:
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Could not inspect LanceDB table for vector index: {type(e).__name__} - {e}")
+            return
+
+        if existing_index is not None:
+            self.vector_index_type = str(getattr(existing_index, "index_type", "unknown"))
+            if not rows_changed:
+                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Using existing {self.vector_index_type} vector index over {row_count} rows.")
+                return
+            # Below min_rows_for_index the existing index is kept (rather than falling back to a full scan) but never retrained
+            if row_count < index_config.min_rows_for_index or rows_changed <= index_config.rebuild_threshold * row_count:
+                try:
+                    # Adds the new rows to the index and drops deleted ones without retraining the partitions
+                    self.lancedb_table.optimize()
+                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Updated existing {self.vector_index_type} vector index for {rows_changed} changed rows.")
+                except Exception as e:
+                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): ERROR optimizing LanceDB table: {type(e).__name__} - {e}. New rows are searched by brute force until the next rebuild.")
+                return
+
+        if row_count < index_config.min_rows_for_index:
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): {row_count} rows is below the vector index threshold of {index_config.min_rows_for_index}.")
+            return
+
+        try:
+            dimension = self.lancedb_table.schema.field("vector").type.list_size
+            params = self._select_vector_index_params(row_count, dimension)
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Building vector index over {row_count} rows with {params}.")
+            start_time = time.monotonic()
+            self.lancedb_table.create_index("vector", replace=True, config=self._build_vector_index_config(params)) # With a config object the first argument is the column
+            self.vector_index_type = params["index_type"]
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Vector index built in {time.monotonic() - start_time:.1f}s.")
+        except Exception as e:
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): ERROR building vector index: {type(e).__name__} - {e}. Falling back to brute-force search.")
+
     def _initialize_fixed_knowledge(self) -> None:
-        """Initializes the fixed knowledge base (LanceDB)."""
+        """Initializes the fixed knowledge base (LanceDB), ingesting only new or changed knowledge sources."""
         print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): _initialize_fixed_knowledge CALLED.")
         if not self.design.knowledge_sources:
             print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): No knowledge sources defined. Skipping LanceDB initialization. self.lancedb_table remains None.")
@@ -192,200 +654,90 @@ class AMMEngine:
             print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): LanceDB path is not set. Cannot initialize fixed knowledge. self.lancedb_table remains None.")
             self.lancedb_table = None
             return
-        
+
         # Check if AI client is available for embeddings
         ai_client_available_for_embedding = self.ai_model_client is not None and self.embedding_model_name is not None
         print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): AI client configured for embedding: {ai_client_available_for_embedding}. Embedding model: {self.embedding_model_name}")
 
-        knowledge_data_for_db: List[Dict[str, Any]] = []
-        table_name = LANCEDB_TABLE_NAME # Using defined constant
-
-        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Processing {len(self.design.knowledge_sources)} knowledge sources.")
-        for ks_config in self.design.knowledge_sources:
-            text_to_embed: Optional[str] = None
-            source_identifier = f"KS ID {ks_config.id} ({ks_config.name})"
-
-            if ks_config.type == KnowledgeSourceType.TEXT:
-                text_to_embed = ks_config.content
-                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Processing TEXT source: {source_identifier}")
-            
-            elif ks_config.type == KnowledgeSourceType.FILE:
-                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Processing FILE source: {source_identifier}, Path: {ks_config.path}")
-                if not ks_config.path:
-                    self.logger.warning(f"Path not provided for FILE source {source_identifier}. Skipping.")
-                    continue
-                try:
-                    # Attempt to resolve the path. If relative, it's against CWD.
-                    # For robustness, consider making paths relative to design file or a content root.
-                    file_path = Path(ks_config.path).resolve()
-                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Resolved file path for {source_identifier} to {file_path}")
-                    if not file_path.is_file():
-                        self.logger.warning(f"File path {file_path} for {source_identifier} is not a file or does not exist. Skipping.")
-                        continue
-                    
-                    # Check if the file is a PDF
-                    if file_path.suffix.lower() == '.pdf':
-                        if PDF_PROCESSOR_AVAILABLE:
-                            from amm_project.utils.pdf_processor import process_pdf
-                            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Processing PDF file {file_path} for {source_identifier}")
-                            # Process the PDF file and get chunks
-                            pdf_chunks = process_pdf(str(file_path))
-                            if not pdf_chunks:
-                                self.logger.warning(f"No text extracted from PDF {file_path} for {source_identifier}")
-                                continue
-                                
-                            # For each chunk, create an embedding and add to knowledge data
-                            for chunk in pdf_chunks:
-                                chunk_text = chunk['text']
-                                if chunk_text and ai_client_available_for_embedding:
-                                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Embedding PDF chunk {chunk['id']} from {source_identifier}")
-                                    embedding_vector = self._embed_content(text_to_embed=chunk_text, task_type="RETRIEVAL_DOCUMENT")
-                                    
-                                    if embedding_vector:
-                                        # Create a unique ID for each chunk
-                                        chunk_id = f"{ks_config.id}_{chunk['id']}"
-                                        # Merge the metadata dictionaries properly
-                                        merged_metadata = {}
-                                        if ks_config.metadata:
-                                            merged_metadata.update(ks_config.metadata)
-                                        merged_metadata.update(chunk['metadata'])
-                                        
-                                        knowledge_data_for_db.append({
-                                            "id": chunk_id,
-                                            "text": chunk_text,
-                                            "vector": embedding_vector,
-                                            "source_name": f"{ks_config.name} (PDF chunk {chunk['metadata']['chunk_index'] + 1}/{chunk['metadata']['total_chunks']})",
-                                            "metadata": merged_metadata
-                                        })
-                                        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully embedded PDF chunk {chunk_id} from {source_identifier}")
-                            continue  # Skip the standard text processing below since we've handled the PDF
-                        else:
-                            self.logger.warning(f"PDF processor not available for {source_identifier}. Attempting to read as text.")
-                    
-                    # Standard text file processing for non-PDF files or if PDF processor is not available
-                    text_to_embed = file_path.read_text(encoding=ks_config.encoding or 'utf-8')
-                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully read content from file {file_path} for {source_identifier}. Length: {len(text_to_embed)}")
-                except FileNotFoundError:
-                    self.logger.warning(f"FileNotFoundError for {source_identifier} at path {ks_config.path}. Skipping.")
-                    continue
-                except Exception as e:
-                    self.logger.error(f"ERROR reading file {ks_config.path} for {source_identifier}: {type(e).__name__} - {e}. Skipping.")
-                    continue
-            else:
-                self.logger.warning(f"Skipping {source_identifier} due to unhandled type: {ks_config.type.value}")
-                continue # Skip to next knowledge source
-
-            if text_to_embed and ai_client_available_for_embedding:
-                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Attempting to embed content from {source_identifier}: '{text_to_embed[:100]}...' using model {self.embedding_model_name}")
-                embedding_vector = self._embed_content(text_to_embed=text_to_embed, task_type="RETRIEVAL_DOCUMENT")
-                
-                if embedding_vector:
-                    knowledge_data_for_db.append({
-                        "id": ks_config.id, # Ensure this is a unique string for LanceDB
-                        "text": text_to_embed,
-                        "vector": embedding_vector,
-                        "source_name": ks_config.name,
-                        "metadata": ks_config.metadata or {}
-                    })
-                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully embedded and prepared data for {source_identifier}.")
-                else:
-                    self.logger.warning(f"Failed to get embedding for {source_identifier}. Skipping addition to DB.")
-            elif not text_to_embed:
-                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Skipping {source_identifier} due to empty or unreadable content.")
-            elif not ai_client_available_for_embedding:
-                self.logger.warning(f"Skipping {source_identifier} because AI client for embeddings is not available.")
-
-
-        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Populated {len(knowledge_data_for_db)} items for LanceDB table.")
-        # Check if table exists, if so, open it. Otherwise, lancedb_table remains None.
+        table_name = LANCEDB_TABLE_NAME
         try:
             self.lancedb_connection = lancedb.connect(self.lancedb_path)
             print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully connected to LanceDB at '{self.lancedb_path}'.")
-            table_name = LANCEDB_TABLE_NAME
-            
             if table_name in self.lancedb_connection.table_names():
                 self.lancedb_table = self.lancedb_connection.open_table(table_name)
                 print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully opened existing LanceDB table '{table_name}'.")
-                
-                # If we have new knowledge data, add it to the existing table
-                if knowledge_data_for_db:
-                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Adding {len(knowledge_data_for_db)} items to existing LanceDB table '{table_name}'.")
-                    self.lancedb_table.add(knowledge_data_for_db)
-                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully added items to existing table.")
             else:
-                # Create the table if we have knowledge data
-                if knowledge_data_for_db:
-                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Creating new LanceDB table '{table_name}' with {len(knowledge_data_for_db)} items.")
-                    
-                    # Drop the existing table if it exists to avoid schema conflicts
-                    if table_name in self.lancedb_connection.table_names():
-                        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Dropping existing table '{table_name}' due to schema mismatch.")
-                        self.lancedb_connection.drop_table(table_name)
-                    
-                    # Create a new table with the current schema
-                    try:
-                        # Create a list of dictionaries with just the essential fields
-                        essential_data = []
-                        for item in knowledge_data_for_db:
-                            essential_item = {
-                                "id": str(item["id"]),  # Ensure id is a string
-                                "text": str(item["text"]),  # Ensure text is a string
-                                "vector": item["vector"],  # Keep vector as is
-                                "source": str(item["source_name"])  # Rename to 'source' for simplicity
-                            }
-                            essential_data.append(essential_item)
-                        
-                        # Create the table with a simple schema
-                        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Attempting to create table with {len(essential_data)} items using simplified approach")
-                        
-                        # Create a pandas DataFrame first
-                        import pandas as pd
-                        df = pd.DataFrame(essential_data)
-                        
-                        # Create the table from the DataFrame
-                        self.lancedb_table = self.lancedb_connection.create_table(table_name, data=df)
-                        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully created LanceDB table using pandas DataFrame approach")
-                    except Exception as e:
-                        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Error creating table: {e}")
-                        
-                        # Last resort: try to create an empty table and add data later
-                        try:
-                            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Attempting to create empty table as last resort")
-                            schema = {
-                                "id": "string",
-                                "text": "string",
-                                "vector": "float[]",
-                                "source": "string"
-                            }
-                            self.lancedb_table = self.lancedb_connection.create_table(table_name, schema=schema)
-                            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully created empty LanceDB table")
-                            
-                            # Now try to add data one by one
-                            for item in essential_data:
-                                try:
-                                    self.lancedb_table.add([item])
-                                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Added item {item['id']} to table")
-                                except Exception as item_e:
-                                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Failed to add item {item['id']}: {item_e}")
-                        except Exception as e2:
-                            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Failed to create empty table: {e2}")
-                            self.lancedb_table = None
-                    
-                    # Only print overall success if we actually have a table
-                    if self.lancedb_table is not None:
-                        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Successfully created new LanceDB table '{table_name}'.")
-                else:
-                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): No knowledge data to add. LanceDB table '{table_name}' not created.")
-                    self.lancedb_table = None
+                self.lancedb_table = None
         except Exception as e:
-             print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): ERROR interacting with LanceDB at '{self.lancedb_path}': {type(e).__name__} - {e}. self.lancedb_table set to None.")
-             self.lancedb_table = None
-        
-        # Log the final state of the LanceDB table
-        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): _initialize_fixed_knowledge finished. LanceDB table is {'set' if self.lancedb_table else 'None'}.")
-        return
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): ERROR interacting with LanceDB at '{self.lancedb_path}': {type(e).__name__} - {e}. self.lancedb_table set to None.")
+            self.lancedb_table = None
+            return
 
-        # If fixed knowledge is disabled or no sources, lancedb_table might remain None
+        if not ai_client_available_for_embedding:
+            self.logger.warning("AI client for embeddings is not available. Knowledge sources will not be ingested.")
+            self._ensure_vector_index(rows_changed=0)
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): _initialize_fixed_knowledge finished. LanceDB table is {'set' if self.lancedb_table else 'None'}.")
+            return
+
+        manifest_path = self.instance_data_path / MANIFEST_FILENAME
+        manifest = KnowledgeManifest.load(manifest_path)
+        if manifest is None or manifest.embedding_model != self.embedding_model_name or self.lancedb_table is None:
+            # Without a matching manifest the table contents are unknown (e.g. duplicates from older
+            # versions or vectors from another embedding model), so rebuild it from scratch.
+            if self.lancedb_table is not None:
+                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): No matching manifest for existing LanceDB table '{table_name}'. Rebuilding it.")
+                try:
+                    self.lancedb_connection.drop_table(table_name)
+                except Exception as e:
+                    print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): ERROR dropping LanceDB table '{table_name}': {type(e).__name__} - {e}")
+                self.lancedb_table = None
+            manifest = KnowledgeManifest(manifest_path, embedding_model=self.embedding_model_name)
+
+        rows_to_add: List[Dict[str, Any]] = []
+        stale_row_ids: List[str] = []
+        design_source_ids = set()
+
+        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Processing {len(self.design.knowledge_sources)} knowledge sources.")
+        for ks_config in self.design.knowledge_sources:
+            design_source_ids.add(ks_config.id)
+            source_identifier = f"KS ID {ks_config.id} ({ks_config.name})"
+            recorded_fingerprint = manifest.get_fingerprint(ks_config.id)
+            fingerprint = self._fingerprint_knowledge_source(ks_config, previous=recorded_fingerprint)
+
+            if fingerprints_match(fingerprint, recorded_fingerprint):
+                # Refresh the recorded fingerprint (e.g. a new mtime) but keep the existing rows
+                manifest.set_source(ks_config.id, fingerprint, manifest.get_row_ids(ks_config.id))
+                print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): {source_identifier} unchanged since last ingestion. Skipping.")
+                continue
+
+            stale_row_ids.extend(manifest.remove_source(ks_config.id))
+            if fingerprint is None:
+                continue
+
+            source_rows, complete = self._build_knowledge_rows(ks_config, content_hash=fingerprint.get("content_hash"))
+            if source_rows:
+                rows_to_add.extend(source_rows)
+                if not complete:
+                    # Keep the rows we have, but make the fingerprint mismatch so the next start retries the source
+                    fingerprint = {**fingerprint, "incomplete": True}
+                manifest.set_source(ks_config.id, fingerprint, [row["id"] for row in source_rows])
+
+        for removed_source_id in [source_id for source_id in manifest.sources if source_id not in design_source_ids]:
+            print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Knowledge source {removed_source_id} was removed from the design. Deleting its rows.")
+            stale_row_ids.extend(manifest.remove_source(removed_source_id))
+
+        print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): Populated {len(rows_to_add)} new items and {len(stale_row_ids)} stale items for LanceDB table.")
+        if self._apply_fixed_knowledge_changes(rows_to_add, stale_row_ids):
+            manifest.save()
+            self._ensure_vector_index(rows_changed=len(rows_to_add) + len(stale_row_ids))
+        else:
+            # The table no longer matches any manifest; force a rebuild on the next start
+            try:
+                manifest_path.unlink()
+            except OSError:
+                pass
+
+        # Log the final state of the LanceDB table
         print(f"DEBUG_FK (Engine ID: {self.engine_instance_id}): _initialize_fixed_knowledge finished. LanceDB table is {'set' if self.lancedb_table else 'None'}.")
 
     def _format_fixed_knowledge_for_prompt(self, fixed_knowledge_chunks: List[Dict[str, Any]]) -> str:
@@ -394,83 +746,277 @@ class AMMEngine:
             self.logger.debug("FORMAT_FK: No fixed knowledge chunks to format.")
             return "No relevant fixed knowledge found."
 
-        formatted_chunks = []
-        for i, chunk_dict in enumerate(fixed_knowledge_chunks):
-            text_content = chunk_dict.get('text', 'Error: Text content not found in chunk.')
-            source_name = chunk_dict.get('source_name', 'Unknown Source')
-            formatted_chunks.append(f"Chunk {i+1} (Source: {source_name}):\n{text_content}")
-        
+        formatted_chunks = [self._format_fixed_knowledge_entry(i, chunk_dict) for i, chunk_dict in enumerate(fixed_knowledge_chunks)]
         result_str = "\n\n".join(formatted_chunks)
         self.logger.debug(f"FORMAT_FK: Formatted {len(fixed_knowledge_chunks)} fixed knowledge chunks. Result length: {len(result_str)}")
         return result_str
 
+    @staticmethod
+    def _format_fixed_knowledge_entry(index: int, chunk_dict: Dict[str, Any]) -> str:
+        """Formats one fixed knowledge chunk (index is 0-based) as it appears in the prompt."""
+        text_content = chunk_dict.get('text', 'Error: Text content not found in chunk.')
+        source_name = chunk_dict.get('source_name', 'Unknown Source')
+        return f"Chunk {index+1} (Source: {source_name}):\n{text_content}"
+
     def _initialize_adaptive_memory(self) -> None:
-        """Initializes the SQLite database for adaptive memory using SQLAlchemy."""
+        """Initializes the adaptive memory store selected by adaptive_memory.backend (SQLite file by default)."""
         print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): _initialize_adaptive_memory called.")
         if not self.design.adaptive_memory.enabled:
             print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Adaptive memory is disabled in the design.")
-            self.adaptive_memory_engine = None
-            self.db_session_factory = None
+            self.memory_store = None
             return
 
-        if not self.sqlite_path:
-            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): SQLite path not initialized. Cannot set up adaptive memory.")
-            self.adaptive_memory_engine = None
-            self.db_session_factory = None
+        memory_config = self.design.adaptive_memory
+        try:
+            self.memory_store = create_interaction_store(memory_config, self.sqlite_path)
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Adaptive memory initialized with {type(self.memory_store).__name__} (backend '{memory_config.backend.value}').")
+        except Exception as e:
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Error initializing adaptive memory store: {e}")
+            self.memory_store = None
             return
 
+        if self.design.adaptive_memory.strategy == AdaptiveMemoryStrategy.RELEVANT:
+            self._initialize_interaction_index()
+        if self.design.adaptive_memory.write_behind_enabled:
+            self.interaction_writer = InteractionWriteBuffer(
+                self.memory_store,
+                max_batch_size=memory_config.write_behind_batch_size,
+                flush_interval_seconds=memory_config.write_behind_flush_interval_seconds,
+                max_queue_size=memory_config.write_behind_max_queue_size,
+                on_flushed=self._on_interactions_written
+            )
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Write-behind buffer enabled (batch {memory_config.write_behind_batch_size}, interval {memory_config.write_behind_flush_interval_seconds}s).")
+        if self.design.adaptive_memory.retention_policy_days is not None:
+            self._start_retention_worker()
+
+    def _initialize_interaction_index(self) -> None:
+        """Opens the interaction vector index and, in the background, embeds stored interactions that have no vector yet."""
+        index_path = self.instance_data_path / INTERACTION_INDEX_DIRNAME
         try:
-            # Construct the full SQLite URL
-            sqlite_url = f"sqlite:///" + str(self.sqlite_path.resolve()) # Use resolved absolute path
-            self.adaptive_memory_engine = create_db_engine_and_tables(sqlite_url)
-            self.db_session_factory = get_session_local(self.adaptive_memory_engine)
-            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Adaptive memory database initialized with factory at {sqlite_url}.")
+            self.interaction_index = InteractionVectorIndex(index_path)
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Interaction vector index opened at {index_path} with {self.interaction_index.count()} vectors.")
         except Exception as e:
-            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Error initializing adaptive memory database: {e}")
-            self.adaptive_memory_engine = None
-            self.db_session_factory = None
-
-    def _retrieve_adaptive_memory(self, query_text: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Retrieves recent interactions from the adaptive memory."""
-        if not self.design.adaptive_memory.enabled or not self.db_session_factory:
-            print(f"DEBUG_RETRIEVE_AM (Engine ID: {self.engine_instance_id}): Adaptive memory disabled or session factory not available. Returning empty list.")
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Error opening interaction vector index: {type(e).__name__} - {e}. Falling back to recent interactions.")
+            self.interaction_index = None
+            return
+
+        if self.ai_model_client:
+            self._get_background_executor().submit(self._backfill_interaction_index)
+
+    def _backfill_interaction_index(self) -> int:
+        """Embeds and indexes stored interactions without a vector (e.g. written before the relevant strategy was enabled)."""
+        if not self.interaction_index or not self.memory_store:
+            return 0
+        try:
+            indexed_ids = self.interaction_index.indexed_ids()
+            missing = [
+                self._interaction_index_entry(record)
+                for record in self.memory_store.all_records()
+                if record.id not in indexed_ids
+            ]
+            if missing:
+                print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Backfilling vectors for {len(missing)} interactions.")
+            return self._index_interactions(missing)
+        except Exception as e:
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Error backfilling interaction vector index: {type(e).__name__} - {e}")
+            return 0
+
+    @staticmethod
+    def _format_interaction_text(query: str, response: str) -> str:
+        """Text used both to embed an interaction and to present it in the prompt."""
+        return f"User: {query}\nAI: {response}"
+
+    def _on_interactions_written(self, records: List[InteractionRecordPydantic]) -> None:
+        """Called by the write-behind buffer after a batch is committed; queues the new records for vector indexing."""
+        if self.interaction_index:
+            self._get_background_executor().submit(self._index_interactions, [self._interaction_index_entry(record) for record in records])
+        self._schedule_session_summaries(records)
+
+    def _schedule_session_summaries(self, records: List[InteractionRecordPydantic]) -> None:
+        """Queues a summary update for the sessions of newly stored records, if summarization is enabled."""
+        if not self.design.adaptive_memory.summarization_enabled or not self.ai_model_client:
+            return
+        for session_id in dict.fromkeys(record.session_id for record in records if record.session_id):
+            self._get_background_executor().submit(self._summarize_session, session_id)
+
+    def _summarize_session(self, session_id: str) -> bool:
+        """Folds the oldest unsummarized turns of a session into its stored summary.
+
+        Runs while the session has at least summarize_batch_turns turns to fold beyond the
+        summary_verbatim_turns most recent ones, which are always left verbatim. Returns True if
+        the summary was updated.
+        """
+        memory_config = self.design.adaptive_memory
+        if not self.memory_store:
+            return False
+        with self._summarizing_lock:
+            if session_id in self._summarizing_sessions:
+                return False # The running update will pick up the new turns
+            self._summarizing_sessions.add(session_id)
+        updated = False
+        try:
+            while True:
+                summary = self.memory_store.get_summary(session_id)
+                pending = self.memory_store.records_after(
+                    summary.covered_through_id if summary else 0,
+                    memory_config.summarize_batch_turns + memory_config.summary_verbatim_turns,
+                    filters={"session_id": session_id}
+                )
+                if len(pending) < memory_config.summarize_batch_turns + memory_config.summary_verbatim_turns:
+                    return updated
+                batch = pending[:memory_config.summarize_batch_turns]
+                prompt = build_summary_prompt(summary.summary if summary else None, batch, memory_config.summary_max_words)
+                summary_text = (self._get_generative_model().generate_content(prompt).text or "").strip()
+                if not summary_text:
+                    print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Empty summary returned for session '{session_id}'. Keeping turns verbatim.")
+                    return updated
+                self.memory_store.save_summary(ConversationSummaryPydantic(
+                    session_id=session_id,
+                    user_id=batch[-1].user_id,
+                    summary=summary_text,
+                    covered_through_id=batch[-1].id,
+                    turns_summarized=(summary.turns_summarized if summary else 0) + len(batch)
+                ))
+                updated = True
+                print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Summarized {len(batch)} turns of session '{session_id}' through record {batch[-1].id}.")
+        except Exception as e:
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Error summarizing session '{session_id}': {type(e).__name__} - {e}")
+            return updated
+        finally:
+            with self._summarizing_lock:
+                self._summarizing_sessions.discard(session_id)
+
+    def _interaction_index_entry(self, record: InteractionRecordPydantic) -> Tuple[int, str, Dict[str, Optional[str]]]:
+        """(record ID, text to embed, scope) for an interaction record, as accepted by _index_interactions."""
+        return (
+            record.id,
+            self._format_interaction_text(record.query, record.response),
+            {"session_id": record.session_id, "user_id": record.user_id}
+        )
+
+    def _index_interactions(self, interactions: List[Tuple[int, str, Dict[str, Optional[str]]]]) -> int:
+        """Embeds (record ID, text, scope) entries and writes their vectors to the interaction index. Returns the number indexed."""
+        if not self.interaction_index or not interactions:
+            return 0
+        try:
+            embeddings = self._embed_contents_batch([text for _, text, _ in interactions], use_cache=False)
+            entries = [(record_id, embedding, scope) for (record_id, _, scope), embedding in zip(interactions, embeddings) if embedding]
+            return self.interaction_index.add(entries)
+        except Exception as e:
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Error indexing interactions: {type(e).__name__} - {e}")
+            return 0
+
+    def _format_adaptive_memory_chunk(self, record: InteractionRecordPydantic) -> Dict[str, Any]:
+        """Converts an interaction record into the context chunk format used by _build_full_prompt."""
+        return {
+            "id": record.id,
+            "text": self._format_interaction_text(record.query, record.response),
+            "query_text": record.query,
+            "response_text": record.response,
+            "timestamp": record.timestamp,
+            "metadata": record.additional_metadata
+        }
+
+    @staticmethod
+    def _format_summary_chunk(summary: ConversationSummaryPydantic) -> Dict[str, Any]:
+        """Converts a session summary into an adaptive memory context chunk (without a record ID)."""
+        return {
+            "id": None,
+            "text": format_summary_text(summary.summary),
+            "query_text": None,
+            "response_text": None,
+            "timestamp": summary.updated_at,
+            "metadata": {"type": "session_summary", "turns_summarized": summary.turns_summarized, "covered_through_id": summary.covered_through_id}
+        }
+
+    def _memory_scope(self, session_id: Optional[str], user_id: Optional[str]) -> Dict[str, str]:
+        """Column filters restricting adaptive memory retrieval to the caller, according to adaptive_memory.scope.
+
+        With the session scope, a session ID takes precedence over a user ID. Empty if no identity applies.
+        """
+        scope = self.design.adaptive_memory.scope
+        if scope == AdaptiveMemoryScope.SESSION and session_id:
+            return {"session_id": session_id}
+        if scope in (AdaptiveMemoryScope.SESSION, AdaptiveMemoryScope.USER) and user_id:
+            return {"user_id": user_id}
+        return {}
+
+    def _retrieve_relevant_interactions(self, query_text: str, limit: int, scope: Optional[Dict[str, str]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Retrieves the interactions most relevant to the query, blending vector similarity with recency.
+
+        Returns None when relevance ranking is not possible (no index, no vectors yet, or no query
+        embedding), so that the caller can fall back to recent interactions.
+        """
+        if not self.interaction_index or self.interaction_index.count() == 0:
+            return None
+        query_embedding = self._embed_content(query_text, task_type="RETRIEVAL_QUERY")
+        if not query_embedding:
+            return None
+
+        memory_config = self.design.adaptive_memory
+        candidates = self.interaction_index.search(query_embedding, limit * memory_config.relevance_candidate_multiplier, scope=scope)
+        if not candidates:
+            return None
+        distances = dict(candidates)
+
+        records = self.memory_store.get_by_ids(list(distances))
+
+        now = datetime.now(timezone.utc)
+        def blended_score(record: InteractionRecordPydantic) -> float:
+            similarity = min(1.0, max(0.0, 1.0 - distances[record.id])) # Cosine distance -> similarity
+            timestamp = record.timestamp if record.timestamp.tzinfo else record.timestamp.replace(tzinfo=timezone.utc)
+            age_hours = max(0.0, (now - timestamp).total_seconds() / 3600.0)
+            recency = 0.5 ** (age_hours / memory_config.recency_half_life_hours)
+            return (1.0 - memory_config.recency_weight) * similarity + memory_config.recency_weight * recency
+
+        selected = sorted(records, key=blended_score, reverse=True)[:limit]
+        # Newest first, like the recent strategy, so the prompt shows the selected turns in chronological order
+        selected.sort(key=lambda record: record.timestamp, reverse=True)
+        print(f"DEBUG_RETRIEVE_AM (Engine ID: {self.engine_instance_id}): Retrieved {len(selected)} relevant records from {len(candidates)} candidates.")
+        return [self._format_adaptive_memory_chunk(record) for record in selected]
+
+    def _retrieve_adaptive_memory(self, query_text: str, limit: Optional[int] = None, session_id: Optional[str] = None, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Retrieves interactions from the adaptive memory: the most relevant ones for the 'relevant' strategy, otherwise the most recent.
+
+        If a session or user ID is given, only that session's or user's interactions are considered (see adaptive_memory.scope).
+        With summarization enabled, a session's recent interactions are those after its stored summary, which is returned last.
+        """
+        if not self.design.adaptive_memory.enabled or not self.memory_store:
+            print(f"DEBUG_RETRIEVE_AM (Engine ID: {self.engine_instance_id}): Adaptive memory disabled or memory store not available. Returning empty list.")
             return []
 
-        db_session = self.db_session_factory()
+        actual_limit = limit if limit is not None else self.design.adaptive_memory.retrieval_limit
+        scope = self._memory_scope(session_id, user_id)
+        if self.design.adaptive_memory.strategy == AdaptiveMemoryStrategy.RELEVANT:
+            try:
+                relevant_chunks = self._retrieve_relevant_interactions(query_text, actual_limit, scope=scope)
+                if relevant_chunks is not None:
+                    return relevant_chunks
+            except Exception as e:
+                print(f"DEBUG_RETRIEVE_AM (Engine ID: {self.engine_instance_id}): Error retrieving relevant interactions: {type(e).__name__} - {e}. Falling back to recent interactions.")
+
         try:
-            actual_limit = limit if limit is not None else self.design.adaptive_memory.retrieval_limit
-            print(f"DEBUG_RETRIEVE_AM (Engine ID: {self.engine_instance_id}): Retrieving last {actual_limit} interactions.")
-            
-            recent_records_orm = (
-                db_session.query(InteractionRecordORM)
-                .order_by(desc(InteractionRecordORM.timestamp))
-                .limit(actual_limit)
-                .all()
-            )
+            print(f"DEBUG_RETRIEVE_AM (Engine ID: {self.engine_instance_id}): Retrieving last {actual_limit} interactions. Scope: {scope or 'global'}")
             
-            recent_records_pydantic = [
-                InteractionRecordPydantic.model_validate(record) for record in recent_records_orm
-            ]
-            print(f"DEBUG_RETRIEVE_AM (Engine ID: {self.engine_instance_id}): Retrieved {len(recent_records_pydantic)} records.")
+            summary = None
+            if self.design.adaptive_memory.summarization_enabled and "session_id" in scope:
+                summary = self.memory_store.get_summary(scope["session_id"])
+            recent_records_pydantic = self.memory_store.recent(actual_limit, filters=scope, after_id=summary.covered_through_id if summary else None)
+            print(f"DEBUG_RETRIEVE_AM (Engine ID: {self.engine_instance_id}): Retrieved {len(recent_records_pydantic)} records{' after the session summary' if summary else ''}.")
             # Format for prompt - this format might need adjustment based on how it's used in the prompt
-            return [
-                {
-                    "text": f"User: {record.query}\nAI: {record.response}",
-                    "query_text": record.query,
-                    "response_text": record.response,
-                    "timestamp": record.timestamp,
-                    "metadata": record.additional_metadata
-                }
-                for record in recent_records_pydantic
-            ]
+            chunks = [self._format_adaptive_memory_chunk(record) for record in recent_records_pydantic]
+            if summary:
+                chunks.append(self._format_summary_chunk(summary)) # Oldest context, so it comes last (newest first order)
+            return chunks
         except Exception as e:
             print(f"DEBUG_RETRIEVE_AM (Engine ID: {self.engine_instance_id}): Error retrieving adaptive memory: {type(e).__name__} - {e}")
             return []
-        finally:
-            db_session.close()
 
-    def _retrieve_fixed_knowledge(self, query_text: str, limit: int = 3) -> List[Dict[str, Any]]:
-        """Retrieves relevant fixed knowledge chunks from LanceDB based on the query text."""
+    def _retrieve_fixed_knowledge(self, query_text: str, limit: int = 3, query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Retrieves relevant fixed knowledge chunks from LanceDB based on the query text.
+
+        query_embedding is the query's embedding if the caller already has it.
+        """
         print(f"DEBUG_RETRIEVE_FK (Engine ID: {self.engine_instance_id}): _retrieve_fixed_knowledge called. Query: '{query_text[:100]}...', Limit: {limit}")
 
         if not self.lancedb_table:
@@ -481,129 +1027,197 @@ class AMMEngine:
             print(f"DEBUG_RETRIEVE_FK (Engine ID: {self.engine_instance_id}): AI model client not initialized. Cannot generate query embedding. Returning empty list.")
             return []
 
-        query_embedding = self._embed_content(query_text, task_type="RETRIEVAL_QUERY")
+        query_embedding = query_embedding or self._embed_content(query_text, task_type="RETRIEVAL_QUERY")
         if not query_embedding:
             print(f"DEBUG_RETRIEVE_FK (Engine ID: {self.engine_instance_id}): Failed to generate query embedding. Returning empty list.")
             return []
 
+        return self._search_fixed_knowledge(query_embedding, limit)
+
+    def _fixed_knowledge_stage(self, query_text: str, limit: int) -> Tuple[List[Dict[str, Any]], Optional[List[float]]]:
+        """Fixed knowledge retrieval stage. Returns (chunks, query embedding) so the response cache can reuse the embedding."""
+        query_embedding = self._embed_content(query_text, task_type="RETRIEVAL_QUERY") if self.ai_model_client else None
+        return self._retrieve_fixed_knowledge(query_text, limit=limit, query_embedding=query_embedding), query_embedding
+
+    def _search_fixed_knowledge(self, query_embedding: List[float], limit: int) -> List[Dict[str, Any]]:
+        """Runs the LanceDB vector search for an already computed query embedding."""
         try:
             print(f"DEBUG_RETRIEVE_FK (Engine ID: {self.engine_instance_id}): Searching LanceDB table '{LANCEDB_TABLE_NAME}' with query embedding. Limit: {limit}")
-            search_results = self.lancedb_table.search(query_embedding).limit(limit).to_list()
+            query = self.lancedb_table.search(query_embedding)
+            if self.vector_index_type:
+                index_config = self.design.vector_index
+                query = query.nprobes(index_config.nprobes)
+                if index_config.refine_factor:
+                    query = query.refine_factor(index_config.refine_factor)
+            search_results = query.limit(limit).to_list()
             print(f"DEBUG_RETRIEVE_FK (Engine ID: {self.engine_instance_id}): Found {len(search_results)} results from LanceDB.")
-            # Each result is a dict, e.g., {'id': '...', 'text': '...', 'vector': [...], 'source_name': '...', 'metadata': {...}, '_distance': ...}
+            # Each result is a dict, e.g., {'id': '...', 'text': '...', 'vector': [...], 'source': '...', '_distance': ...}
             return search_results
         except Exception as e:
             print(f"DEBUG_RETRIEVE_FK (Engine ID: {self.engine_instance_id}): ERROR searching LanceDB: {type(e).__name__} - {e}")
             return []
 
-    def process_query(self, query_text: str) -> str:
-        """Processes a user query by retrieving context, forming a prompt, and querying the AI model."""
-        print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): process_query received query: '{query_text}'")
+    def _build_full_prompt(self, query_text: str, fixed_knowledge_chunks: List[Dict[str, Any]], adaptive_context_chunks: List[Dict[str, Any]]) -> str:
+        """Assembles the system instruction, retrieved context and the current query into the model prompt."""
+        return self._assemble_prompt(query_text, fixed_knowledge_chunks, adaptive_context_chunks)[0]
 
-        # 1. Retrieve Fixed Knowledge Context
-        fixed_knowledge_chunks: List[Dict[str, Any]] = []
-        print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): LanceDB table exists: {self.lancedb_table is not None}")
-        if hasattr(self, 'lancedb_table_name'):
-            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): LanceDB table name: {self.lancedb_table_name}")
-        if hasattr(self.lancedb_table, 'name') and self.lancedb_table is not None:
-            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): LanceDB table object name: {self.lancedb_table.name}")
-        
-        if self.lancedb_table: # Check if fixed knowledge is usable
-            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): About to call _retrieve_fixed_knowledge with query: '{query_text[:50]}...'")
-            # Use a default limit, e.g., 3. This could be made configurable later.
-            fixed_knowledge_chunks = self._retrieve_fixed_knowledge(query_text, limit=3)
-            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): _retrieve_fixed_knowledge returned {len(fixed_knowledge_chunks)} chunks")
-        else:
-            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Skipping fixed knowledge retrieval because lancedb_table is None")
-        
-        fixed_knowledge_context_str = self._format_fixed_knowledge_for_prompt(fixed_knowledge_chunks)
-        if fixed_knowledge_context_str == "No relevant fixed knowledge found.":
+    def _render_prompt(self, query_text: str, fixed_knowledge_context_str: str, adaptive_memory_context_str: str) -> str:
+        system_instruction = self.design.agent_prompts.system_instruction
+        return f"{system_instruction}\n\n--- Fixed Knowledge Context ---\n{fixed_knowledge_context_str}\n\n--- Conversation History (Adaptive Memory) ---\n{adaptive_memory_context_str}\n\n--- Current Query ---\nUser: {query_text}\nAI:"
+
+    def _assemble_prompt(self, query_text: str, fixed_knowledge_chunks: List[Dict[str, Any]], adaptive_context_chunks: List[Dict[str, Any]], conversational: bool = False) -> Tuple[str, Dict[str, Any]]:
+        """Builds the prompt within the design's prompt budget and reports what went into it.
+
+        Context chunks are expected in priority order (fixed knowledge by relevance, adaptive memory
+        newest first) and are packed into the tokens the instruction and query leave free. Returns
+        (prompt, stats) where stats holds the estimated prompt_tokens, the fixed knowledge and
+        adaptive memory chunks that were included, and whether any context was truncated or dropped.
+        With the response cache enabled, stats also holds the context_fingerprint; the conversation
+        history is part of it only for conversational queries (those with a session or user ID).
+        """
+        budget_config = self.design.prompt_budget
+        no_fixed_knowledge = "No relevant fixed knowledge found."
+        no_history = "No conversation history available."
+        fixed_entries = [self._format_fixed_knowledge_entry(i, chunk) for i, chunk in enumerate(fixed_knowledge_chunks)]
+        adaptive_entries = [chunk['text'] for chunk in adaptive_context_chunks]
+        context_truncated = False
+        if budget_config.max_prompt_tokens is not None:
+            overhead_tokens = estimate_tokens(self._render_prompt(query_text, no_fixed_knowledge, no_history), budget_config.chars_per_token)
+            fixed_entries, adaptive_entries, context_truncated = pack_context(
+                fixed_entries,
+                adaptive_entries,
+                budget_config.max_prompt_tokens - overhead_tokens,
+                fixed_share=budget_config.fixed_knowledge_share,
+                chars_per_token=budget_config.chars_per_token,
+                min_fragment_tokens=budget_config.min_truncated_chunk_tokens
+            )
+            if context_truncated:
+                print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Context exceeds the {budget_config.max_prompt_tokens}-token prompt budget. Kept {len(fixed_entries)}/{len(fixed_knowledge_chunks)} fixed knowledge and {len(adaptive_entries)}/{len(adaptive_context_chunks)} adaptive memory chunks.")
+
+        fixed_knowledge_context_str = "\n\n".join(fixed_entries) or no_fixed_knowledge
+        if not fixed_entries:
             # This print statement is for the test assertion
             print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): No fixed knowledge chunks retrieved or fixed knowledge not enabled/usable.")
 
-        # 2. Retrieve Adaptive Memory Context
-        self.logger.debug(f"PROCESS_QUERY_ADAPTIVE_CHECK: Design Adaptive Memory Enabled: {self.design.adaptive_memory.enabled}")
-        self.logger.debug(f"PROCESS_QUERY_ADAPTIVE_CHECK: DB Session factory available (is not None): {self.db_session_factory is not None}")
-        # The isinstance(MagicMock) check was removed as MagicMock is not available in engine code.
-        if self.db_session_factory is not None:
-            self.logger.debug(f"PROCESS_QUERY_ADAPTIVE_CHECK: DB Session factory is of type {type(self.db_session_factory)}.")
-
-        adaptive_context_chunks: List[Dict[str, Any]] = []
-        if self.design.adaptive_memory.enabled and self.db_session_factory: # Use self.db_session_factory
-            self.logger.debug("PROCESS_QUERY_ADAPTIVE_LOGIC: Condition was TRUE. Attempting to retrieve adaptive memory.")
-            adaptive_context_chunks = self._retrieve_adaptive_memory(
-                query_text=query_text, # Pass query_text
-                limit=self.design.adaptive_memory.retrieval_limit
-            )
-            self.logger.debug(f"PROCESS_QUERY_ADAPTIVE_LOGIC: Retrieved {len(adaptive_context_chunks)} adaptive memory chunks.")
-        else:
-            self.logger.debug(
-                f"PROCESS_QUERY_ADAPTIVE_LOGIC: Condition was FALSE. Adaptive memory retrieval skipped. Enabled: {self.design.adaptive_memory.enabled}, DB Session factory valid: {self.db_session_factory is not None}"
-            )
-            # adaptive_context_chunks remains empty list
-        
-        adaptive_memory_context_str = "No conversation history available."
-        if adaptive_context_chunks:
-            # _retrieve_adaptive_memory returns List[Dict[str, Any]] where each dict has a 'text' key
-            # The 'text' is already formatted like "User: ...\nAI: ..."
-            # To match existing test logic of newest last / oldest first in prompt, reverse if needed.
-            # Let's assume _retrieve_adaptive_memory returns newest first (chronological) or by relevance (semantic).
-            # For prompt construction, oldest user/AI turn first is typical.
-            formatted_interactions = [
-                chunk['text'] 
-                for chunk in reversed(adaptive_context_chunks) # Reverse to show oldest first in prompt
-            ]
-            adaptive_memory_context_str = "\n\n".join(formatted_interactions) # Use double newline for better separation
+        adaptive_memory_context_str = no_history
+        if adaptive_entries:
+            # Adaptive memory arrives newest first; show the oldest user/AI turn first in the prompt
+            adaptive_memory_context_str = "\n\n".join(reversed(adaptive_entries)) # Use double newline for better separation
             self.logger.debug(f"PROCESS_QUERY: Retrieved {len(adaptive_context_chunks)} adaptive memory records. Context length: {len(adaptive_memory_context_str)}")
         else:
             self.logger.debug("PROCESS_QUERY: No adaptive memory records retrieved or adaptive memory disabled.")
 
-        # 3. Construct the full prompt
-        system_instruction = self.design.agent_prompts.system_instruction
-        full_prompt = f"{system_instruction}\n\n--- Fixed Knowledge Context ---\n{fixed_knowledge_context_str}\n\n--- Conversation History (Adaptive Memory) ---\n{adaptive_memory_context_str}\n\n--- Current Query ---\nUser: {query_text}\nAI:"
+        full_prompt = self._render_prompt(query_text, fixed_knowledge_context_str, adaptive_memory_context_str)
+        prompt_stats = {
+            "prompt_tokens": estimate_tokens(full_prompt, budget_config.chars_per_token),
+            "fixed_knowledge_chunks": fixed_knowledge_chunks[:len(fixed_entries)],
+            "adaptive_memory_chunks": adaptive_context_chunks[:len(adaptive_entries)],
+            "context_truncated": context_truncated,
+        }
+        if self.response_cache is not None:
+            # Everything the response depends on besides the query itself. Without a session or user the
+            # history is just the latest interactions of anyone (including the previous answer), so it is
+            # left out; otherwise a repeated query could never hit.
+            history_for_fingerprint = adaptive_memory_context_str if conversational else no_history
+            prompt_stats["context_fingerprint"] = hash_text(json.dumps(
+                [self._render_prompt("", fixed_knowledge_context_str, history_for_fingerprint), *self._generation_settings()]
+            ))
+        print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Constructed full prompt. Length: {len(full_prompt)} (~{prompt_stats['prompt_tokens']} tokens). Preview: {full_prompt[:300]}...")
+        return full_prompt, prompt_stats
 
-        print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Constructed full prompt. Length: {len(full_prompt)}. Preview: {full_prompt[:300]}...")
+    @staticmethod
+    def _query_result(response_text: str, prompt_stats: Dict[str, Any], cache_hit: bool = False) -> Dict[str, Any]:
+        """The detailed result of a query: the response plus what the prompt was built from."""
+        return {
+            "response": response_text,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "prompt_tokens": prompt_stats["prompt_tokens"],
+            "context_truncated": prompt_stats["context_truncated"],
+            "cache_hit": cache_hit,
+            "knowledge_sources_used": list(dict.fromkeys(chunk.get("source_name", "Unknown Source") for chunk in prompt_stats["fixed_knowledge_chunks"])),
+            "memory_records_used": [chunk["id"] for chunk in prompt_stats["adaptive_memory_chunks"] if chunk.get("id") is not None],
+        }
 
-        if not self.ai_model_client:
-            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): AI model client not initialized. Cannot generate response.")
-            return "Error: AI model client not initialized."
+    def _get_cached_response(self, query_embedding: Optional[List[float]], prompt_stats: Dict[str, Any]) -> Optional[str]:
+        """Returns a cached response for a similar query with the same context, or None (also if the cache is disabled)."""
+        if self.response_cache is None or not query_embedding:
+            return None
+        cached = self.response_cache.get(query_embedding, prompt_stats["context_fingerprint"])
+        if cached is None:
+            return None
+        response_text, similarity = cached
+        print(f"DEBUG_RESPONSE_CACHE (Engine ID: {self.engine_instance_id}): Response cache hit (similarity {similarity:.3f}). Skipping generation.")
+        return response_text
+
+    def _cache_response(self, query_embedding: Optional[List[float]], prompt_stats: Dict[str, Any], response_text: str) -> None:
+        """Stores a successfully generated response in the response cache, if enabled."""
+        if self.response_cache is not None and query_embedding and response_text:
+            self.response_cache.put(query_embedding, prompt_stats["context_fingerprint"], response_text)
+
+    def _generation_settings(self) -> Tuple[str, tuple]:
+        """(model name, generation parameters) used for responses; the model name may be overridden by the MODEL env var."""
+        # Get model name from environment variable if available, otherwise use the one from design
+        gemini_config = self.design.gemini_config
+        model_name = os.environ.get('MODEL') or gemini_config.model_name
+        model_name = model_name.value if isinstance(model_name, GeminiModelType) else model_name
+        generation_params = (
+            gemini_config.temperature,
+            gemini_config.top_p if gemini_config.top_p is not None else 0.9,
+            gemini_config.top_k if gemini_config.top_k is not None else 40,
+            gemini_config.max_output_tokens
+        )
+        return model_name, generation_params
+
+    def _get_generative_model(self):
+        """Returns a Gemini GenerativeModel configured from the design (model name may be overridden by the MODEL env var).
+
+        Configured models are pooled per (client, model name, generation parameters), so a model is only
+        built again when the design or the MODEL environment variable actually changes.
+        """
+        model_name, generation_params = self._generation_settings()
+        print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Sending request to Gemini model '{model_name}'.")
+
+        pool_key = (id(self.ai_model_client), model_name, generation_params)
+        with self._generative_models_lock:
+            model = self._generative_models.get(pool_key)
+            if model is not None:
+                self._generative_models.move_to_end(pool_key)
+                return model
 
-        try:
-            # Get model name from environment variable if available, otherwise use the one from design
-            model_name = os.environ.get('MODEL') or self.design.gemini_config.model_name
-            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Sending request to Gemini model '{model_name}'.")
-            
             # Configure generation parameters from AMMDesign
+            temperature, top_p, top_k, max_output_tokens = generation_params
             generation_config = genai.types.GenerationConfig(
-                temperature=self.design.gemini_config.temperature,
-                top_p=self.design.gemini_config.top_p if self.design.gemini_config.top_p is not None else 0.9,
-                top_k=self.design.gemini_config.top_k if self.design.gemini_config.top_k is not None else 40,
-                max_output_tokens=self.design.gemini_config.max_output_tokens
+                temperature=temperature,
+                top_p=top_p,
+                top_k=top_k,
+                max_output_tokens=max_output_tokens
             )
-            
             # Create a GenerativeModel instance with the model name from environment or design
             model = self.ai_model_client.GenerativeModel(
                 model_name=model_name,
                 generation_config=generation_config
             )
-            
-            # Generate content using the model
-            response = model.generate_content(full_prompt)
-            ai_response_text = response.text
-            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Received response from Gemini. Length: {len(ai_response_text)}. Preview: {ai_response_text[:100]}...")
-        except Exception as e:
-            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): ERROR during Gemini API call: {type(e).__name__} - {e}")
-            ai_response_text = f"Error processing query: {e}"
+            self._generative_models[pool_key] = model
+            while len(self._generative_models) > GENERATIVE_MODEL_POOL_SIZE:
+                self._generative_models.popitem(last=False)
+            return model
 
-        # Store interaction in adaptive memory if enabled
+    def _store_interaction(self, query_text: str, ai_response_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> None:
+        """Stores a completed query/response pair in adaptive memory if it is enabled."""
         try:
-            if self.design.adaptive_memory.enabled and self.db_session_factory:
+            if self.design.adaptive_memory.enabled and self.memory_store:
                 interaction_to_store = InteractionRecordPydantic(
+                    session_id=session_id,
+                    user_id=user_id,
                     query=query_text, 
                     response=ai_response_text, 
                     timestamp=datetime.now(timezone.utc), 
                     additional_metadata={"engine_instance_id": self.engine_instance_id, "source": "amm_engine_process_query"}
                 )
+                if self.interaction_writer and self.interaction_writer.submit(interaction_to_store):
+                    # Persisted by the write-behind buffer on its next flush
+                    print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Queued interaction for write-behind storage.")
+                    return
                 record_id = self.add_interaction_record(interaction_to_store)
                 if record_id:
                     print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Stored interaction in adaptive memory with ID: {record_id}.")
@@ -615,64 +1229,413 @@ class AMMEngine:
             print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Error storing interaction in adaptive memory: {e}")
             # Continue despite error - we don't want to lose the response if memory storage fails
 
-        return ai_response_text
+    def _should_retrieve_adaptive_memory(self) -> bool:
+        """Returns True if adaptive memory is enabled and its database is available."""
+        self.logger.debug(f"PROCESS_QUERY_ADAPTIVE_CHECK: Design Adaptive Memory Enabled: {self.design.adaptive_memory.enabled}")
+        self.logger.debug(f"PROCESS_QUERY_ADAPTIVE_CHECK: Memory store available (is not None): {self.memory_store is not None}")
+        if self.design.adaptive_memory.enabled and self.memory_store:
+            return True
+        self.logger.debug(
+            f"PROCESS_QUERY_ADAPTIVE_LOGIC: Condition was FALSE. Adaptive memory retrieval skipped. Enabled: {self.design.adaptive_memory.enabled}, Memory store valid: {self.memory_store is not None}"
+        )
+        return False
+
+    def _query_memory_scope(self):
+        """Context manager around one query's adaptive memory work; the SQL store serves it from a single pooled session."""
+        return self.memory_store.query_scope() if self.memory_store else nullcontext()
+
+    def _get_io_executor(self) -> ThreadPoolExecutor:
+        """Returns the engine's thread pool for blocking LanceDB/SQLite work, creating it on first use."""
+        with self._io_executor_lock:
+            if self._io_executor is None:
+                self._io_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix=f"amm-io-{self.engine_instance_id}")
+            return self._io_executor
+
+    def _get_background_executor(self) -> ThreadPoolExecutor:
+        """Returns the engine's small thread pool for deferred work, creating it on first use.
+
+        Indexing and summaries may block on Gemini for seconds; running them here keeps the
+        I/O executor free for the time-budgeted retrieval stages of live queries.
+        """
+        with self._background_executor_lock:
+            if self._background_executor is None:
+                self._background_executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix=f"amm-bg-{self.engine_instance_id}")
+            return self._background_executor
+
+    def _retrieve_context(self, query_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[List[float]]]:
+        """Retrieves fixed knowledge and adaptive memory concurrently, each within its own time budget.
+
+        A stage that fails or exceeds its budget contributes no context; it keeps running on the
+        I/O executor but its result is discarded. Returns (fixed_knowledge_chunks, adaptive_context_chunks,
+        query_embedding); query_embedding is None unless the fixed knowledge stage embedded the query.
+        """
+        retrieval_config = self.design.retrieval
+        executor = self._get_io_executor()
+        stages: Dict[str, Tuple[Any, Optional[float]]] = {}
+
+        print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): LanceDB table exists: {self.lancedb_table is not None}")
+        if self.lancedb_table: # Check if fixed knowledge is usable
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): About to call _retrieve_fixed_knowledge with query: '{query_text[:50]}...'")
+            stages["fixed_knowledge"] = (
+                executor.submit(contextvars.copy_context().run, self._fixed_knowledge_stage, query_text, limit=retrieval_config.fixed_knowledge_limit),
+                retrieval_config.fixed_knowledge_timeout_seconds
+            )
+        else:
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Skipping fixed knowledge retrieval because lancedb_table is None")
+
+        if self._should_retrieve_adaptive_memory():
+            stages["adaptive_memory"] = (
+                executor.submit(
+                    contextvars.copy_context().run, # Carries the query's memory scope (shared session)
+                    self._retrieve_adaptive_memory,
+                    query_text=query_text,
+                    limit=self.design.adaptive_memory.retrieval_limit,
+                    session_id=session_id,
+                    user_id=user_id
+                ),
+                retrieval_config.adaptive_memory_timeout_seconds
+            )
+
+        # Budgets are measured from when both stages were started, not from when we begin waiting on each one
+        started_at = time.monotonic()
+        results: Dict[str, Any] = {}
+        for stage_name, (future, timeout_seconds) in stages.items():
+            remaining = None if timeout_seconds is None else max(0.0, started_at + timeout_seconds - time.monotonic())
+            try:
+                results[stage_name] = future.result(timeout=remaining) or []
+            except FuturesTimeoutError:
+                future.cancel()
+                print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): {stage_name} retrieval exceeded its {timeout_seconds}s budget. Continuing without it.")
+                results[stage_name] = []
+            except Exception as e:
+                print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): ERROR during {stage_name} retrieval: {type(e).__name__} - {e}")
+                results[stage_name] = []
+
+        fixed_knowledge_chunks, query_embedding = results.get("fixed_knowledge") or ([], None)
+        adaptive_context_chunks = results.get("adaptive_memory", [])
+        if "fixed_knowledge" in stages:
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): _retrieve_fixed_knowledge returned {len(fixed_knowledge_chunks)} chunks")
+        if "adaptive_memory" in stages:
+            self.logger.debug(f"PROCESS_QUERY_ADAPTIVE_LOGIC: Retrieved {len(adaptive_context_chunks)} adaptive memory chunks.")
+        return fixed_knowledge_chunks, adaptive_context_chunks, query_embedding
+
+    def process_query(self, query_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> str:
+        """Processes a user query by retrieving context, forming a prompt, and querying the AI model.
+
+        session_id and user_id are stored with the interaction and scope adaptive memory retrieval to that conversation or user.
+        """
+        return self.process_query_detailed(query_text, session_id=session_id, user_id=user_id)["response"]
+
+    def process_query_detailed(self, query_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Like process_query, but returns a dict with the response and prompt metadata.
+
+        Keys: response, timestamp, prompt_tokens (estimated), context_truncated, cache_hit (response served
+        from the response cache), knowledge_sources_used and memory_records_used (IDs of the adaptive
+        memory records in the prompt).
+        """
+        print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): process_query received query: '{query_text}'")
+        with self._query_memory_scope():
+            return self._process_query(query_text, session_id=session_id, user_id=user_id)
+
+    def _process_query(self, query_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> Dict[str, Any]:
+        # 1. Retrieve Fixed Knowledge and Adaptive Memory Context (concurrently, each with a time budget)
+        fixed_knowledge_chunks, adaptive_context_chunks, query_embedding = self._retrieve_context(query_text, session_id=session_id, user_id=user_id)
+
+        # 2. Construct the full prompt within the prompt budget
+        full_prompt, prompt_stats = self._assemble_prompt(query_text, fixed_knowledge_chunks, adaptive_context_chunks, conversational=bool(session_id or user_id))
+
+        if not self.ai_model_client:
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): AI model client not initialized. Cannot generate response.")
+            return self._query_result("Error: AI model client not initialized.", prompt_stats)
+
+        if self.response_cache is not None and not query_embedding:
+            # Fixed knowledge retrieval did not embed the query (no table, or the stage failed or ran out of time)
+            query_embedding = self._embed_content(query_text, task_type="RETRIEVAL_QUERY")
+        cached_response = self._get_cached_response(query_embedding, prompt_stats)
+        if cached_response is not None:
+            self._store_interaction(query_text, cached_response, session_id=session_id, user_id=user_id)
+            return self._query_result(cached_response, prompt_stats, cache_hit=True)
+
+        try:
+            model = self._get_generative_model()
+            # Generate content using the model
+            response = model.generate_content(full_prompt)
+            ai_response_text = response.text
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Received response from Gemini. Length: {len(ai_response_text)}. Preview: {ai_response_text[:100]}...")
+            self._cache_response(query_embedding, prompt_stats, ai_response_text)
+        except Exception as e:
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): ERROR during Gemini API call: {type(e).__name__} - {e}")
+            ai_response_text = f"Error processing query: {e}"
+
+        # Store interaction in adaptive memory if enabled
+        self._store_interaction(query_text, ai_response_text, session_id=session_id, user_id=user_id)
+        return self._query_result(ai_response_text, prompt_stats)
+
+    # --- Async API (for the MCP server's event loop) --- #
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Runs a blocking call on the engine's I/O executor without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context() # run_in_executor does not propagate context variables by itself
+        return await loop.run_in_executor(self._get_io_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+    async def _request_embeddings_async(self, content: Union[str, List[str]], task_type: str) -> Dict[str, Any]:
+        """Awaitable genai.embed_content_async with the same retry/backoff policy as _request_embeddings."""
+        embedding_config = self.design.embedding
+        attempt = 0
+        while True:
+            try:
+                return await genai.embed_content_async(
+                    model=self.embedding_model_name,
+                    content=content,
+                    task_type=task_type
+                )
+            except Exception as e:
+                if attempt >= embedding_config.max_retries or not self._is_retryable_embedding_error(e):
+                    raise
+                delay = self._embedding_retry_delay(attempt)
+                attempt += 1
+                self.logger.warning(f"Embedding request rate-limited ({type(e).__name__}). Retry {attempt}/{embedding_config.max_retries} in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+
+    async def _embed_content_async(self, text_to_embed: str, task_type: str = "RETRIEVAL_DOCUMENT") -> Optional[List[float]]:
+        """Awaitable variant of _embed_content. Query embeddings use the async Gemini API and the in-process cache."""
+        if task_type != "RETRIEVAL_QUERY":
+            # Document embeddings touch the on-disk cache; keep that off the event loop
+            return await self._run_blocking(self._embed_content, text_to_embed, task_type=task_type)
+
+        if not self.ai_model_client or not self.embedding_model_name:
+            self.logger.warning(f"Embedding not attempted: AI model client or embedding model name not set.")
+            return None
+        if self.query_embedding_cache is not None:
+            cached_embedding = self.query_embedding_cache.get(self.embedding_model_name, text_to_embed)
+            if cached_embedding is not None:
+                print(f"DEBUG_EMBED (Engine ID: {self.engine_instance_id}): Query embedding cache hit.")
+                return cached_embedding
+        try:
+            result = await self._request_embeddings_async(text_to_embed, task_type=task_type)
+            embedding = result['embedding']
+            if embedding and self.query_embedding_cache is not None:
+                self.query_embedding_cache.put(self.embedding_model_name, text_to_embed, embedding)
+            return embedding
+        except Exception as e:
+            self.logger.error(f"ERROR generating embedding: {type(e).__name__} - {e}")
+            return None
+
+    async def _retrieve_fixed_knowledge_async(self, query_text: str, limit: int = 3, query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Awaitable variant of _retrieve_fixed_knowledge; the LanceDB search runs on the I/O executor."""
+        if not self.lancedb_table or not self.ai_model_client:
+            return []
+        query_embedding = query_embedding or await self._embed_content_async(query_text, task_type="RETRIEVAL_QUERY")
+        if not query_embedding:
+            print(f"DEBUG_RETRIEVE_FK (Engine ID: {self.engine_instance_id}): Failed to generate query embedding. Returning empty list.")
+            return []
+        return await self._run_blocking(self._search_fixed_knowledge, query_embedding, limit)
+
+    async def _fixed_knowledge_stage_async(self, query_text: str, limit: int) -> Tuple[List[Dict[str, Any]], Optional[List[float]]]:
+        """Awaitable variant of _fixed_knowledge_stage."""
+        query_embedding = await self._embed_content_async(query_text, task_type="RETRIEVAL_QUERY") if self.ai_model_client else None
+        return await self._retrieve_fixed_knowledge_async(query_text, limit=limit, query_embedding=query_embedding), query_embedding
+
+    async def _run_retrieval_stage(self, stage_name: str, coroutine, timeout_seconds: Optional[float]) -> Any:
+        """Awaits one retrieval stage within its time budget, degrading to an empty result on timeout or error."""
+        try:
+            return await asyncio.wait_for(coroutine, timeout=timeout_seconds) or []
+        except asyncio.TimeoutError:
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): {stage_name} retrieval exceeded its {timeout_seconds}s budget. Continuing without it.")
+        except Exception as e:
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): ERROR during {stage_name} retrieval: {type(e).__name__} - {e}")
+        return []
+
+    async def _retrieve_context_async(self, query_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[List[float]]]:
+        """Awaitable variant of _retrieve_context: both stages run concurrently, each within its own time budget."""
+        retrieval_config = self.design.retrieval
+
+        async def no_context() -> List[Dict[str, Any]]:
+            return []
+
+        if self.lancedb_table:
+            fixed_knowledge_stage = self._run_retrieval_stage(
+                "fixed_knowledge",
+                self._fixed_knowledge_stage_async(query_text, limit=retrieval_config.fixed_knowledge_limit),
+                retrieval_config.fixed_knowledge_timeout_seconds
+            )
+        else:
+            fixed_knowledge_stage = no_context()
+        if self._should_retrieve_adaptive_memory():
+            adaptive_memory_stage = self._run_retrieval_stage(
+                "adaptive_memory",
+                self._run_blocking(
+                    self._retrieve_adaptive_memory,
+                    query_text=query_text,
+                    limit=self.design.adaptive_memory.retrieval_limit,
+                    session_id=session_id,
+                    user_id=user_id
+                ),
+                retrieval_config.adaptive_memory_timeout_seconds
+            )
+        else:
+            adaptive_memory_stage = no_context()
+
+        fixed_knowledge_result, adaptive_context_chunks = await asyncio.gather(fixed_knowledge_stage, adaptive_memory_stage)
+        fixed_knowledge_chunks, query_embedding = fixed_knowledge_result or ([], None)
+        return fixed_knowledge_chunks, adaptive_context_chunks, query_embedding
+
+    async def _prepare_prompt_async(self, query_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> Tuple[str, Dict[str, Any], Optional[List[float]]]:
+        """Retrieves fixed knowledge and adaptive memory without blocking the event loop and builds the prompt.
+
+        Returns (prompt, stats, query embedding), where the query embedding is embedded for the response cache
+        if retrieval did not produce one.
+        """
+        fixed_knowledge_chunks, adaptive_context_chunks, query_embedding = await self._retrieve_context_async(query_text, session_id=session_id, user_id=user_id)
+        full_prompt, prompt_stats = self._assemble_prompt(query_text, fixed_knowledge_chunks, adaptive_context_chunks, conversational=bool(session_id or user_id))
+        if self.response_cache is not None and not query_embedding and self.ai_model_client:
+            # Fixed knowledge retrieval did not embed the query (no table, or the stage failed or ran out of time)
+            query_embedding = await self._embed_content_async(query_text, task_type="RETRIEVAL_QUERY")
+        return full_prompt, prompt_stats, query_embedding
+
+    async def process_query_async(self, query_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> str:
+        """Async variant of process_query that never blocks the event loop.
+
+        Embedding and generation use the async Gemini APIs; LanceDB and SQLite work runs on the
+        engine's I/O executor, so one slow request does not stall other connections.
+        """
+        return (await self.process_query_detailed_async(query_text, session_id=session_id, user_id=user_id))["response"]
+
+    async def process_query_detailed_async(self, query_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Async variant of process_query_detailed."""
+        print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): process_query_async received query: '{query_text}'")
+        with self._query_memory_scope():
+            return await self._process_query_async(query_text, session_id=session_id, user_id=user_id)
+
+    async def _process_query_async(self, query_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> Dict[str, Any]:
+        full_prompt, prompt_stats, query_embedding = await self._prepare_prompt_async(query_text, session_id=session_id, user_id=user_id)
+
+        if not self.ai_model_client:
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): AI model client not initialized. Cannot generate response.")
+            return self._query_result("Error: AI model client not initialized.", prompt_stats)
+
+        cached_response = self._get_cached_response(query_embedding, prompt_stats)
+        if cached_response is not None:
+            await self._run_blocking(self._store_interaction, query_text, cached_response, session_id=session_id, user_id=user_id)
+            return self._query_result(cached_response, prompt_stats, cache_hit=True)
+
+        try:
+            model = self._get_generative_model()
+            response = await model.generate_content_async(full_prompt)
+            ai_response_text = response.text
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Received response from Gemini. Length: {len(ai_response_text)}. Preview: {ai_response_text[:100]}...")
+            self._cache_response(query_embedding, prompt_stats, ai_response_text)
+        except Exception as e:
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): ERROR during Gemini API call: {type(e).__name__} - {e}")
+            ai_response_text = f"Error processing query: {e}"
+
+        await self._run_blocking(self._store_interaction, query_text, ai_response_text, session_id=session_id, user_id=user_id)
+        return self._query_result(ai_response_text, prompt_stats)
+
+    async def stream_query_async(self, query_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Processes a query like process_query_async but yields the response text chunk by chunk as Gemini produces it.
+
+        The complete response is stored in adaptive memory once the stream has finished. If the consumer
+        stops iterating early (e.g. the client disconnected), the partial response is not stored.
+        """
+        print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): stream_query_async received query: '{query_text}'")
+        with self._query_memory_scope():
+            async for chunk_text in self._stream_query_async(query_text, session_id=session_id, user_id=user_id):
+                yield chunk_text
+
+    async def _stream_query_async(self, query_text: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> AsyncIterator[str]:
+        full_prompt, prompt_stats, query_embedding = await self._prepare_prompt_async(query_text, session_id=session_id, user_id=user_id)
+
+        if not self.ai_model_client:
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): AI model client not initialized. Cannot generate response.")
+            yield "Error: AI model client not initialized."
+            return
+
+        cached_response = self._get_cached_response(query_embedding, prompt_stats)
+        if cached_response is not None:
+            yield cached_response
+            await self._run_blocking(self._store_interaction, query_text, cached_response, session_id=session_id, user_id=user_id)
+            return
+
+        response_chunks: List[str] = []
+        try:
+            model = self._get_generative_model()
+            response = await model.generate_content_async(full_prompt, stream=True)
+            async for chunk in response:
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    continue # Chunks without text parts (e.g. trailing safety/finish metadata)
+                if chunk_text:
+                    response_chunks.append(chunk_text)
+                    yield chunk_text
+            ai_response_text = "".join(response_chunks)
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): Streamed response from Gemini in {len(response_chunks)} chunks. Length: {len(ai_response_text)}.")
+            self._cache_response(query_embedding, prompt_stats, ai_response_text)
+        except Exception as e:
+            print(f"DEBUG_PROCESS (Engine ID: {self.engine_instance_id}): ERROR during Gemini streaming API call: {type(e).__name__} - {e}")
+            error_text = f"Error processing query: {e}"
+            yield error_text
+            ai_response_text = "".join(response_chunks) + error_text
+
+        await self._run_blocking(self._store_interaction, query_text, ai_response_text, session_id=session_id, user_id=user_id)
+
+    def close(self) -> None:
+        """Releases background resources (retention worker, write-behind buffer, executors, embedding cache, memory store connections). The engine should not be used afterwards."""
+        self._retention_stop.set()
+        if self._retention_thread is not None:
+            self._retention_thread.join()
+            self._retention_thread = None
+        if self.interaction_writer is not None:
+            self.interaction_writer.close() # Drains queued interactions
+            self.interaction_writer = None
+        if self._background_executor is not None:
+            self._background_executor.shutdown(wait=True) # Finishes queued indexing and summaries
+            self._background_executor = None
+        if self._io_executor is not None:
+            self._io_executor.shutdown(wait=True)
+            self._io_executor = None
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+            self.embedding_cache = None
+        if self.memory_store is not None:
+            self.memory_store.close()
 
     def add_interaction_record(self, record_data: InteractionRecordPydantic) -> Optional[str]:
-        """Adds a new interaction record to the adaptive memory database."""
+        """Adds a new interaction record to the adaptive memory store."""
         print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): add_interaction_record called.")
-        if not self.design.adaptive_memory.enabled or not self.db_session_factory:
-            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Adaptive memory disabled or DB session factory not available. Skipping add.")
+        if not self.design.adaptive_memory.enabled or not self.memory_store:
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Adaptive memory disabled or memory store not available. Skipping add.")
             return None
 
-        db_session = self.db_session_factory()
         try:
-            # Convert Pydantic model to ORM model instance
-            orm_record = InteractionRecordORM(
-                session_id=record_data.session_id, 
-                user_id=record_data.user_id, 
-                query=record_data.query, 
-                response=record_data.response,
-                timestamp=record_data.timestamp, 
-                additional_metadata=record_data.additional_metadata
-            )
-            db_session.add(orm_record)
-            db_session.commit()
-            db_session.refresh(orm_record)
-            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Interaction record {orm_record.id} added successfully.")
-            return orm_record.id
+            stored_record = self.memory_store.add(record_data)
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Interaction record {stored_record.id} added successfully.")
+            if self.interaction_index:
+                # Embed off the request path; until then the record is only reachable via the recent strategy
+                self._get_background_executor().submit(self._index_interactions, [self._interaction_index_entry(stored_record)])
+            self._schedule_session_summaries([stored_record])
+            return stored_record.id
         except Exception as e:
-            db_session.rollback()
             print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Error adding interaction record: {type(e).__name__} - {e}")
             # Consider logging the full stack trace for debugging
             import traceback
             traceback.print_exc()
             return None
-        finally:
-            db_session.close()
 
-    def get_recent_interaction_records(self, limit: int = 10) -> List[InteractionRecordPydantic]:
-        """Retrieves a list of the most recent interaction records as Pydantic objects."""
+    def get_recent_interaction_records(self, limit: int = 10, session_id: Optional[str] = None, user_id: Optional[str] = None) -> List[InteractionRecordPydantic]:
+        """Retrieves a list of the most recent interaction records as Pydantic objects, optionally only those of one session and/or user."""
         print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): get_recent_interaction_records called with limit {limit}.")
-        if not self.design.adaptive_memory.enabled or not self.db_session_factory:
-            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Adaptive memory disabled or DB session factory not available. Returning empty list.")
+        if not self.design.adaptive_memory.enabled or not self.memory_store:
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Adaptive memory disabled or memory store not available. Returning empty list.")
             return []
 
-        db_session = self.db_session_factory()
         try:
-            # Retrieve records ordered by timestamp descending to get the most recent ones
-            recent_records_orm = (
-                db_session.query(InteractionRecordORM)
-                .order_by(desc(InteractionRecordORM.timestamp))
-                .limit(limit)
-                .all()
-            )
-            # The records are currently most recent first. Reverse to have oldest first if needed by consumer, 
-            # or adjust consumer. For now, returning most recent first.
-            # To match previous behavior where tests expected oldest first after a reverse:
-            recent_records_orm.reverse() # Oldest first
-
-            # Convert ORM objects to Pydantic objects
-            pydantic_records = [InteractionRecordPydantic.model_validate(record) for record in recent_records_orm]
+            identity_filters = {column: value for column, value in (("session_id", session_id), ("user_id", user_id)) if value is not None}
+            # The store returns the most recent records first; consumers expect oldest first
+            pydantic_records = self.memory_store.recent(limit, filters=identity_filters)
+            pydantic_records.reverse()
             print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Retrieved {len(pydantic_records)} interaction records.")
             return pydantic_records
         except Exception as e:
@@ -681,73 +1644,141 @@ class AMMEngine:
             import traceback
             traceback.print_exc()
             return []
-        finally:
-            db_session.close()
 
     def update_interaction_record(self, record_id: str, updates: InteractionRecordUpdatePydantic) -> Optional[InteractionRecordPydantic]:
-        """Updates an existing interaction record in the adaptive memory database."""
+        """Updates an existing interaction record in the adaptive memory store."""
         print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): update_interaction_record called for ID {record_id}.")
-        if not self.design.adaptive_memory.enabled or not self.db_session_factory:
-            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Adaptive memory disabled or DB session factory not available. Cannot update record.")
+        if not self.design.adaptive_memory.enabled or not self.memory_store:
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Adaptive memory disabled or memory store not available. Cannot update record.")
             return None
 
-        db_session = self.db_session_factory()
+        update_data = updates.model_dump(exclude_unset=True)
         try:
-            record_orm = db_session.query(InteractionRecordORM).filter(InteractionRecordORM.id == record_id).first()
-            if not record_orm:
+            updated_record = self.memory_store.update(int(record_id), update_data)
+            if not updated_record:
                 print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Record with ID {record_id} not found for update.")
                 return None
-
-            update_data = updates.model_dump(exclude_unset=True)
-            for key, value in update_data.items():
-                # Ensure 'metadata' is correctly handled if it's part of InteractionRecordUpdatePydantic
-                # and needs to be merged with existing metadata or replaced.
-                # The ORM model uses 'metadata_' (with a trailing underscore).
-                if key == "metadata":
-                    # Example: deep merge or replace. Current Pydantic model might not have metadata in Update.
-                    # If it did, you'd do: record_orm.metadata_ = {**record_orm.metadata_, **value} or record_orm.metadata_ = value
-                    # For now, assuming direct attribute setting if 'metadata' field is directly on ORM and in Pydantic Update model.
-                    # This part needs alignment with how InteractionRecordUpdatePydantic and InteractionRecordORM handle metadata updates.
-                    # Let's assume for now 'metadata' in Pydantic maps to 'metadata_' in ORM.
-                    setattr(record_orm, "metadata_", value) 
-                else:
-                    setattr(record_orm, key, value)
-            
-            db_session.commit()
-            db_session.refresh(record_orm)
             print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Record {record_id} updated successfully.")
-            return InteractionRecordPydantic.model_validate(record_orm)
+            if self.interaction_index and update_data.keys() & {"query", "response", "session_id", "user_id"}:
+                self._get_background_executor().submit(self._index_interactions, [self._interaction_index_entry(updated_record)])
+            return updated_record
         except Exception as e:
-            db_session.rollback()
             print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Error updating interaction record {record_id}: {type(e).__name__} - {e}")
             return None
-        finally:
-            db_session.close()
 
     def delete_interaction_record(self, record_id: str) -> bool:
-        """Deletes an interaction record from the adaptive memory database."""
+        """Deletes an interaction record from the adaptive memory store."""
         print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): delete_interaction_record called for ID {record_id}.")
-        if not self.design.adaptive_memory.enabled or not self.db_session_factory:
-            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Adaptive memory disabled or DB session factory not available. Cannot delete record.")
+        if not self.design.adaptive_memory.enabled or not self.memory_store:
+            print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Adaptive memory disabled or memory store not available. Cannot delete record.")
             return False
 
-        db_session = self.db_session_factory()
         try:
-            record_to_delete = db_session.query(InteractionRecordORM).filter(InteractionRecordORM.id == record_id).first()
-            if record_to_delete:
-                db_session.delete(record_to_delete)
-                db_session.commit()
-                print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Record {record_id} deleted successfully.")
-                return True
-            else:
+            if not self.memory_store.delete(int(record_id)):
                 print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Record with ID {record_id} not found for deletion.")
                 return False
         except Exception as e:
-            db_session.rollback()
             print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Error deleting interaction record {record_id}: {type(e).__name__} - {e}")
             return False
-        finally:
-            db_session.close()
+        print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Record {record_id} deleted successfully.")
+        if self.interaction_index:
+            try:
+                self.interaction_index.delete([record_id])
+            except Exception as e:
+                print(f"DEBUG_ADAPTIVE_MEM (Engine ID: {self.engine_instance_id}): Error removing vector of record {record_id}: {type(e).__name__} - {e}")
+        return True
+
+    def flush_interaction_records(self, timeout: Optional[float] = None) -> bool:
+        """Writes interactions queued in the write-behind buffer now. Returns False if the wait timed out."""
+        if self.interaction_writer is None:
+            return True
+        return self.interaction_writer.flush(timeout)
+
+    def get_adaptive_memory_metrics(self) -> Dict[str, Any]:
+        """Adaptive memory write metrics (write-behind queue depth and counters), for monitoring endpoints."""
+        return {
+            "write_behind_enabled": self.interaction_writer is not None,
+            **(self.interaction_writer.metrics() if self.interaction_writer else {})
+        }
+
+    # --- Adaptive memory retention --- #
+
+    def _start_retention_worker(self) -> None:
+        """Starts the daemon thread that periodically prunes interactions older than retention_policy_days."""
+        interval_seconds = self.design.adaptive_memory.retention_check_interval_minutes * 60
+
+        def run_retention() -> None:
+            # Prune once at startup, then on every interval until close() is called
+            while True:
+                try:
+                    self.prune_adaptive_memory()
+                except Exception as e:
+                    print(f"DEBUG_RETENTION (Engine ID: {self.engine_instance_id}): Error during scheduled retention: {type(e).__name__} - {e}")
+                if self._retention_stop.wait(interval_seconds):
+                    return
+
+        self._retention_thread = threading.Thread(target=run_retention, name=f"amm-retention-{self.engine_instance_id}", daemon=True)
+        self._retention_thread.start()
+        print(f"DEBUG_RETENTION (Engine ID: {self.engine_instance_id}): Retention worker started (keep {self.design.adaptive_memory.retention_policy_days} days, check every {interval_seconds:.0f}s).")
+
+    def prune_adaptive_memory(self, now: Optional[datetime] = None) -> int:
+        """Deletes interaction records older than retention_policy_days in batches and compacts the database.
+
+        Pruned records are appended to a gzip-compressed JSONL archive in the instance data path if
+        archive_pruned_records is enabled. Returns the number of deleted records.
+        """
+        memory_config = self.design.adaptive_memory
+        if memory_config.retention_policy_days is None or not self.memory_store:
+            return 0
+
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=memory_config.retention_policy_days)
+        archive_path = None
+        if memory_config.archive_pruned_records:
+            archive_path = self.instance_data_path / ADAPTIVE_MEMORY_ARCHIVE_DIRNAME / f"pruned_interactions_{now:%Y%m%d}.jsonl.gz"
+
+        total_deleted = 0
+        while True:
+            try:
+                expired_records = self.memory_store.expired(cutoff, memory_config.retention_delete_batch_size)
+                if not expired_records:
+                    break
+                expired_ids = [record.id for record in expired_records]
+                if archive_path is not None:
+                    self._archive_interaction_records(archive_path, expired_records)
+                self.memory_store.delete_ids(expired_ids)
+            except Exception as e:
+                print(f"DEBUG_RETENTION (Engine ID: {self.engine_instance_id}): Error pruning adaptive memory: {type(e).__name__} - {e}")
+                break
+
+            total_deleted += len(expired_ids)
+            if self.interaction_index:
+                try:
+                    self.interaction_index.delete(expired_ids)
+                except Exception as e:
+                    print(f"DEBUG_RETENTION (Engine ID: {self.engine_instance_id}): Error removing vectors of pruned records: {type(e).__name__} - {e}")
+            if len(expired_ids) < memory_config.retention_delete_batch_size:
+                break
+
+        if total_deleted:
+            print(f"DEBUG_RETENTION (Engine ID: {self.engine_instance_id}): Pruned {total_deleted} interaction records older than {cutoff.isoformat()}.")
+            self._compact_adaptive_memory()
+        return total_deleted
+
+    @staticmethod
+    def _archive_interaction_records(archive_path: Path, records: List[InteractionRecordPydantic]) -> None:
+        """Appends records to a gzip-compressed JSONL file (each call adds a gzip member)."""
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(archive_path, "at", encoding="utf-8") as archive_file:
+            for record in records:
+                archive_file.write(record.model_dump_json() + "\n")
+
+    def _compact_adaptive_memory(self) -> None:
+        """Returns freed space to the file system (SQLite: incremental auto-vacuum and WAL truncation)."""
+        try:
+            self.memory_store.compact()
+        except Exception as e:
+            print(f"DEBUG_RETENTION (Engine ID: {self.engine_instance_id}): Error compacting adaptive memory database: {type(e).__name__} - {e}")
 
     # --- Getter methods for commonly accessed design properties --- #
     def get_welcome_message(self) -> str:
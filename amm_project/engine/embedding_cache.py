@@ -0,0 +1,272 @@
+"""
+Caches for text embeddings.
+
+EmbeddingCache is a persistent, content-addressed cache: embeddings are keyed by
+(embedding model name, task type, SHA-256 of the text) and stored in a small SQLite
+file next to the LanceDB knowledge store, so unchanged knowledge is not re-embedded
+every time an engine starts.
+
+QueryEmbeddingCache is an in-process LRU+TTL cache for query embeddings, which keeps
+repeated queries from paying an embedding round trip on every request.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Union
+
+# Initialize logger
+logger = logging.getLogger("embedding_cache")
+
+EMBEDDING_CACHE_FILENAME = "embedding_cache.sqlite"
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache with entry/size limits and LRU eviction."""
+
+    # Fraction of the limits to shrink to when evicting, so eviction does not run on every insert
+    EVICTION_TARGET_RATIO = 0.9
+
+    def __init__(self, db_path: Union[str, Path], max_entries: int = 200_000, max_size_mb: Optional[float] = 512.0):
+        """Open (or create) the cache database.
+
+        Args:
+            db_path: Path to the SQLite file holding the cache
+            max_entries: Maximum number of cached embeddings
+            max_size_mb: Maximum total size of the stored vectors in MB (None for no limit)
+        """
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " task_type TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " size_bytes INTEGER NOT NULL,"
+            " last_accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_accessed ON embeddings (last_accessed)")
+        self._entry_count, self._total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM embeddings"
+        ).fetchone()
+
+    @staticmethod
+    def make_key(model_name: str, task_type: str, text: str) -> str:
+        """Build the content-addressed cache key for a piece of text."""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model_name}|{task_type}|{digest}"
+
+    def get(self, model_name: str, task_type: str, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for the text, or None on a miss."""
+        key = self.make_key(model_name, task_type, text)
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self._conn.execute("UPDATE embeddings SET last_accessed = ? WHERE key = ?", (time.time(), key))
+                self.hits += 1
+                return array("d", row[0]).tolist()
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache lookup failed: {e}")
+                self.misses += 1
+                return None
+
+    def get_many(self, model_name: str, task_type: str, texts: List[str]) -> Dict[str, List[float]]:
+        """Return the cached embeddings for several texts, keyed by text. Missing texts are omitted."""
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                for text in dict.fromkeys(texts):
+                    key = self.make_key(model_name, task_type, text)
+                    row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                    if row is None:
+                        self.misses += 1
+                        continue
+                    self._conn.execute("UPDATE embeddings SET last_accessed = ? WHERE key = ?", (now, key))
+                    self.hits += 1
+                    found[text] = array("d", row[0]).tolist()
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache batch lookup failed: {e}")
+                self._rollback()
+        return found
+
+    def put(self, model_name: str, task_type: str, text: str, embedding: List[float]) -> None:
+        """Store an embedding, evicting least recently used entries if a limit is exceeded."""
+        self.put_many(model_name, task_type, {text: embedding})
+
+    def put_many(self, model_name: str, task_type: str, embeddings: Dict[str, List[float]]) -> None:
+        """Store several embeddings (keyed by text) in a single transaction."""
+        blobs = {}
+        for text, embedding in embeddings.items():
+            try:
+                blob = array("d", embedding).tobytes()
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Embedding not cached, unsupported vector type: {e}")
+                continue
+            if blob:
+                blobs[self.make_key(model_name, task_type, text)] = blob
+        if not blobs:
+            return
+
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                for key, blob in blobs.items():
+                    previous = self._conn.execute("SELECT size_bytes FROM embeddings WHERE key = ?", (key,)).fetchone()
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO embeddings (key, model, task_type, vector, size_bytes, last_accessed) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, model_name, task_type, blob, len(blob), now)
+                    )
+                    if previous is None:
+                        self._entry_count += 1
+                        self._total_bytes += len(blob)
+                    else:
+                        self._total_bytes += len(blob) - previous[0]
+                self._evict_if_needed()
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to store embeddings in cache: {e}")
+                self._rollback()
+                self._entry_count, self._total_bytes = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM embeddings"
+                ).fetchone()
+
+    def _rollback(self) -> None:
+        """Roll back an open transaction, if any. Caller holds the lock."""
+        try:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+
+    def _evict_if_needed(self) -> None:
+        """Evict least recently used entries until the cache is back under its limits. Caller holds the lock."""
+        over_entries = self._entry_count > self.max_entries
+        over_size = self.max_size_bytes is not None and self._total_bytes > self.max_size_bytes
+        if not (over_entries or over_size):
+            return
+
+        target_entries = int(self.max_entries * self.EVICTION_TARGET_RATIO)
+        to_remove = max(self._entry_count - target_entries, 0)
+        if over_size and self._entry_count:
+            # Vectors of one model have a fixed size, so the average is a good estimate of how many to drop
+            avg_size = self._total_bytes / self._entry_count
+            target_bytes = self.max_size_bytes * self.EVICTION_TARGET_RATIO
+            to_remove = max(to_remove, int((self._total_bytes - target_bytes) / avg_size) + 1)
+
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_accessed ASC LIMIT ?)",
+            (to_remove,)
+        )
+        self._entry_count, self._total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM embeddings"
+        ).fetchone()
+        logger.info(f"Evicted {to_remove} embeddings from cache. Entries: {self._entry_count}, bytes: {self._total_bytes}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current cache size."""
+        return {
+            "entries": self._entry_count,
+            "size_bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+
+
+class QueryEmbeddingCache:
+    """In-process LRU cache with a time-to-live for query embeddings."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600.0, casefold: bool = False):
+        """Create an empty cache.
+
+        Args:
+            max_entries: Maximum number of cached query embeddings
+            ttl_seconds: Seconds an entry stays valid (None for no expiry)
+            casefold: Also share entries between queries differing only in case
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.casefold = casefold
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def normalize(self, text: str) -> str:
+        """Collapse whitespace (and casefold if enabled) so trivially different spellings share an entry.
+
+        Case is kept by default: the embedding model sees it, so "US" and "us" need not embed alike.
+        """
+        text = " ".join(text.split())
+        return text.casefold() if self.casefold else text
+
+    def get(self, model_name: str, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for the query, or None on a miss or expired entry."""
+        key = (model_name, self.normalize(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                embedding, stored_at = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model_name: str, text: str, embedding: List[float]) -> None:
+        """Store a query embedding, evicting the least recently used entry when full."""
+        key = (model_name, self.normalize(text))
+        with self._lock:
+            self._entries[key] = (embedding, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and the current number of entries."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,115 @@
+"""
+Vector index over adaptive memory interactions.
+
+Each stored interaction is embedded once at write time and its vector is kept in a
+LanceDB table keyed by the interaction record ID, together with the record's session
+and user IDs so that scoped searches can be pre-filtered. The engine's "relevant"
+adaptive memory strategy searches this table for the interactions most similar to the
+current query and then loads the records themselves from the adaptive memory database.
+"""
+
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+import lancedb
+import pyarrow as pa
+
+# Initialize logger
+logger = logging.getLogger("interaction_index")
+
+INTERACTION_INDEX_DIRNAME = "lancedb_adaptive_memory"
+INTERACTION_VECTORS_TABLE_NAME = "interaction_vectors"
+SCOPE_COLUMNS = ("session_id", "user_id")
+
+
+def _sql_string(value: str) -> str:
+    """Quote a value as a SQL string literal for LanceDB filters."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class InteractionVectorIndex:
+    """LanceDB table of interaction record IDs, their session/user IDs and embeddings, searched by cosine distance."""
+
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._connection = lancedb.connect(self.db_path)
+        self._table = None
+        if INTERACTION_VECTORS_TABLE_NAME in self._connection.table_names():
+            table = self._connection.open_table(INTERACTION_VECTORS_TABLE_NAME)
+            if all(column in table.schema.names for column in SCOPE_COLUMNS):
+                self._table = table
+            else:
+                # Written before scope columns existed; the engine's backfill re-creates it
+                logger.info("Dropping interaction vector table without scope columns; it will be rebuilt.")
+                self._connection.drop_table(INTERACTION_VECTORS_TABLE_NAME)
+
+    def add(self, entries: List[Tuple[int, List[float], Dict[str, Optional[str]]]]) -> int:
+        """Insert or replace (record ID, vector, scope) entries, where scope maps session_id/user_id to their values.
+
+        Returns the number of rows written.
+        """
+        rows = [
+            {
+                "id": int(record_id),
+                **{column: scope.get(column) for column in SCOPE_COLUMNS},
+                "vector": [float(value) for value in vector],
+            }
+            for record_id, vector, scope in entries
+            if vector
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            if self._table is None:
+                # Explicit schema: scope columns may be all None in the first batch
+                schema = pa.schema(
+                    [pa.field("id", pa.int64())]
+                    + [pa.field(column, pa.string()) for column in SCOPE_COLUMNS]
+                    + [pa.field("vector", pa.list_(pa.float32(), len(rows[0]["vector"])))]
+                )
+                self._table = self._connection.create_table(INTERACTION_VECTORS_TABLE_NAME, data=rows, schema=schema)
+            else:
+                (
+                    self._table.merge_insert("id")
+                    .when_matched_update_all()
+                    .when_not_matched_insert_all()
+                    .execute(rows)
+                )
+        return len(rows)
+
+    def delete(self, record_ids: List[int]) -> None:
+        """Remove the vectors of the given record IDs, if present."""
+        if self._table is None or not record_ids:
+            return
+        id_list = ", ".join(str(int(record_id)) for record_id in record_ids)
+        with self._lock:
+            self._table.delete(f"id IN ({id_list})")
+
+    def search(self, query_vector: List[float], limit: int, scope: Optional[Dict[str, str]] = None) -> List[Tuple[int, float]]:
+        """Return up to `limit` (record ID, cosine distance) pairs, nearest first.
+
+        `scope` restricts the search to rows whose session_id/user_id equal the given values.
+        """
+        if self._table is None:
+            return []
+        query = self._table.search(query_vector).distance_type("cosine")
+        if scope:
+            query = query.where(
+                " AND ".join(f"{column} = {_sql_string(value)}" for column, value in scope.items()),
+                prefilter=True
+            )
+        results = query.select(["id", "_distance"]).limit(limit).to_list()
+        return [(int(row["id"]), float(row["_distance"])) for row in results]
+
+    def indexed_ids(self) -> Set[int]:
+        """Return the IDs of all records that have a vector."""
+        if self._table is None:
+            return set()
+        return set(self._table.to_arrow().column("id").to_pylist())
+
+    def count(self) -> int:
+        """Return the number of indexed interactions."""
+        return 0 if self._table is None else self._table.count_rows()
@@ -0,0 +1,180 @@
+"""
+Write-behind buffer for adaptive memory interaction records.
+
+Instead of one session, commit and fsync per query, interactions are queued in memory and
+a background thread inserts them into the interaction store in batches, one transaction per
+flush. A flush happens when max_batch_size records are pending or flush_interval_seconds
+have passed since the first pending record, whichever comes first. close() drains the queue.
+A batch that fails is retried with backoff and then written record by record, so one bad record
+or a transient error does not lose the whole batch.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+from amm_project.engine.memory_store import InteractionStore
+from amm_project.models.memory_models import InteractionRecordPydantic
+
+# Initialize logger
+logger = logging.getLogger("interaction_writer")
+
+WRITE_RETRIES = 3 # Retries of a failed batch before it is written record by record
+RETRY_BASE_DELAY_SECONDS = 0.1 # Doubles with every retry
+
+# Writers that have not been closed yet. Records still queued at interpreter exit would otherwise be
+# lost with the daemon threads; one exit hook for all writers keeps closed ones collectable.
+_open_writers: "weakref.WeakSet[InteractionWriteBuffer]" = weakref.WeakSet()
+
+@atexit.register
+def _close_open_writers() -> None:
+    for writer in list(_open_writers):
+        writer.close()
+
+
+class InteractionWriteBuffer:
+    """Queues InteractionRecordPydantic objects and persists them in batches from a background thread."""
+
+    def __init__(
+        self,
+        store: InteractionStore,
+        max_batch_size: int = 100,
+        flush_interval_seconds: float = 1.0,
+        max_queue_size: int = 10_000,
+        on_flushed: Optional[Callable[[List[InteractionRecordPydantic]], None]] = None,
+    ):
+        self._store = store
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._on_flushed = on_flushed
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._state_lock = threading.Lock() # Orders submits and flushes against the shutdown sentinel
+        self._metrics_lock = threading.Lock()
+        self._enqueued = 0
+        self._written = 0
+        self._failed = 0
+        self._rejected = 0
+        self._flushes = 0
+        self._last_flush_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="amm-interaction-writer", daemon=True)
+        self._thread.start()
+        _open_writers.add(self)
+
+    def submit(self, record: InteractionRecordPydantic) -> bool:
+        """Queue a record for writing. Returns False if the buffer is closed or full (the caller should write directly)."""
+        with self._state_lock:
+            if self._closed:
+                return False
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                with self._metrics_lock:
+                    self._rejected += 1
+                return False
+        with self._metrics_lock:
+            self._enqueued += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far and wait for it. Returns False if the wait timed out."""
+        done = threading.Event()
+        with self._state_lock:
+            if self._closed:
+                return True
+            self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Drain the queue and stop the writer thread. Further submits are rejected."""
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            # Nothing can be queued after the sentinel, so every accepted record is written
+            self._queue.put(None)
+        _open_writers.discard(self)
+        self._thread.join()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth and write counters, for monitoring."""
+        with self._metrics_lock:
+            return {
+                # Accepted but not yet written, whether still queued or in the batch being assembled
+                "queue_depth": self._enqueued - self._written - self._failed,
+                "enqueued": self._enqueued,
+                "written": self._written,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "flushes": self._flushes,
+                "last_flush_seconds": self._last_flush_seconds,
+            }
+
+    def _run(self) -> None:
+        pending: List[InteractionRecordPydantic] = []
+        deadline: Optional[float] = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # Flush interval elapsed
+
+            if isinstance(item, InteractionRecordPydantic):
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval_seconds
+                if len(pending) < self.max_batch_size:
+                    continue
+
+            # Batch full, interval elapsed, explicit flush (Event) or shutdown (None)
+            if pending:
+                self._write_batch(pending)
+                pending = []
+            deadline = None
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                return
+
+    def _write_batch(self, records: List[InteractionRecordPydantic]) -> None:
+        started_at = time.monotonic()
+        written = self._add_with_retry(records)
+        failed = 0
+        if written is None:
+            # Write record by record, so only records that cannot be written at all are lost
+            written = []
+            for record in records:
+                try:
+                    written.extend(self._store.add_many([record]))
+                except Exception as e:
+                    logger.error(f"Error writing buffered interaction record (session {record.session_id}): {type(e).__name__} - {e}")
+                    failed += 1
+
+        with self._metrics_lock:
+            self._written += len(written)
+            self._failed += failed
+            self._flushes += 1
+            self._last_flush_seconds = time.monotonic() - started_at
+        if self._on_flushed and written:
+            try:
+                self._on_flushed(written)
+            except Exception as e:
+                logger.error(f"Error in post-flush callback: {type(e).__name__} - {e}")
+
+    def _add_with_retry(self, records: List[InteractionRecordPydantic]) -> Optional[List[InteractionRecordPydantic]]:
+        """Write a batch in one transaction, retrying with backoff. Returns None if every attempt failed."""
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                return self._store.add_many(records)
+            except Exception as e:
+                if attempt == WRITE_RETRIES:
+                    logger.error(f"Error writing {len(records)} buffered interaction records, writing them one by one: {type(e).__name__} - {e}")
+                    return None
+                delay = RETRY_BASE_DELAY_SECONDS * 2 ** attempt
+                logger.warning(f"Error writing {len(records)} buffered interaction records ({type(e).__name__}). Retry {attempt + 1}/{WRITE_RETRIES} in {delay:.1f}s.")
+                time.sleep(delay)
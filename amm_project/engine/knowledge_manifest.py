@@ -0,0 +1,99 @@
+"""
+Manifest of the knowledge sources ingested into the fixed knowledge LanceDB table.
+
+The manifest records, for every ingested KnowledgeSourceConfig, a fingerprint of its
+content and ingestion settings together with the row IDs it produced. On startup the
+engine compares fingerprints to embed only new or changed sources and to delete the
+rows of sources that changed or were removed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+# Initialize logger
+logger = logging.getLogger("knowledge_manifest")
+
+MANIFEST_FILENAME = "fixed_knowledge_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def hash_text(text: str) -> str:
+    """Return the SHA-256 hex digest of a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def fingerprints_match(current: Optional[Dict[str, Any]], recorded: Optional[Dict[str, Any]]) -> bool:
+    """Compare two source fingerprints, ignoring the file modification time.
+
+    The mtime is only a hint for skipping re-hashing; a touched file with identical
+    content must not trigger re-ingestion.
+    """
+    if current is None or recorded is None:
+        return False
+    strip = lambda fp: {k: v for k, v in fp.items() if k != "mtime"}
+    return strip(current) == strip(recorded)
+
+
+class KnowledgeManifest:
+    """JSON-backed record of ingested knowledge sources and the LanceDB rows they own."""
+
+    def __init__(self, manifest_path: Union[str, Path], embedding_model: Optional[str] = None,
+                 sources: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.manifest_path = Path(manifest_path)
+        self.embedding_model = embedding_model
+        self.sources: Dict[str, Dict[str, Any]] = sources or {}
+
+    @classmethod
+    def load(cls, manifest_path: Union[str, Path]) -> Optional["KnowledgeManifest"]:
+        """Load a manifest from disk. Returns None if it is missing, unreadable or of another version."""
+        manifest_path = Path(manifest_path)
+        if not manifest_path.is_file():
+            return None
+        try:
+            data = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable knowledge manifest {manifest_path}: {e}")
+            return None
+        if data.get("version") != MANIFEST_VERSION:
+            logger.info(f"Ignoring knowledge manifest {manifest_path} with version {data.get('version')}")
+            return None
+        return cls(manifest_path, embedding_model=data.get("embedding_model"), sources=data.get("sources", {}))
+
+    def save(self) -> bool:
+        """Atomically write the manifest to disk. Returns True on success."""
+        data = {
+            "version": MANIFEST_VERSION,
+            "embedding_model": self.embedding_model,
+            "sources": self.sources,
+        }
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        try:
+            tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+            os.replace(tmp_path, self.manifest_path)
+            return True
+        except OSError as e:
+            logger.warning(f"Failed to save knowledge manifest {self.manifest_path}: {e}")
+            return False
+
+    def get_fingerprint(self, source_id: str) -> Optional[Dict[str, Any]]:
+        """Return the recorded fingerprint of a source, if it was ingested."""
+        entry = self.sources.get(source_id)
+        return entry.get("fingerprint") if entry else None
+
+    def get_row_ids(self, source_id: str) -> List[str]:
+        """Return the LanceDB row IDs recorded for a source."""
+        entry = self.sources.get(source_id)
+        return list(entry.get("row_ids", [])) if entry else []
+
+    def set_source(self, source_id: str, fingerprint: Dict[str, Any], row_ids: List[str]) -> None:
+        """Record (or replace) a source's fingerprint and row IDs."""
+        self.sources[source_id] = {"fingerprint": fingerprint, "row_ids": list(row_ids)}
+
+    def remove_source(self, source_id: str) -> List[str]:
+        """Forget a source and return the row IDs it owned."""
+        entry = self.sources.pop(source_id, None)
+        return list(entry.get("row_ids", [])) if entry else []
@@ -0,0 +1,428 @@
+"""
+Storage backends for adaptive memory interaction records.
+
+The engine talks to an InteractionStore rather than to a database directly:
+
+- SQLInteractionStore keeps records in any SQLAlchemy database. By default this is the
+  per-design SQLite file in the instance data path; a shared database (e.g. PostgreSQL)
+  lets several server replicas serve the same conversations.
+- InMemoryInteractionStore keeps records in a dict. Nothing is persisted, which suits
+  benchmarks, tests and stateless deployments.
+
+All methods take and return InteractionRecordPydantic objects, never ORM instances.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import desc
+from sqlalchemy.orm import Session
+
+from amm_project.models.amm_models import AdaptiveMemoryBackend, AdaptiveMemoryConfig
+from amm_project.models.memory_models import (
+    create_db_engine_and_tables, get_session_local, retry_on_lock,
+    ConversationSummaryORM, ConversationSummaryPydantic, InteractionRecordORM, InteractionRecordPydantic
+)
+
+# Initialize logger
+logger = logging.getLogger("memory_store")
+
+
+class InteractionStore(ABC):
+    """Interface of an adaptive memory backend."""
+
+    @abstractmethod
+    def add(self, record: InteractionRecordPydantic) -> InteractionRecordPydantic:
+        """Stores a record and returns it with its assigned ID."""
+
+    @abstractmethod
+    def add_many(self, records: List[InteractionRecordPydantic]) -> List[InteractionRecordPydantic]:
+        """Stores records in one transaction and returns them with their assigned IDs."""
+
+    @abstractmethod
+    def get_by_ids(self, record_ids: List[int]) -> List[InteractionRecordPydantic]:
+        """Returns the records with the given IDs that exist, in no particular order."""
+
+    @abstractmethod
+    def recent(self, limit: int, filters: Optional[Dict[str, str]] = None, after_id: Optional[int] = None) -> List[InteractionRecordPydantic]:
+        """Returns up to `limit` records, newest first, whose fields equal the given filter values and whose ID is above after_id."""
+
+    @abstractmethod
+    def records_after(self, after_id: int, limit: int, filters: Optional[Dict[str, str]] = None) -> List[InteractionRecordPydantic]:
+        """Returns up to `limit` records with an ID above after_id that match the filters, lowest ID first."""
+
+    @abstractmethod
+    def all_records(self) -> List[InteractionRecordPydantic]:
+        """Returns every stored record."""
+
+    @abstractmethod
+    def update(self, record_id: int, changes: Dict[str, Any]) -> Optional[InteractionRecordPydantic]:
+        """Sets the given fields of a record. Returns the updated record, or None if it does not exist."""
+
+    @abstractmethod
+    def delete(self, record_id: int) -> bool:
+        """Deletes a record. Returns False if it does not exist."""
+
+    @abstractmethod
+    def expired(self, cutoff: datetime, limit: int) -> List[InteractionRecordPydantic]:
+        """Returns up to `limit` records older than `cutoff` (timezone-aware), lowest ID first."""
+
+    @abstractmethod
+    def delete_ids(self, record_ids: List[int]) -> int:
+        """Deletes the records with the given IDs in one transaction. Returns the number deleted."""
+
+    @abstractmethod
+    def get_summary(self, session_id: str) -> Optional[ConversationSummaryPydantic]:
+        """Returns the rolling summary of a session, or None if it has none yet."""
+
+    @abstractmethod
+    def save_summary(self, summary: ConversationSummaryPydantic) -> None:
+        """Creates or replaces the rolling summary of summary.session_id."""
+
+    def query_scope(self):
+        """Context manager around the processing of one query; backends may share resources within it."""
+        return nullcontext()
+
+    def compact(self) -> None:
+        """Returns space freed by deletions to the system, if the backend supports it."""
+
+    def close(self) -> None:
+        """Releases connections and other resources."""
+
+
+class _SharedMemorySession:
+    """A session shared by the retrieval and storage steps of one query.
+
+    The session is used by one thread at a time (lock). Each use ends with the session's transaction,
+    so it holds a pooled connection only while a read or write runs, never across generation. It is
+    closed when its last user releases it, which may be a retrieval stage that outlived its time
+    budget rather than the query itself.
+    """
+
+    def __init__(self, owner: "SQLInteractionStore", session: Session):
+        self.owner = owner
+        self.session = session
+        self.lock = threading.Lock()
+        self._users = 1 # The query that opened it
+        self._users_lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Registers another user. Returns False if the session has already been closed."""
+        with self._users_lock:
+            if self._users == 0:
+                return False
+            self._users += 1
+            return True
+
+    def release(self) -> None:
+        with self._users_lock:
+            self._users -= 1
+            last_user = self._users == 0
+        if last_user:
+            self.session.close()
+
+
+# The shared session of the query being processed; copied into executor threads with the context
+_query_session_var: contextvars.ContextVar[Optional[_SharedMemorySession]] = contextvars.ContextVar("amm_query_memory_session", default=None)
+
+
+class SQLInteractionStore(InteractionStore):
+    """Interaction records in a SQLAlchemy database (SQLite, PostgreSQL, ...).
+
+    Writes are retried with backoff while SQLite reports "database is locked".
+    """
+
+    def __init__(self, db_url: str, pool_size: int = 5, busy_timeout_seconds: float = 5.0, lock_retries: int = 3):
+        self.engine = create_db_engine_and_tables(db_url, pool_size=pool_size, busy_timeout_seconds=busy_timeout_seconds)
+        self.session_factory = get_session_local(self.engine)
+        self.lock_retries = lock_retries
+
+    @contextmanager
+    def _session(self) -> Iterator[Session]:
+        """Yields the current query's shared session if it is free, otherwise a new one."""
+        shared = _query_session_var.get()
+        if shared is not None and shared.owner is self and shared.acquire():
+            if shared.lock.acquire(blocking=False):
+                try:
+                    yield shared.session
+                finally:
+                    try:
+                        # End the read transaction (writes have committed) to return the connection to the pool
+                        shared.session.rollback()
+                    finally:
+                        shared.lock.release()
+                        shared.release()
+                return
+            shared.release() # Busy, e.g. with a retrieval stage that outlived its budget
+        db_session = self.session_factory()
+        try:
+            yield db_session
+        finally:
+            db_session.close()
+
+    @contextmanager
+    def query_scope(self):
+        """Serves all reads and writes of one query from a single session (one pooled connection)."""
+        shared = _SharedMemorySession(self, self.session_factory())
+        token = _query_session_var.set(shared)
+        try:
+            yield
+        finally:
+            try:
+                _query_session_var.reset(token)
+            except ValueError:
+                # Async generator finalized in a different context than it started in
+                _query_session_var.set(None)
+            shared.release()
+
+    def _write(self, db_session: Session, operation):
+        try:
+            return retry_on_lock(operation, session=db_session, retries=self.lock_retries)
+        except Exception:
+            db_session.rollback()
+            raise
+
+    @staticmethod
+    def _to_orm(record: InteractionRecordPydantic) -> InteractionRecordORM:
+        return InteractionRecordORM(
+            session_id=record.session_id,
+            user_id=record.user_id,
+            query=record.query,
+            response=record.response,
+            timestamp=record.timestamp,
+            additional_metadata=record.additional_metadata
+        )
+
+    def add(self, record: InteractionRecordPydantic) -> InteractionRecordPydantic:
+        return self.add_many([record])[0]
+
+    def add_many(self, records: List[InteractionRecordPydantic]) -> List[InteractionRecordPydantic]:
+        with self._session() as db_session:
+            def insert() -> List[InteractionRecordPydantic]:
+                orm_records = [self._to_orm(record) for record in records]
+                db_session.add_all(orm_records)
+                db_session.flush() # Assigns IDs
+                inserted = [InteractionRecordPydantic.model_validate(orm_record) for orm_record in orm_records]
+                db_session.commit()
+                return inserted
+            return self._write(db_session, insert)
+
+    def get_by_ids(self, record_ids: List[int]) -> List[InteractionRecordPydantic]:
+        with self._session() as db_session:
+            return [
+                InteractionRecordPydantic.model_validate(record)
+                for record in db_session.query(InteractionRecordORM).filter(InteractionRecordORM.id.in_(list(record_ids))).all()
+            ]
+
+    def recent(self, limit: int, filters: Optional[Dict[str, str]] = None, after_id: Optional[int] = None) -> List[InteractionRecordPydantic]:
+        with self._session() as db_session:
+            query = db_session.query(InteractionRecordORM).filter_by(**(filters or {}))
+            if after_id is not None:
+                query = query.filter(InteractionRecordORM.id > after_id)
+            records = query.order_by(desc(InteractionRecordORM.timestamp)).limit(limit).all()
+            return [InteractionRecordPydantic.model_validate(record) for record in records]
+
+    def records_after(self, after_id: int, limit: int, filters: Optional[Dict[str, str]] = None) -> List[InteractionRecordPydantic]:
+        with self._session() as db_session:
+            records = (
+                db_session.query(InteractionRecordORM)
+                .filter_by(**(filters or {}))
+                .filter(InteractionRecordORM.id > after_id)
+                .order_by(InteractionRecordORM.id)
+                .limit(limit)
+                .all()
+            )
+            return [InteractionRecordPydantic.model_validate(record) for record in records]
+
+    def all_records(self) -> List[InteractionRecordPydantic]:
+        with self._session() as db_session:
+            return [InteractionRecordPydantic.model_validate(record) for record in db_session.query(InteractionRecordORM)]
+
+    def update(self, record_id: int, changes: Dict[str, Any]) -> Optional[InteractionRecordPydantic]:
+        with self._session() as db_session:
+            def apply() -> Optional[InteractionRecordPydantic]:
+                record_orm = db_session.query(InteractionRecordORM).filter(InteractionRecordORM.id == record_id).first()
+                if not record_orm:
+                    return None
+                for key, value in changes.items():
+                    setattr(record_orm, key, value)
+                db_session.commit()
+                db_session.refresh(record_orm)
+                return InteractionRecordPydantic.model_validate(record_orm)
+            return self._write(db_session, apply)
+
+    def delete(self, record_id: int) -> bool:
+        with self._session() as db_session:
+            def remove() -> bool:
+                record_orm = db_session.query(InteractionRecordORM).filter(InteractionRecordORM.id == record_id).first()
+                if not record_orm:
+                    return False
+                db_session.delete(record_orm)
+                db_session.commit()
+                return True
+            return self._write(db_session, remove)
+
+    def expired(self, cutoff: datetime, limit: int) -> List[InteractionRecordPydantic]:
+        # Timestamps are stored as naive UTC
+        naive_cutoff = cutoff.astimezone(timezone.utc).replace(tzinfo=None)
+        with self._session() as db_session:
+            records = (
+                db_session.query(InteractionRecordORM)
+                .filter(InteractionRecordORM.timestamp < naive_cutoff)
+                .order_by(InteractionRecordORM.id)
+                .limit(limit)
+                .all()
+            )
+            return [InteractionRecordPydantic.model_validate(record) for record in records]
+
+    def delete_ids(self, record_ids: List[int]) -> int:
+        if not record_ids:
+            return 0
+        with self._session() as db_session:
+            def remove() -> int:
+                deleted = db_session.query(InteractionRecordORM).filter(InteractionRecordORM.id.in_(list(record_ids))).delete(synchronize_session=False)
+                db_session.commit()
+                return deleted
+            return self._write(db_session, remove)
+
+    def get_summary(self, session_id: str) -> Optional[ConversationSummaryPydantic]:
+        with self._session() as db_session:
+            summary_orm = db_session.get(ConversationSummaryORM, session_id)
+            return ConversationSummaryPydantic.model_validate(summary_orm) if summary_orm else None
+
+    def save_summary(self, summary: ConversationSummaryPydantic) -> None:
+        with self._session() as db_session:
+            def upsert() -> None:
+                db_session.merge(ConversationSummaryORM(**summary.model_dump()))
+                db_session.commit()
+            self._write(db_session, upsert)
+
+    def compact(self) -> None:
+        """Incremental vacuum and WAL truncation for SQLite; other databases reclaim space themselves."""
+        if self.engine.dialect.name != "sqlite":
+            return
+        with self.engine.connect() as connection:
+            auto_vacuum = connection.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+            if auto_vacuum == 2: # INCREMENTAL
+                connection.exec_driver_sql("PRAGMA incremental_vacuum").fetchall()
+            journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+            if str(journal_mode).lower() == "wal":
+                connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            connection.commit()
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+
+class InMemoryInteractionStore(InteractionStore):
+    """Interaction records in a process-local dict. Contents are lost when the process exits."""
+
+    def __init__(self):
+        self._records: Dict[int, InteractionRecordPydantic] = {}
+        self._summaries: Dict[str, ConversationSummaryPydantic] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _utc(timestamp: datetime) -> datetime:
+        return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+    def add(self, record: InteractionRecordPydantic) -> InteractionRecordPydantic:
+        return self.add_many([record])[0]
+
+    def add_many(self, records: List[InteractionRecordPydantic]) -> List[InteractionRecordPydantic]:
+        added = []
+        with self._lock:
+            for record in records:
+                stored = record.model_copy(deep=True, update={"id": self._next_id, "timestamp": self._utc(record.timestamp)})
+                self._records[stored.id] = stored
+                self._next_id += 1
+                added.append(stored.model_copy(deep=True))
+        return added
+
+    def get_by_ids(self, record_ids: List[int]) -> List[InteractionRecordPydantic]:
+        with self._lock:
+            return [self._records[record_id].model_copy(deep=True) for record_id in record_ids if record_id in self._records]
+
+    def _matching(self, filters: Optional[Dict[str, str]], after_id: Optional[int]) -> List[InteractionRecordPydantic]:
+        return [
+            record for record_id, record in sorted(self._records.items())
+            if (after_id is None or record_id > after_id)
+            and all(getattr(record, field) == value for field, value in (filters or {}).items())
+        ]
+
+    def recent(self, limit: int, filters: Optional[Dict[str, str]] = None, after_id: Optional[int] = None) -> List[InteractionRecordPydantic]:
+        with self._lock:
+            matching = self._matching(filters, after_id)
+            matching.sort(key=lambda record: record.timestamp, reverse=True)
+            return [record.model_copy(deep=True) for record in matching[:limit]]
+
+    def records_after(self, after_id: int, limit: int, filters: Optional[Dict[str, str]] = None) -> List[InteractionRecordPydantic]:
+        with self._lock:
+            return [record.model_copy(deep=True) for record in self._matching(filters, after_id)[:limit]]
+
+    def all_records(self) -> List[InteractionRecordPydantic]:
+        with self._lock:
+            return [record.model_copy(deep=True) for record in self._records.values()]
+
+    def update(self, record_id: int, changes: Dict[str, Any]) -> Optional[InteractionRecordPydantic]:
+        with self._lock:
+            if record_id not in self._records:
+                return None
+            updated = self._records[record_id].model_copy(deep=True, update=changes)
+            self._records[record_id] = updated
+            return updated.model_copy(deep=True)
+
+    def delete(self, record_id: int) -> bool:
+        with self._lock:
+            return self._records.pop(record_id, None) is not None
+
+    def expired(self, cutoff: datetime, limit: int) -> List[InteractionRecordPydantic]:
+        with self._lock:
+            return [
+                record.model_copy(deep=True)
+                for record_id, record in sorted(self._records.items())
+                if record.timestamp < cutoff
+            ][:limit]
+
+    def delete_ids(self, record_ids: List[int]) -> int:
+        with self._lock:
+            return sum(self._records.pop(record_id, None) is not None for record_id in record_ids)
+
+    def get_summary(self, session_id: str) -> Optional[ConversationSummaryPydantic]:
+        with self._lock:
+            summary = self._summaries.get(session_id)
+            return summary.model_copy(deep=True) if summary else None
+
+    def save_summary(self, summary: ConversationSummaryPydantic) -> None:
+        with self._lock:
+            self._summaries[summary.session_id] = summary.model_copy(deep=True)
+
+
+def create_interaction_store(memory_config: AdaptiveMemoryConfig, default_sqlite_path: Optional[Path]) -> InteractionStore:
+    """Creates the store selected by adaptive_memory.backend.
+
+    For the SQL backend the URL is taken from db_url_env_var, then db_url, and otherwise points to
+    the per-design SQLite file at default_sqlite_path.
+    """
+    if memory_config.backend == AdaptiveMemoryBackend.MEMORY:
+        return InMemoryInteractionStore()
+
+    db_url = (os.getenv(memory_config.db_url_env_var) if memory_config.db_url_env_var else None) or memory_config.db_url
+    if not db_url:
+        if default_sqlite_path is None:
+            raise ValueError("No database URL configured and no SQLite path available for adaptive memory.")
+        db_url = "sqlite:///" + str(default_sqlite_path.resolve()) # Use resolved absolute path
+    return SQLInteractionStore(
+        db_url,
+        pool_size=memory_config.db_pool_size,
+        busy_timeout_seconds=memory_config.db_busy_timeout_seconds,
+        lock_retries=memory_config.db_lock_retries
+    )
@@ -0,0 +1,91 @@
+"""
+Token-budgeted packing of retrieved context into the model prompt.
+
+The system instruction and the current query are always part of the prompt; retrieved
+context (fixed knowledge chunks and adaptive memory interactions) is packed into whatever
+is left of the prompt budget. Each context type is packed most valuable first, in the order
+retrieval returns it (fixed knowledge by relevance, adaptive memory newest first). The first
+chunk that does not fit is truncated if enough budget remains for a useful fragment; the
+chunks after it are dropped.
+
+Token counts are estimated from the character count rather than with a count_tokens API
+call, which would add a round trip to every request.
+"""
+
+import logging
+import math
+from typing import List, Tuple
+
+# Initialize logger
+logger = logging.getLogger("prompt_builder")
+
+CHUNK_SEPARATOR = "\n\n"
+TRUNCATION_MARKER = " [...]"
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Estimate the number of tokens of a text (Gemini averages about 4 characters per token on English text)."""
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int, chars_per_token: float = 4.0) -> str:
+    """Shorten a text to about max_tokens, cutting at a word boundary and marking the cut."""
+    max_chars = int(max_tokens * chars_per_token) - len(TRUNCATION_MARKER)
+    if len(text) <= max_chars + len(TRUNCATION_MARKER):
+        return text
+    if max_chars <= 0:
+        return ""
+    cut = text[:max_chars]
+    boundary = cut.rfind(" ")
+    if boundary > max_chars // 2: # Avoid dropping most of the fragment for one long word
+        cut = cut[:boundary]
+    return cut.rstrip() + TRUNCATION_MARKER
+
+
+def pack_texts(texts: List[str], budget_tokens: int, chars_per_token: float = 4.0, min_fragment_tokens: int = 64) -> Tuple[List[str], int, bool]:
+    """Keep texts in order while they fit into budget_tokens.
+
+    Returns (kept texts, estimated tokens used including separators, whether anything was truncated or dropped).
+    """
+    kept: List[str] = []
+    used = 0
+    for index, text in enumerate(texts):
+        cost = estimate_tokens((CHUNK_SEPARATOR if kept else "") + text, chars_per_token)
+        if used + cost <= budget_tokens:
+            kept.append(text)
+            used += cost
+            continue
+        remaining = budget_tokens - used - estimate_tokens(CHUNK_SEPARATOR if kept else "", chars_per_token)
+        if remaining >= min_fragment_tokens:
+            fragment = truncate_to_tokens(text, remaining, chars_per_token)
+            if fragment:
+                kept.append(fragment)
+                used += estimate_tokens((CHUNK_SEPARATOR if len(kept) > 1 else "") + fragment, chars_per_token)
+        return kept, used, True
+    return kept, used, False
+
+
+def pack_context(
+    fixed_texts: List[str],
+    adaptive_texts: List[str],
+    budget_tokens: int,
+    fixed_share: float = 0.6,
+    chars_per_token: float = 4.0,
+    min_fragment_tokens: int = 64,
+) -> Tuple[List[str], List[str], bool]:
+    """Split a context budget between fixed knowledge and adaptive memory texts.
+
+    Fixed knowledge is first packed into its share of the budget, adaptive memory into the rest,
+    and then fixed knowledge again into whatever adaptive memory left unused. Returns
+    (kept fixed texts, kept adaptive texts, whether anything was truncated or dropped).
+    """
+    budget_tokens = max(0, budget_tokens)
+    kept_fixed, fixed_used, _ = pack_texts(fixed_texts, int(budget_tokens * fixed_share), chars_per_token, min_fragment_tokens)
+    kept_adaptive, adaptive_used, adaptive_truncated = pack_texts(adaptive_texts, budget_tokens - fixed_used, chars_per_token, min_fragment_tokens)
+    kept_fixed, _, fixed_truncated = pack_texts(fixed_texts, budget_tokens - adaptive_used, chars_per_token, min_fragment_tokens)
+    if fixed_truncated or adaptive_truncated:
+        logger.debug(
+            f"Packed {len(kept_fixed)}/{len(fixed_texts)} fixed knowledge and {len(kept_adaptive)}/{len(adaptive_texts)} "
+            f"adaptive memory chunks into a {budget_tokens}-token context budget."
+        )
+    return kept_fixed, kept_adaptive, fixed_truncated or adaptive_truncated
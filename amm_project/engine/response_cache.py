@@ -0,0 +1,123 @@
+"""
+In-process cache of generated responses.
+
+A response is reused when a new query is semantically close to a cached one (cosine
+similarity of the query embeddings at or above a threshold) AND the retrieved context is
+identical, i.e. both prompts were built from the same fixed knowledge, conversation history,
+system instruction and generation settings. The context is compared by fingerprint, so a
+changed knowledge base or a new turn in the conversation never serves a stale answer.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Initialize logger
+logger = logging.getLogger("response_cache")
+
+
+def _normalize(vector: List[float]) -> Optional[Tuple[float, ...]]:
+    norm = math.sqrt(sum(value * value for value in vector))
+    if not norm:
+        return None
+    return tuple(value / norm for value in vector)
+
+
+class ResponseCache:
+    """LRU cache with a time-to-live, keyed by (context fingerprint, query embedding)."""
+
+    def __init__(self, similarity_threshold: float = 0.95, ttl_seconds: Optional[float] = 3600.0, max_entries: int = 1024):
+        """Create an empty cache.
+
+        Args:
+            similarity_threshold: Minimum cosine similarity between query embeddings for a hit
+            ttl_seconds: Seconds an entry stays valid (None for no expiry)
+            max_entries: Maximum number of cached responses
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._next_id = 0
+        # entry ID -> (context fingerprint, normalized query embedding, response, stored at)
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._ids_by_fingerprint: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def _remove(self, entry_id: int) -> None:
+        """Caller holds the lock."""
+        fingerprint = self._entries.pop(entry_id)[0]
+        entry_ids = self._ids_by_fingerprint[fingerprint]
+        entry_ids.remove(entry_id)
+        if not entry_ids:
+            del self._ids_by_fingerprint[fingerprint]
+
+    def _best_match(self, query_vector: Tuple[float, ...], context_fingerprint: str) -> Tuple[Optional[int], float]:
+        """Most similar live entry for the context, dropping expired ones on the way. Caller holds the lock."""
+        now = time.monotonic()
+        best_id, best_similarity = None, -1.0
+        for entry_id in list(self._ids_by_fingerprint.get(context_fingerprint, ())):
+            _, vector, _, stored_at = self._entries[entry_id]
+            if self._expired(stored_at, now):
+                self._remove(entry_id)
+                continue
+            if len(vector) != len(query_vector):
+                continue # Embedding model changed
+            similarity = sum(a * b for a, b in zip(vector, query_vector))
+            if similarity > best_similarity:
+                best_id, best_similarity = entry_id, similarity
+        return best_id, best_similarity
+
+    def get(self, query_embedding: List[float], context_fingerprint: str) -> Optional[Tuple[str, float]]:
+        """Return (cached response, similarity) for a similar query in the same context, or None on a miss."""
+        query_vector = _normalize(query_embedding)
+        with self._lock:
+            if query_vector is not None:
+                entry_id, similarity = self._best_match(query_vector, context_fingerprint)
+                if entry_id is not None and similarity >= self.similarity_threshold:
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id][2], similarity
+            self.misses += 1
+            return None
+
+    def put(self, query_embedding: List[float], context_fingerprint: str, response: str) -> None:
+        """Store a response, replacing a similar entry for the same context and evicting the least recently used when full."""
+        query_vector = _normalize(query_embedding)
+        if query_vector is None:
+            return
+        with self._lock:
+            entry_id, similarity = self._best_match(query_vector, context_fingerprint)
+            if entry_id is not None and similarity >= self.similarity_threshold:
+                self._remove(entry_id)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (context_fingerprint, query_vector, response, time.monotonic())
+            self._ids_by_fingerprint.setdefault(context_fingerprint, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._ids_by_fingerprint.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and the current number of entries."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,43 @@
+"""
+Rolling summaries of long adaptive memory sessions.
+
+Once a session has more unsummarized turns than adaptive_memory.summarize_batch_turns plus
+adaptive_memory.summary_verbatim_turns, the oldest batch is folded into the session's stored
+summary. Retrieval then returns the summary plus the turns after it instead of the full history,
+so the conversation history part of the prompt stops growing with the length of the session.
+"""
+
+import logging
+from typing import List, Optional
+
+from amm_project.models.memory_models import InteractionRecordPydantic
+
+# Initialize logger
+logger = logging.getLogger("session_summary")
+
+SUMMARY_CHUNK_HEADER = "Summary of the earlier conversation:"
+
+SUMMARY_PROMPT_TEMPLATE = (
+    "You maintain a running summary of a conversation between a user and an AI assistant.\n"
+    "Update the summary so it also covers the new turns below. Keep facts, decisions, user preferences "
+    "and open questions; leave out small talk. Write at most {max_words} words of plain prose and "
+    "reply with the summary only.\n\n"
+    "--- Current Summary ---\n{previous_summary}\n\n"
+    "--- New Turns ---\n{turns}\n\n"
+    "--- Updated Summary ---\n"
+)
+
+
+def build_summary_prompt(previous_summary: Optional[str], turns: List[InteractionRecordPydantic], max_words: int) -> str:
+    """Prompt asking the model to fold `turns` (oldest first) into `previous_summary`."""
+    turns_text = "\n\n".join(f"User: {turn.query}\nAI: {turn.response}" for turn in turns)
+    return SUMMARY_PROMPT_TEMPLATE.format(
+        max_words=max_words,
+        previous_summary=previous_summary or "(none yet)",
+        turns=turns_text
+    )
+
+
+def format_summary_text(summary: str) -> str:
+    """Text of the summary as it appears in the conversation history of the prompt."""
+    return f"{SUMMARY_CHUNK_HEADER}\n{summary}"
@@ -71,13 +71,53 @@ class KnowledgeSourceConfig(BaseModel):
                 raise ValueError(f"'path' is required for knowledge source type '{source_type.value}'")
         return values
 
+class AdaptiveMemoryStrategy(str, Enum):
+    RECENT = "recent" # Most recent interactions
+    RELEVANT = "relevant" # Most similar interactions (embedded at write time), optionally blended with recency
+
+class AdaptiveMemoryScope(str, Enum):
+    GLOBAL = "global" # All interactions, regardless of who made them
+    USER = "user" # Interactions of the requesting user (if a user_id is given)
+    SESSION = "session" # Interactions of the requesting session, else of the requesting user
+
+class AdaptiveMemoryBackend(str, Enum):
+    SQL = "sql" # Any SQLAlchemy database; the per-design SQLite file unless a URL is configured
+    MEMORY = "memory" # Process-local dict, not persisted (benchmarks, stateless deployments)
+
 class AdaptiveMemoryConfig(BaseModel):
     enabled: bool = True
     db_name_prefix: str = Field("adaptive_memory_cache", description="Prefix for the SQLite DB name.")
+    backend: AdaptiveMemoryBackend = AdaptiveMemoryBackend.SQL
+    db_url: Optional[str] = Field(None, description="SQLAlchemy URL of a shared database (e.g. PostgreSQL) for the SQL backend. None for the per-design SQLite file.")
+    db_url_env_var: Optional[str] = Field(None, description="Environment variable holding the database URL; takes precedence over db_url and keeps credentials out of the design.")
     # Maximum number of recent interactions to retrieve for context
     retrieval_limit: int = 10 
-    # Future: strategy: str = "recent" # e.g., recent, relevant (requires embeddings)
+    strategy: AdaptiveMemoryStrategy = AdaptiveMemoryStrategy.RECENT
+    scope: AdaptiveMemoryScope = Field(AdaptiveMemoryScope.SESSION, description="Which interactions are retrieved when a query carries a session/user ID.")
+    # Settings for the relevant strategy: score = (1 - recency_weight) * similarity + recency_weight * recency
+    recency_weight: float = Field(0.3, ge=0.0, le=1.0, description="Weight of recency in the blended score. 0 ranks by similarity only.")
+    recency_half_life_hours: float = Field(24.0, gt=0, description="Age at which an interaction's recency score halves.")
+    relevance_candidate_multiplier: int = Field(4, ge=1, description="Candidates fetched from the vector index per returned interaction, before blending.")
     retention_policy_days: Optional[int] = Field(None, description="How long to retain adaptive memories in days. None for indefinite.")
+    retention_check_interval_minutes: float = Field(60.0, gt=0, description="How often the background retention job prunes expired memories.")
+    retention_delete_batch_size: int = Field(1000, ge=1, description="Expired memories deleted per transaction.")
+    archive_pruned_records: bool = Field(False, description="Append pruned memories to a gzip-compressed JSONL archive in the instance data path.")
+    # Write-behind: interactions from process_query are queued and inserted in batches off the request path.
+    # Queued interactions become visible to retrieval only after the next flush.
+    write_behind_enabled: bool = False
+    write_behind_batch_size: int = Field(100, ge=1, description="Flush once this many interactions are queued.")
+    write_behind_flush_interval_seconds: float = Field(1.0, gt=0, description="Flush at the latest this long after the first queued interaction.")
+    write_behind_max_queue_size: int = Field(10_000, ge=1, description="When full, interactions are written synchronously instead.")
+    # Rolling summarization: older turns of a session are condensed into a stored summary, and retrieval
+    # returns that summary plus the turns after it, so prompt size stays roughly constant as a conversation grows
+    summarization_enabled: bool = False
+    summarize_batch_turns: int = Field(20, ge=1, description="Turns folded into the session summary at a time.")
+    summary_verbatim_turns: int = Field(6, ge=0, description="Most recent turns that are never folded into the summary.")
+    summary_max_words: int = Field(250, ge=20, description="Target maximum length of a session summary.")
+    # Connection handling for the SQLite database
+    db_pool_size: int = Field(5, ge=1, description="Pooled connections kept open (plus as many overflow connections under load).")
+    db_busy_timeout_seconds: float = Field(5.0, ge=0, description="How long a connection waits for a lock held by another writer.")
+    db_lock_retries: int = Field(3, ge=0, description="Retries of a write that still fails with 'database is locked' after the busy timeout.")
 
 class DynamicContextFunction(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -98,6 +138,61 @@ class GeminiConfig(BaseModel):
     top_k: Optional[int] = Field(None, ge=0)
     max_output_tokens: Optional[int] = Field(2048)
 
+class EmbeddingConfig(BaseModel):
+    # Persistent embedding cache stored in the instance data path, keyed by (model, task type, text hash)
+    cache_enabled: bool = Field(True, description="Reuse embeddings of unchanged text across engine restarts.")
+    cache_max_entries: int = Field(200_000, ge=1, description="Maximum number of cached embeddings before LRU eviction.")
+    cache_max_size_mb: Optional[float] = Field(512.0, gt=0, description="Maximum size of cached vectors in MB. None for no size limit.")
+    # Batched ingestion: several texts per request, several requests in flight
+    batch_size: int = Field(100, ge=1, le=100, description="Texts per batch embedding request (Gemini accepts at most 100).")
+    max_concurrent_requests: int = Field(4, ge=1, description="Maximum number of batch embedding requests in flight.")
+    max_retries: int = Field(5, ge=0, description="Retries for rate-limited or temporarily unavailable embedding requests.")
+    retry_initial_delay_seconds: float = Field(1.0, gt=0, description="Initial backoff delay, doubled on every retry.")
+    retry_max_delay_seconds: float = Field(30.0, gt=0, description="Upper bound for a single backoff delay.")
+    # In-process cache for query embeddings (queries are not written to the persistent cache)
+    query_cache_enabled: bool = Field(True, description="Cache query embeddings in memory for repeated queries.")
+    query_cache_max_entries: int = Field(1024, ge=1, description="Maximum number of cached query embeddings.")
+    query_cache_ttl_seconds: Optional[float] = Field(3600.0, gt=0, description="Seconds a cached query embedding stays valid. None for no expiry.")
+    query_cache_casefold: bool = Field(False, description="Let queries that differ only in case share a cached query embedding.")
+
+class VectorIndexType(str, Enum):
+    AUTO = "auto" # IVF_HNSW_SQ below ivf_pq_min_rows, IVF_PQ above
+    IVF_PQ = "IVF_PQ"
+    IVF_HNSW_SQ = "IVF_HNSW_SQ"
+
+class VectorIndexConfig(BaseModel):
+    # Approximate nearest neighbour index for the fixed knowledge LanceDB table
+    enabled: bool = True
+    min_rows_for_index: int = Field(10_000, ge=256, description="Below this row count the table is searched by brute force.")
+    index_type: VectorIndexType = VectorIndexType.AUTO
+    ivf_pq_min_rows: int = Field(1_000_000, ge=1, description="Row count from which 'auto' switches from IVF_HNSW_SQ to IVF_PQ.")
+    num_partitions: Optional[int] = Field(None, ge=1, description="IVF partitions. None to derive from the row count.")
+    num_sub_vectors: Optional[int] = Field(None, ge=1, description="PQ sub-vectors (must divide the vector dimension). None to derive from it.")
+    rebuild_threshold: float = Field(0.1, ge=0.0, description="Share of changed rows above which ingestion retrains the index; smaller changes are folded in with table.optimize().")
+    # Query-time settings
+    nprobes: int = Field(20, ge=1, description="IVF partitions probed per query.")
+    refine_factor: Optional[int] = Field(None, ge=1, description="Re-rank limit * refine_factor candidates with exact distances. None to skip.")
+
+class RetrievalConfig(BaseModel):
+    # Fixed knowledge and adaptive memory are retrieved concurrently; a stage that exceeds its budget contributes no context
+    fixed_knowledge_limit: int = Field(3, ge=1, description="Number of fixed knowledge chunks added to the prompt.")
+    fixed_knowledge_timeout_seconds: Optional[float] = Field(5.0, gt=0, description="Budget for query embedding + LanceDB search. None to wait indefinitely.")
+    adaptive_memory_timeout_seconds: Optional[float] = Field(2.0, gt=0, description="Budget for the adaptive memory lookup. None to wait indefinitely.")
+
+class PromptBudgetConfig(BaseModel):
+    # Retrieved context is packed into what the system instruction and the current query leave of the budget
+    max_prompt_tokens: Optional[int] = Field(8192, ge=256, description="Upper bound for the estimated prompt size in tokens. None for no limit.")
+    fixed_knowledge_share: float = Field(0.6, ge=0.0, le=1.0, description="Share of the context budget reserved for fixed knowledge; budget one context type leaves unused goes to the other.")
+    chars_per_token: float = Field(4.0, gt=0, description="Characters per token used to estimate token counts.")
+    min_truncated_chunk_tokens: int = Field(64, ge=1, description="A chunk that does not fit is truncated only if at least this many tokens remain; otherwise it is dropped.")
+
+class ResponseCacheConfig(BaseModel):
+    # Reuses a generated response for a similar query asked against identical retrieved context
+    enabled: bool = Field(False, description="Serve near-duplicate queries from cache instead of calling the model.")
+    similarity_threshold: float = Field(0.95, gt=0.0, le=1.0, description="Minimum cosine similarity between query embeddings for a cache hit.")
+    ttl_seconds: Optional[float] = Field(3600.0, gt=0, description="Seconds a cached response stays valid. None for no expiry.")
+    max_entries: int = Field(1024, ge=1, description="Maximum number of cached responses before LRU eviction.")
+
 class AgentPrompts(BaseModel):
     system_instruction: str = Field("You are a helpful AI assistant.", description="Core instruction for the agent.")
     welcome_message: Optional[str] = Field("Hello! How can I assist you today?", description="Initial message from the agent.")
@@ -115,6 +210,11 @@ class AMMDesign(BaseModel):
     adaptive_memory: AdaptiveMemoryConfig = Field(default_factory=AdaptiveMemoryConfig)
     dynamic_context_functions: List[DynamicContextFunction] = Field(default_factory=list)
     gemini_config: GeminiConfig = Field(default_factory=GeminiConfig)
+    embedding: EmbeddingConfig = Field(default_factory=EmbeddingConfig)
+    vector_index: VectorIndexConfig = Field(default_factory=VectorIndexConfig)
+    retrieval: RetrievalConfig = Field(default_factory=RetrievalConfig)
+    prompt_budget: PromptBudgetConfig = Field(default_factory=PromptBudgetConfig)
+    response_cache: ResponseCacheConfig = Field(default_factory=ResponseCacheConfig)
     agent_prompts: AgentPrompts = Field(default_factory=AgentPrompts)
 
     # Make these fields optional to support existing JSONs
@@ -1,7 +1,10 @@
 import datetime
-from typing import Optional, Dict, Any
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, JSON
+import time
+from typing import Optional, Dict, Any, Callable, TypeVar
+from sqlalchemy import create_engine, event, make_url, Column, Index, Integer, String, Text, DateTime, JSON
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlalchemy.orm import sessionmaker
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -30,6 +33,18 @@ class InteractionRecordUpdatePydantic(BaseModel):
     # No need for id or timestamp in an update model usually, or make timestamp explicitly updatable if needed.
 
 
+class ConversationSummaryPydantic(BaseModel):
+    """Rolling summary of a session's older interactions (see AdaptiveMemoryConfig.summarization_enabled)."""
+    session_id: str
+    user_id: Optional[str] = None
+    summary: str
+    covered_through_id: int = Field(..., description="ID of the newest interaction record included in the summary.")
+    turns_summarized: int = 0
+    updated_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 # --- SQLAlchemy ORM Models ---
 
 Base = declarative_base()
@@ -42,19 +57,118 @@ class InteractionRecordORM(Base):
     user_id = Column(String, index=True, nullable=True)
     query = Column(Text, nullable=False)
     response = Column(Text, nullable=False)
-    timestamp = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc), nullable=False)
+    timestamp = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc), nullable=False, index=True)
     additional_metadata = Column(JSON, nullable=True) # Renamed from 'metadata'
 
+    # Recent-history queries sort by timestamp, optionally within one session or user
+    __table_args__ = (
+        Index("ix_interaction_records_session_id_timestamp", "session_id", "timestamp"),
+        Index("ix_interaction_records_user_id_timestamp", "user_id", "timestamp"),
+    )
+
     def __repr__(self):
         return f"<InteractionRecordORM(id={self.id}, query='{self.query[:30]}...', response='{self.response[:30]}...')>"
 
+class ConversationSummaryORM(Base):
+    __tablename__ = "conversation_summaries"
+
+    session_id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=True)
+    summary = Column(Text, nullable=False)
+    covered_through_id = Column(Integer, nullable=False)
+    turns_summarized = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f"<ConversationSummaryORM(session_id='{self.session_id}', covered_through_id={self.covered_through_id})>"
+
 # --- Database Utility Functions (can be expanded) ---
 
-def create_db_engine_and_tables(db_url: str):
-    engine = create_engine(db_url)
+# Applied to every new SQLite connection. auto_vacuum only takes effect on databases created with it
+# (existing files keep their mode until a full VACUUM), which lets retention use incremental vacuum.
+# It must come first: switching to WAL initializes the file header.
+SQLITE_PRAGMAS = {
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024, # Negative values are KiB, i.e. 64 MiB
+    "temp_store": "MEMORY",
+}
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def migrate_interaction_records_schema(engine) -> None:
+    """Brings an existing interaction_records table up to date in place (no Alembic).
+
+    create_all only creates missing tables, so indexes added to the ORM model later are created
+    here for databases written by older versions.
+    """
+    for index in InteractionRecordORM.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA optimize")
+
+def create_db_engine_and_tables(db_url: str, pool_size: int = 5, busy_timeout_seconds: float = 5.0):
+    """Creates the SQLAlchemy engine, tables and indexes for adaptive memory.
+
+    SQLite file databases get a sized QueuePool of connections usable from any thread, each
+    waiting up to busy_timeout_seconds for a lock instead of failing with "database is locked".
+    In-memory SQLite databases share a single connection (StaticPool), as each new connection
+    would otherwise see an empty database. Other databases (e.g. PostgreSQL) get a sized pool
+    whose connections are checked before use, as the server may have closed them.
+    """
+    url = make_url(db_url)
+    engine_kwargs: Dict[str, Any] = {}
+    if url.get_backend_name() == "sqlite":
+        engine_kwargs["connect_args"] = {"check_same_thread": False, "timeout": busy_timeout_seconds}
+        if url.database in (None, "", ":memory:"):
+            engine_kwargs["poolclass"] = StaticPool
+        else:
+            engine_kwargs.update(poolclass=QueuePool, pool_size=pool_size, max_overflow=pool_size)
+    else:
+        engine_kwargs.update(pool_size=pool_size, max_overflow=pool_size, pool_pre_ping=True)
+    engine = create_engine(url, **engine_kwargs)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
     Base.metadata.create_all(bind=engine)
+    migrate_interaction_records_schema(engine)
     return engine
 
 def get_session_local(engine):
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     return SessionLocal
+
+T = TypeVar("T")
+
+def is_lock_error(error: Exception) -> bool:
+    """True for SQLite lock contention errors, which are safe to retry after a rollback."""
+    if not isinstance(error, OperationalError):
+        return False
+    message = str(error.orig if error.orig is not None else error).lower()
+    return "database is locked" in message or "database is busy" in message or "database table is locked" in message
+
+def retry_on_lock(operation: Callable[[], T], session=None, retries: int = 3, initial_delay_seconds: float = 0.05) -> T:
+    """Runs a write operation, retrying it with exponential backoff while the database is locked.
+
+    The operation must be a complete unit of work (add + commit); if a session is given it is
+    rolled back before each retry so the unit starts from a clean transaction.
+    """
+    attempt = 0
+    while True:
+        try:
+            return operation()
+        except OperationalError as e:
+            if attempt >= retries or not is_lock_error(e):
+                raise
+            if session is not None:
+                session.rollback()
+            time.sleep(initial_delay_seconds * (2 ** attempt))
+            attempt += 1
@@ -3,16 +3,19 @@ MCP Server implementation for AMM.
 This file serves as a template that will be copied to the build directory.
 """
 
+import asyncio
 import json
 import os
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, AsyncIterator, Tuple
 
 from fastapi import FastAPI, Request, HTTPException, Depends, Header
 from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 
 # Import AMM components
@@ -70,6 +73,10 @@ class AMMModelServer:
     def __init__(self, design_path: str, build_dir: str):
         """Initialize with AMM design and build directory."""
         self.logger = logging.getLogger("amm_mcp_server")
+        # Identical concurrent requests share one computation (see process_request)
+        self.coalesce_requests = os.environ.get("MCP_COALESCE_REQUESTS", "true").lower() == "true"
+        self._in_flight: Dict[str, "asyncio.Task"] = {}
+        self.coalesced_request_count = 0
         
         try:
             # Load design from file
@@ -119,8 +126,22 @@ class AMMModelServer:
                 self.logger.error(f"Failed to create fallback design: {fallback_error}")
                 raise
     
+    @staticmethod
+    def _identity_from_context(context: Dict[str, Any]) -> Dict[str, str]:
+        """Session and user IDs from an MCP request context, which scope the adaptive memory used for the request."""
+        return {key: str(context[key]) for key in ("session_id", "user_id") if context.get(key)}
+
+    @staticmethod
+    def _request_key(query_text: str, parameters: Dict[str, Any], identity: Dict[str, str]) -> str:
+        """Key under which identical requests (same query, parameters and session/user scope) are coalesced."""
+        return json.dumps([query_text, parameters, identity], sort_keys=True, default=str)
+
     async def process_request(self, request: MCPRequest) -> MCPResponse:
-        """Process an MCP request and return an MCP response."""
+        """Process an MCP request and return an MCP response.
+
+        While a request is being processed, identical requests join its computation instead of
+        starting their own, and receive the same response (marked "coalesced" in the metadata).
+        """
         try:
             # Extract query from request
             query_text = request.query
@@ -130,24 +151,27 @@ class AMMModelServer:
             
             # Handle context if provided
             context = request.context or {}
-            
-            # Process the query using AMM engine
-            result = self.engine.process_query(query_text)
-            
-            # Check if result is a string or a dictionary
-            if isinstance(result, str):
-                response_text = result
-                metadata = {
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                }
+            identity = self._identity_from_context(context)
+
+            if not self.coalesce_requests:
+                response_text, metadata = await self._execute_request(query_text, identity)
+                return MCPResponse(response=response_text, metadata=metadata)
+
+            request_key = self._request_key(query_text, parameters, identity)
+            task = self._in_flight.get(request_key)
+            coalesced = task is not None
+            if coalesced:
+                self.coalesced_request_count += 1
+                self.logger.info(f"Coalescing request with an identical in-flight request ({len(self._in_flight)} in flight).")
             else:
-                response_text = result.get("response", str(result))
-                metadata = {
-                    "query_id": result.get("query_id", ""),
-                    "timestamp": str(result.get("timestamp", datetime.now(timezone.utc).isoformat())),
-                    "knowledge_sources_used": result.get("knowledge_sources_used", []),
-                    "memory_records_used": result.get("memory_records_used", [])
-                }
+                task = asyncio.ensure_future(self._execute_request(query_text, identity))
+                self._in_flight[request_key] = task
+                task.add_done_callback(lambda _: self._in_flight.pop(request_key, None))
+            # Shielded so that a disconnecting client does not cancel the computation other requests wait for
+            response_text, metadata = await asyncio.shield(task)
+            metadata = dict(metadata)
+            if coalesced:
+                metadata["coalesced"] = True
             
             # Format the response according to MCP standards
             response = MCPResponse(
@@ -163,6 +187,56 @@ class AMMModelServer:
             # Raise HTTP exception
             raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+    async def _execute_request(self, query_text: str, identity: Dict[str, str]) -> Tuple[str, Dict[str, Any]]:
+        """Runs a query through the engine. Returns (response text, response metadata)."""
+        # Process the query using AMM engine without blocking the event loop
+        if hasattr(self.engine, "process_query_detailed_async"):
+            result = await self.engine.process_query_detailed_async(query_text, **identity)
+        elif hasattr(self.engine, "process_query_async"):
+            result = await self.engine.process_query_async(query_text, **identity)
+        else:
+            result = await run_in_threadpool(self.engine.process_query, query_text, **identity)
+        
+        # Check if result is a string or a dictionary
+        if isinstance(result, str):
+            response_text = result
+            metadata = {
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
+        else:
+            response_text = result.get("response", str(result))
+            metadata = {
+                "query_id": result.get("query_id", ""),
+                "timestamp": str(result.get("timestamp", datetime.now(timezone.utc).isoformat())),
+                "knowledge_sources_used": result.get("knowledge_sources_used", []),
+                "memory_records_used": result.get("memory_records_used", [])
+            }
+            if "prompt_tokens" in result:
+                metadata["prompt_tokens"] = result["prompt_tokens"]
+                metadata["context_truncated"] = result.get("context_truncated", False)
+            if "cache_hit" in result:
+                metadata["cache_hit"] = result["cache_hit"]
+        return response_text, metadata
+
+    async def stream_request(self, request: MCPRequest) -> AsyncIterator[str]:
+        """Process an MCP request and yield the response as NDJSON-encoded MCPStreamChunk lines."""
+        query_text = request.query
+        try:
+            if hasattr(self.engine, "stream_query_async"):
+                identity = self._identity_from_context(request.context or {})
+                async for chunk_text in self.engine.stream_query_async(query_text, **identity):
+                    yield MCPStreamChunk(chunk=chunk_text).model_dump_json() + "\n"
+            else:
+                # Engines without a streaming API deliver the whole response as a single chunk
+                response = await self.process_request(request)
+                yield MCPStreamChunk(chunk=response.response).model_dump_json() + "\n"
+            final_metadata = {"timestamp": datetime.now(timezone.utc).isoformat()}
+        except Exception as e:
+            # Headers are already sent, so errors are reported in the final chunk instead of an HTTP status
+            logger.error(f"Error streaming request: {type(e).__name__} - {e}")
+            final_metadata = {"error": f"Error processing request: {str(e)}"}
+        yield MCPStreamChunk(chunk="", is_final=True, metadata=final_metadata).model_dump_json() + "\n"
+
 # API Key validation (if enabled)
 async def validate_api_key(
     x_api_key: Optional[str] = Header(None),
@@ -188,11 +262,20 @@ async def validate_api_key(
                 detail="Invalid API key"
             )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Drain background work (e.g. buffered interaction writes) before the server exits."""
+    yield
+    engine = getattr(globals().get("model_server"), "engine", None)
+    if engine is not None and hasattr(engine, "close"):
+        await run_in_threadpool(engine.close)
+
 # Create FastAPI app
 app = FastAPI(
     title="AMM MCP Server",
     description="Model Control Protocol server for Adaptive Memory Module",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -255,6 +338,26 @@ async def generate(request: MCPRequest):
         print(f"ERROR: {error_msg}")
         raise HTTPException(status_code=500, detail=error_msg)
 
+@app.post("/generate/stream", dependencies=[Depends(validate_api_key)])
+async def generate_stream(request: MCPRequest):
+    """Streaming variant of /generate. Returns newline-delimited JSON MCPStreamChunk objects as they are generated."""
+    global model_server
+    if model_server is None:
+        try:
+            print(f"Initializing model server on demand...")
+            model_server = AMMModelServer(DESIGN_PATH, BUILD_DIR)
+            print(f"Successfully initialized model server for design: {model_server.design.name}")
+        except Exception as e:
+            error_msg = f"Failed to initialize model server: {type(e).__name__} - {str(e)}"
+            print(f"ERROR: {error_msg}")
+            raise HTTPException(
+                status_code=500, 
+                detail=error_msg
+            )
+
+    print(f"Streaming request: {request.query[:50]}...")
+    return StreamingResponse(model_server.stream_request(request), media_type="application/x-ndjson")
+
 @app.get("/info", dependencies=[Depends(validate_api_key)])
 async def info():
     """Return information about this MCP server."""
@@ -287,7 +390,7 @@ async def info():
             "capabilities": {
                 "fixed_knowledge": len(knowledge_sources) > 0,
                 "adaptive_memory": adaptive_memory_enabled,
-                "streaming": False
+                "streaming": True
             }
         }
     except Exception as e:
@@ -298,7 +401,12 @@ async def info():
 @app.get("/health")
 async def health():
     """Health check endpoint."""
-    return {"status": "ok", "timestamp": datetime.now(timezone.utc).isoformat()}
+    health_status = {"status": "ok", "timestamp": datetime.now(timezone.utc).isoformat()}
+    engine = getattr(model_server, "engine", None)
+    if engine is not None and hasattr(engine, "get_adaptive_memory_metrics"):
+        # Write-behind queue depth etc., for monitoring
+        health_status["adaptive_memory"] = engine.get_adaptive_memory_metrics()
+    return health_status
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,16 @@
+"""
+Content hashing shared by the knowledge manifest and the PDF cache.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Union
+
+
+def hash_file(file_path: Union[str, Path], block_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -5,14 +5,64 @@ PDF Processing module for extracting and chunking text from PDF files.
 import os
 import re
 import io
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
-import uuid
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 import logging
+from collections import deque
+
+from amm_project.utils.hashing import hash_file
 
 # Initialize logger
 logger = logging.getLogger("pdf_processor")
 
+# Bump when the layout of cached pages or chunks, or the chunking itself, changes
+CACHE_VERSION = 3
+# Maps each processed file path to the content hash its cache entries were written for
+CACHE_INDEX_FILENAME = "paths.json"
+
+
+def make_chunk_id(text: str, page_start: int, page_end: int) -> str:
+    """Return a deterministic chunk ID derived from the chunk's page span and content.
+    
+    The same chunk of the same document gets the same ID on every run, so callers can
+    upsert on it and recognize chunks they already stored.
+    """
+    content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return f"pdf_p{page_start}-{page_end}_{content_hash}"
+
+
+def _extract_page_range(file_path: str, first_page: int, last_page: int) -> List[str]:
+    """Extract the text of pages [first_page, last_page) with pdfplumber.
+
+    Module-level so it can run in worker processes.
+    """
+    import pdfplumber
+    page_texts = []
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages[first_page:last_page]:
+            page_texts.append(page.extract_text(x_tolerance=3) or "")
+            page.flush_cache()  # Keep memory flat on long documents
+    return page_texts
+
+
+def _ocr_page_text(file_path: str, page_number: int, dpi: int) -> str:
+    """Render a single page (1-based) and OCR it.
+
+    Module-level so it can run in worker processes; only the one page image is held in memory.
+    """
+    import pytesseract
+    from pdf2image import convert_from_path
+    images = convert_from_path(file_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    try:
+        return "".join(pytesseract.image_to_string(image) or "" for image in images)
+    finally:
+        for image in images:
+            image.close()
+
+
 class PDFProcessor:
     """Processes PDF files into knowledge chunks for the AMM system."""
     
@@ -24,11 +74,28 @@ class PDFProcessor:
                 - chunk_size: Maximum characters per chunk (default: 1000)
                 - chunk_overlap: Overlap between chunks (default: 200)
                 - min_chunk_size: Minimum chunk size to keep (default: 50)
+                - parallel_min_pages: PDFs with at least this many pages are extracted
+                  in a process pool (default: 100)
+                - pages_per_task: Pages extracted per worker task (default: 25)
+                - max_workers: Worker processes for parallel extraction (default: CPU count)
+                - min_page_text_chars: Pages with less extracted text are treated as
+                  scanned and OCRed if OCR is enabled (default: 25)
+                - ocr_workers: Worker processes for OCR; 1 OCRs in-process (default: max_workers)
+                - ocr_dpi: Resolution pages are rendered at for OCR (default: 200)
+                - cache_dir: Directory for cached page texts and chunks, keyed by file
+                  content hash and settings (default: None, no caching)
         """
         self.config = config or {}
         self.chunk_size = self.config.get("chunk_size", 1000)
         self.chunk_overlap = self.config.get("chunk_overlap", 200)
         self.min_chunk_size = self.config.get("min_chunk_size", 50)
+        self.parallel_min_pages = self.config.get("parallel_min_pages", 100)
+        self.pages_per_task = max(1, self.config.get("pages_per_task", 25))
+        self.max_workers = self.config.get("max_workers") or os.cpu_count() or 1
+        self.min_page_text_chars = self.config.get("min_page_text_chars", 25)
+        self.ocr_workers = self.config.get("ocr_workers") or self.max_workers
+        self.ocr_dpi = self.config.get("ocr_dpi", 200)
+        self.cache_dir = Path(self.config["cache_dir"]) if self.config.get("cache_dir") else None
         
         # Try to import PDF libraries - using try/except for graceful
         # handling if some libraries aren't available
@@ -57,48 +124,44 @@ class PDFProcessor:
             self.pytesseract = None
             self.convert_from_path = None
     
-    def detect_pdf_type(self, file_path: str) -> str:
-        """Detect the type of PDF (text-based or scanned/image-based).
+    def chunker_settings(self) -> Dict[str, Any]:
+        """Return the settings that determine how a PDF is chunked.
+        
+        Callers can use these to detect when previously produced chunks are stale.
+        
+        Returns:
+            Dictionary of chunking settings
+        """
+        return {
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "min_chunk_size": self.min_chunk_size
+        }
+    
+    def extraction_settings(self, ocr_if_needed: bool = True) -> Dict[str, Any]:
+        """Return the settings that determine the extracted page texts.
         
         Args:
-            file_path: Path to the PDF file
+            ocr_if_needed: Whether pages that appear to be scanned are OCRed
             
         Returns:
-            String indicating 'text', 'scanned', or 'unknown'
+            Dictionary of extraction settings
         """
-        # Default to unknown
-        pdf_type = "unknown"
-        
-        # Basic detection using PyPDF2
-        if self.PyPDF2:
-            try:
-                with open(file_path, 'rb') as file:
-                    reader = self.PyPDF2.PdfReader(file)
-                    # Check a sample of pages
-                    pages_to_check = min(3, len(reader.pages))
-                    text_content = ""
-                    
-                    for i in range(pages_to_check):
-                        page = reader.pages[i]
-                        text_content += page.extract_text() or ""
-                    
-                    # If we extracted a reasonable amount of text, it's probably a text PDF
-                    if len(text_content.strip()) > 100:
-                        pdf_type = "text"
-                    else:
-                        # Likely a scanned document if little text was extracted
-                        pdf_type = "scanned"
-            except Exception as e:
-                logger.error(f"Error detecting PDF type: {e}")
-        
-        return pdf_type
+        ocr_enabled = ocr_if_needed and self.pytesseract is not None and self.convert_from_path is not None
+        return {
+            "ocr": ocr_enabled,
+            "min_page_text_chars": self.min_page_text_chars,
+            "ocr_dpi": self.ocr_dpi if ocr_enabled else None
+        }
     
-    def process_file(self, file_path: str, ocr_if_needed: bool = True) -> List[Dict[str, Any]]:
+    def process_file(self, file_path: str, ocr_if_needed: bool = True, file_hash: Optional[str] = None) -> List[Dict[str, Any]]:
         """Process a PDF file into knowledge chunks.
         
         Args:
             file_path: Path to the PDF file
-            ocr_if_needed: Whether to use OCR if the PDF appears to be scanned
+            ocr_if_needed: Whether to use OCR for pages that appear to be scanned
+            file_hash: SHA-256 hex digest of the file content, if the caller already has it;
+                saves hashing the file again for the cache lookup
             
         Returns:
             List of knowledge chunks, each with text and metadata
@@ -110,36 +173,62 @@ class PDFProcessor:
             logger.error(f"PDF file not found: {file_path}")
             return []
         
-        # Detect PDF type
-        pdf_type = self.detect_pdf_type(file_path)
-        logger.info(f"Detected PDF type: {pdf_type} for {file_path}")
+        # Reuse the chunks, or at least the page texts, of an earlier run on the same content
+        extraction_settings = self.extraction_settings(ocr_if_needed)
+        chunks_cache_path = pages_cache_path = cached_pages = None
+        if self.cache_dir is not None:
+            file_hash = file_hash or hash_file(file_path)
+            self._prune_cache(file_path, file_hash)
+            chunks_cache_path = self._cache_path(file_hash, "chunks", {**extraction_settings, **self.chunker_settings()})
+            cached_chunks = self._read_cache(chunks_cache_path)
+            if cached_chunks is not None:
+                logger.info(f"Loaded {len(cached_chunks['chunks'])} cached chunks for {file_path}")
+                for chunk in cached_chunks["chunks"]:
+                    chunk["metadata"]["file_name"] = os.path.basename(file_path)
+                return cached_chunks["chunks"]
+            pages_cache_path = self._cache_path(file_hash, "pages", extraction_settings)
+            cached_pages = self._read_cache(pages_cache_path)
         
-        # Extract text based on detected type
-        if pdf_type == "scanned" and ocr_if_needed and self.pytesseract:
-            # Use OCR for scanned PDFs
-            text = self._extract_text_with_ocr(file_path)
+        if cached_pages is not None:
+            logger.info(f"Loaded {len(cached_pages['pages'])} cached page texts for {file_path}")
+            page_stats = cached_pages["page_stats"]
+            chunks = list(self._chunk_pages(cached_pages["pages"]))
         else:
-            # Use standard extraction for text PDFs
-            text = self._extract_text(file_path)
+            # Extract (OCRing pages without a text layer) and chunk in a single pass over the document
+            page_stats = {"pages": 0, "low_text_pages": 0, "ocr_pages": 0}
+            extracted_pages: List[str] = []
+            page_texts = self._iter_document_pages(file_path, ocr_if_needed, page_stats)
+            if pages_cache_path is not None:
+                page_texts = self._record_pages(page_texts, extracted_pages)
+            chunks = list(self._chunk_pages(page_texts))
+            if pages_cache_path is not None and page_stats["pages"]:
+                self._write_cache(pages_cache_path, {"pages": extracted_pages, "page_stats": page_stats})
+        
+        # The PDF type is a by-product of the extraction pass
+        pdf_type = self._pdf_type_from_page_stats(page_stats)
+        logger.info(f"Detected PDF type: {pdf_type} for {file_path} ({page_stats['pages']} pages, {page_stats['ocr_pages']} OCRed)")
         
         # If text extraction failed, return empty result
-        if not text:
+        if not chunks:
             logger.warning(f"No text extracted from PDF: {file_path}")
             return []
         
-        # Chunk the extracted text
-        chunks = self._chunk_text(text)
-        
         # Create knowledge chunks with metadata
         knowledge_chunks = []
+        chunk_ids = set()
         file_name = os.path.basename(file_path)
         
-        for i, chunk_text in enumerate(chunks):
+        for i, (chunk_text, page_start, page_end) in enumerate(chunks):
             # Skip chunks that are too small
             if len(chunk_text) < self.min_chunk_size:
                 continue
-                
-            chunk_id = f"pdf_{uuid.uuid4().hex[:8]}"
+            
+            # Identical text on the same pages is the same chunk; keep only its first occurrence
+            chunk_id = make_chunk_id(chunk_text, page_start, page_end)
+            if chunk_id in chunk_ids:
+                logger.debug(f"Skipping duplicate chunk {chunk_id} of {file_path}")
+                continue
+            chunk_ids.add(chunk_id)
             knowledge_chunks.append({
                 "id": chunk_id,
                 "text": chunk_text,
@@ -150,13 +239,152 @@ class PDFProcessor:
                     "pdf_type": pdf_type,
                     "chunk_index": i,
                     "chunk_size": len(chunk_text),
-                    "total_chunks": len(chunks)
+                    "total_chunks": len(chunks),
+                    "page_start": page_start,
+                    "page_end": page_end
                 }
             })
         
         logger.info(f"Processed PDF into {len(knowledge_chunks)} chunks")
+        if chunks_cache_path is not None:
+            self._write_cache(chunks_cache_path, {"chunks": knowledge_chunks})
         return knowledge_chunks
     
+    @staticmethod
+    def _record_pages(page_texts: Iterable[str], sink: List[str]) -> Iterator[str]:
+        """Pass page texts through, appending each one to sink."""
+        for page_text in page_texts:
+            sink.append(page_text)
+            yield page_text
+    
+    def _cache_path(self, file_hash: str, kind: str, settings: Dict[str, Any]) -> Path:
+        """Path of the cache entry of a kind ('pages' or 'chunks') for a file content hash and settings."""
+        settings_hash = hashlib.sha256(json.dumps({"version": CACHE_VERSION, **settings}, sort_keys=True).encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{file_hash}.{kind}.{settings_hash[:16]}.json"
+    
+    def _prune_cache(self, file_path: str, file_hash: str) -> None:
+        """Record file_hash as the content of file_path and delete the entries of its previous content.
+        
+        Entries of the previous content are kept while another recorded path has the same content.
+        """
+        index_path = self.cache_dir / CACHE_INDEX_FILENAME
+        paths = (self._read_cache(index_path) or {}).get("paths", {})
+        path_key = str(Path(file_path).resolve())
+        previous_hash = paths.get(path_key)
+        if previous_hash == file_hash:
+            return
+        paths[path_key] = file_hash
+        if previous_hash and previous_hash not in paths.values():
+            for stale_path in self.cache_dir.glob(f"{previous_hash}.*.json"):
+                try:
+                    stale_path.unlink()
+                except OSError as e:
+                    logger.warning(f"Failed to delete stale PDF cache entry {stale_path}: {e}")
+            logger.info(f"Pruned PDF cache entries of the previous content of {file_path}")
+        self._write_cache(index_path, {"paths": paths})
+    
+    def _read_cache(self, cache_path: Path) -> Optional[Dict[str, Any]]:
+        """Load a cache entry. Returns None if it is missing or unreadable."""
+        if not cache_path.is_file():
+            return None
+        try:
+            return json.loads(cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable PDF cache entry {cache_path}: {e}")
+            return None
+    
+    def _write_cache(self, cache_path: Path, data: Dict[str, Any]) -> None:
+        """Atomically write a cache entry; failures only cost a re-extraction later."""
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Failed to write PDF cache entry {cache_path}: {e}")
+    
+    def _iter_document_pages(self, file_path: str, ocr_if_needed: bool, page_stats: Dict[str, int]) -> Iterator[str]:
+        """Yield page texts, replacing pages with too little text by their OCR text.
+        
+        With more than one OCR worker, low-text pages are OCRed in a process pool while
+        extraction continues. At most two OCR pages per worker are in flight, and only one
+        page image per worker is rendered at a time.
+        
+        Args:
+            file_path: Path to the PDF file
+            ocr_if_needed: Whether to OCR pages with too little text
+            page_stats: Counters of pages, low-text pages and OCRed pages, updated in place
+            
+        Yields:
+            Page texts in page order
+        """
+        ocr_available = ocr_if_needed and self.pytesseract is not None and self.convert_from_path is not None
+        pending = deque()  # (page number, extracted text, OCR future or None) in page order
+        ocr_in_flight = 0
+        executor = None
+        try:
+            for page_number, page_text in enumerate(self.iter_page_texts(file_path), start=1):
+                page_stats["pages"] += 1
+                future = None
+                if len(page_text.strip()) < self.min_page_text_chars:
+                    page_stats["low_text_pages"] += 1
+                    if ocr_available and self.ocr_workers > 1:
+                        if executor is None:
+                            executor = ProcessPoolExecutor(max_workers=self.ocr_workers)
+                        future = executor.submit(_ocr_page_text, file_path, page_number, self.ocr_dpi)
+                        ocr_in_flight += 1
+                    elif ocr_available:
+                        page_text = self._prefer_ocr_text(page_text, self._ocr_page(file_path, page_number), page_stats)
+                pending.append((page_number, page_text, future))
+                
+                # Hand on pages whose OCR is done; wait for the oldest once enough OCR pages are in flight
+                while pending and (pending[0][2] is None or pending[0][2].done() or ocr_in_flight >= 2 * self.ocr_workers):
+                    if pending[0][2] is not None:
+                        ocr_in_flight -= 1
+                    yield self._resolve_page(file_path, pending.popleft(), page_stats)
+            
+            while pending:
+                yield self._resolve_page(file_path, pending.popleft(), page_stats)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+    
+    def _resolve_page(self, file_path: str, pending_page: Tuple[int, str, Any], page_stats: Dict[str, int]) -> str:
+        """Text of a page from _iter_document_pages, waiting for its OCR if it has any."""
+        page_number, page_text, future = pending_page
+        if future is None:
+            return page_text
+        try:
+            ocr_text = future.result()
+        except Exception as e:
+            logger.error(f"OCR of page {page_number} of {file_path} failed: {e}")
+            ocr_text = ""
+        return self._prefer_ocr_text(page_text, ocr_text, page_stats)
+    
+    @staticmethod
+    def _prefer_ocr_text(page_text: str, ocr_text: str, page_stats: Dict[str, int]) -> str:
+        """Use the OCR text of a page if it recovered more text than extraction did."""
+        if len(ocr_text.strip()) > len(page_text.strip()):
+            page_stats["ocr_pages"] += 1
+            return ocr_text
+        return page_text
+    
+    @staticmethod
+    def _pdf_type_from_page_stats(page_stats: Dict[str, int]) -> str:
+        """Classify a PDF from its extraction pass.
+        
+        Returns:
+            'text' if every page had a text layer, 'scanned' if none had, 'mixed'
+            otherwise, and 'unknown' if no pages could be read
+        """
+        if not page_stats["pages"]:
+            return "unknown"
+        if not page_stats["low_text_pages"]:
+            return "text"
+        if page_stats["low_text_pages"] == page_stats["pages"]:
+            return "scanned"
+        return "mixed"
+    
     def _extract_text(self, file_path: str) -> str:
         """Extract text from a PDF using available libraries.
         
@@ -168,71 +396,83 @@ class PDFProcessor:
         Returns:
             Extracted text as a string
         """
-        text = ""
+        return "\n\n".join(page_text for page_text in self.iter_page_texts(file_path) if page_text)
+    
+    def iter_page_texts(self, file_path: str) -> Iterator[str]:
+        """Yield the text of each page in page order ("" for pages without text).
         
-        # Try pdfplumber first (better layout preservation)
+        Uses pdfplumber (better layout preservation), extracting PDFs with at least
+        parallel_min_pages pages in a process pool. Falls back to PyPDF2 for the pages
+        pdfplumber could not extract.
+        
+        Args:
+            file_path: Path to the PDF file
+            
+        Yields:
+            Page texts
+        """
+        pages_done = 0
         if self.pdfplumber:
             try:
                 with self.pdfplumber.open(file_path) as pdf:
-                    page_texts = []
-                    for page in pdf.pages:
-                        page_text = page.extract_text(x_tolerance=3) or ""
-                        if page_text:
-                            page_texts.append(page_text)
-                    
-                    text = "\n\n".join(page_texts)
-                    
-                    # If we got good results, return this text
-                    if len(text.strip()) > 100:
-                        return text
+                    page_count = len(pdf.pages)
+                    if page_count < self.parallel_min_pages or self.max_workers <= 1:
+                        for page in pdf.pages:
+                            page_text = page.extract_text(x_tolerance=3) or ""
+                            page.flush_cache()
+                            pages_done += 1
+                            yield page_text
+                        return
+                for page_text in self._iter_page_texts_parallel(file_path, page_count):
+                    pages_done += 1
+                    yield page_text
+                return
             except Exception as e:
-                logger.warning(f"pdfplumber extraction failed: {e}")
+                logger.warning(f"pdfplumber extraction failed after {pages_done} pages: {e}")
         
         # Fall back to PyPDF2 if needed
-        if not text and self.PyPDF2:
+        if self.PyPDF2:
             try:
                 with open(file_path, 'rb') as file:
                     reader = self.PyPDF2.PdfReader(file)
-                    page_texts = []
-                    
-                    for page in reader.pages:
-                        page_text = page.extract_text() or ""
-                        if page_text:
-                            page_texts.append(page_text)
-                    
-                    text = "\n\n".join(page_texts)
+                    for page in reader.pages[pages_done:]:
+                        yield page.extract_text() or ""
             except Exception as e:
                 logger.warning(f"PyPDF2 extraction failed: {e}")
+    
+    def _iter_page_texts_parallel(self, file_path: str, page_count: int) -> Iterator[str]:
+        """Extract page ranges in worker processes and yield the page texts in order.
         
-        return text
+        At most two ranges per worker are in flight, so finished pages are handed on
+        rather than accumulating for the whole document.
+        """
+        ranges = [(start, min(start + self.pages_per_task, page_count)) for start in range(0, page_count, self.pages_per_task)]
+        max_workers = min(self.max_workers, len(ranges))
+        logger.info(f"Extracting {page_count} pages in {len(ranges)} ranges with {max_workers} worker processes")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pending = []
+            next_range = 0
+            while next_range < len(ranges) or pending:
+                while next_range < len(ranges) and len(pending) < 2 * max_workers:
+                    pending.append(executor.submit(_extract_page_range, file_path, *ranges[next_range]))
+                    next_range += 1
+                yield from pending.pop(0).result()
     
-    def _extract_text_with_ocr(self, file_path: str) -> str:
-        """Extract text from a scanned PDF using OCR.
+    def _ocr_page(self, file_path: str, page_number: int) -> str:
+        """OCR a single page, rendering only that page.
         
         Args:
             file_path: Path to the PDF file
+            page_number: 1-based page number
             
         Returns:
-            Extracted text as a string
+            Extracted text ("" if OCR failed)
         """
-        if not self.pytesseract or not self.convert_from_path:
-            logger.error("OCR libraries not available")
-            return ""
-        
         try:
-            # Convert PDF to images
-            images = self.convert_from_path(file_path)
-            
-            # Perform OCR on each image
-            page_texts = []
-            for image in images:
-                page_text = self.pytesseract.image_to_string(image)
-                if page_text:
-                    page_texts.append(page_text)
-            
-            return "\n\n".join(page_texts)
+            images = self.convert_from_path(file_path, dpi=self.ocr_dpi, first_page=page_number, last_page=page_number)
+            return "".join(self.pytesseract.image_to_string(image) or "" for image in images)
         except Exception as e:
-            logger.error(f"OCR extraction failed: {e}")
+            logger.error(f"OCR of page {page_number} failed: {e}")
             return ""
     
     def _chunk_text(self, text: str) -> List[str]:
@@ -241,6 +481,130 @@ class PDFProcessor:
         Args:
             text: Text to chunk
             
+        Returns:
+            List of text chunks
+        """
+        chunks = self._split_text(text)
+        
+        # Keep the last chunk only if it is large enough
+        if chunks and len(chunks[-1]) < self.min_chunk_size:
+            chunks.pop()
+        
+        return chunks
+    
+    def _chunk_pages(self, page_texts: Iterable[str]) -> Iterator[Tuple[str, int, int]]:
+        """Chunk page texts as they arrive, in page order.
+        
+        The result matches _chunk_text on the non-empty pages joined with blank lines. Sentences are
+        packed into chunks as soon as they are complete; the unfinished sentence at the end of a page
+        is carried over and continued with the next page. Once that sentence is longer than
+        chunk_size, the slices of it that can no longer change are emitted, so the carry stays small.
+        
+        Args:
+            page_texts: Page texts in page order
+            
+        Yields:
+            (chunk text, first page, last page) with 1-based page numbers
+        """
+        stride = self.chunk_size - self.chunk_overlap
+        chunk, chunk_start, chunk_end = "", 0, 0  # Open chunk of packed sentences
+        pending = ""  # Unfinished sentence, whitespace-normalized
+        pending_pages: List[Tuple[int, int]] = []  # (offset in pending, page number) where each page's text starts
+        pending_is_long = False  # Pending sentence exceeds chunk_size and its leading slices were emitted
+        
+        def page_at(pages: List[Tuple[int, int]], offset: int) -> int:
+            page = pages[0][1]
+            for page_offset, page_number in pages:
+                if page_offset > offset:
+                    break
+                page = page_number
+            return page
+        
+        def rebase(pages: List[Tuple[int, int]], offset: int) -> List[Tuple[int, int]]:
+            return [(0, page_at(pages, offset))] + [(page_offset - offset, page_number) for page_offset, page_number in pages if page_offset > offset]
+        
+        def slices(sentence: str, pages: List[Tuple[int, int]], count: int) -> Iterator[Tuple[str, int, int]]:
+            # Same slicing of sentences longer than chunk_size as _split_text
+            for start in range(0, count * stride, stride):
+                piece = sentence[start:start + self.chunk_size]
+                if len(piece) >= self.min_chunk_size:
+                    yield piece, page_at(pages, start), page_at(pages, start + len(piece) - 1)
+        
+        def add_sentence(sentence: str, pages: List[Tuple[int, int]], is_long: bool) -> Iterator[Tuple[str, int, int]]:
+            # Same packing of complete sentences as _split_text
+            nonlocal chunk, chunk_start, chunk_end
+            first_page, last_page = page_at(pages, 0), page_at(pages, max(len(sentence) - 1, 0))
+            if not is_long and len(chunk) + len(sentence) <= self.chunk_size:
+                if chunk:
+                    chunk += " "
+                else:
+                    chunk_start = first_page
+                chunk += sentence
+                chunk_end = last_page
+                return
+            if chunk:
+                yield chunk, chunk_start, chunk_end
+                chunk = ""
+            if is_long or len(sentence) > self.chunk_size:
+                yield from slices(sentence, pages, -(-len(sentence) // stride))
+            else:
+                chunk, chunk_start, chunk_end = sentence, first_page, last_page
+        
+        def add_text(text: str, pages: List[Tuple[int, int]]) -> Iterator[Tuple[str, int, int]]:
+            # Pack the sentences of pending + text that are complete and carry over the rest
+            nonlocal pending, pending_pages, pending_is_long, chunk
+            position = 0
+            for boundary in re.finditer(r'(?<=[.!?])\s+', text):
+                yield from add_sentence(text[position:boundary.start()], rebase(pages, position), pending_is_long)
+                pending_is_long = False
+                position = boundary.end()
+            pending, pending_pages = text[position:], rebase(pages, position)
+            if len(pending) > self.chunk_size:
+                # Slices that end before the last character seen so far are final; the carry keeps that
+                # character so the next sentence boundary is still found
+                if chunk:
+                    yield chunk, chunk_start, chunk_end
+                    chunk = ""
+                final_slices = (len(pending) - self.chunk_size - 1) // stride + 1
+                yield from slices(pending, pending_pages, final_slices)
+                pending, pending_pages = pending[final_slices * stride:], rebase(pending_pages, final_slices * stride)
+                pending_is_long = True
+        
+        def all_chunks() -> Iterator[Tuple[str, int, int]]:
+            started = trailing_space = False
+            for page_number, page_text in enumerate(page_texts, start=1):
+                if not page_text or not page_text.strip():
+                    continue
+                # Whitespace between pages collapses to a single space, as in the normalized joined text
+                separator = " " if started or page_text[0].isspace() else ""
+                started = True
+                trailing_space = page_text[-1].isspace()
+                yield from add_text(pending + separator + re.sub(r'\s+', ' ', page_text.strip()), pending_pages + [(len(pending), page_number)])
+            
+            if not started:
+                return
+            if trailing_space:
+                yield from add_text(pending + " ", pending_pages)
+            yield from add_sentence(pending, pending_pages, pending_is_long)
+            if chunk:
+                yield chunk, chunk_start, chunk_end
+        
+        previous = None
+        for item in all_chunks():
+            if previous:
+                yield previous
+            previous = item
+        
+        # Add the last chunk if it is large enough
+        if previous and len(previous[0]) >= self.min_chunk_size:
+            yield previous
+    
+    def _split_text(self, text: str) -> List[str]:
+        """Split text into chunks, keeping the last chunk whatever its size.
+        
+        Args:
+            text: Text to split
+            
         Returns:
             List of text chunks
         """
@@ -296,7 +660,7 @@ class PDFProcessor:
                     current_chunk = paragraph
         
         # Add the last chunk if it has content
-        if current_chunk and len(current_chunk) >= self.min_chunk_size:
+        if current_chunk:
             chunks.append(current_chunk)
         
         return chunks
@@ -4,6 +4,7 @@ import json
 from pathlib import Path
 from enum import Enum
 from amm_project.models.amm_models import AMMDesign, KnowledgeSourceType
+from fix_imports import copy_standalone_modules
 
 # --- CONFIGURABLE ---
 KNOWLEDGE_DIR_NAME = 'knowledge'
@@ -111,12 +112,8 @@ def build_amm(design_json_path, output_root_dir, requirements_path=None, build_t
         # Copy required AMM modules directly to the build directory for self-contained use
         print("Adding required AMM modules for standalone operation...")
         try:
-            # Copy core modules
-            source_dir = Path(__file__).parent
-            shutil.copy(source_dir / "amm_project" / "models" / "amm_models.py", build_dir / "amm_models.py")
-            shutil.copy(source_dir / "amm_project" / "models" / "memory_models.py", build_dir / "memory_models.py")
-            shutil.copy(source_dir / "amm_project" / "engine" / "amm_engine.py", build_dir / "amm_engine.py")
-            shutil.copy(source_dir / "amm_project" / "config" / "model_config.py", build_dir / "model_config.py")
+            # Copy the engine and every module it imports, importing each other directly
+            copy_standalone_modules(Path(__file__).parent, build_dir)
             
             # Create a standalone wrapper script
             start_script = """#!/usr/bin/env python
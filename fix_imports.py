@@ -9,8 +9,67 @@ modules are properly imported, even when run from a standalone build directory.
 import os
 import sys
 import re
+import shutil
 from pathlib import Path
 
+# Package modules that standalone MCP server builds carry as flat modules next to mcp_server.py,
+# mapped to their module name in the build directory
+STANDALONE_MODULES = {
+    "amm_project.models.amm_models": "amm_models",
+    "amm_project.models.memory_models": "memory_models",
+    "amm_project.config.model_config": "model_config",
+    "amm_project.engine.amm_engine": "amm_engine",
+    "amm_project.engine.embedding_cache": "embedding_cache",
+    "amm_project.engine.interaction_index": "interaction_index",
+    "amm_project.engine.interaction_writer": "interaction_writer",
+    "amm_project.engine.knowledge_manifest": "knowledge_manifest",
+    "amm_project.engine.memory_store": "memory_store",
+    "amm_project.engine.prompt_builder": "prompt_builder",
+    "amm_project.engine.response_cache": "response_cache",
+    "amm_project.engine.session_summary": "session_summary",
+    "amm_project.utils.hashing": "hashing",
+    "amm_project.utils.pdf_processor": "pdf_processor",
+}
+
+# A package import of one of the standalone modules, possibly indented and with a parenthesized name list
+PACKAGE_IMPORT_PATTERN = re.compile(
+    r'^(?P<indent>[ \t]*)from (?P<package>amm_project(?:\.\w+)+) import (?P<names>\([^)]*\)[^\n]*|[^\n]+)$',
+    re.MULTILINE
+)
+
+def make_imports_standalone(content):
+    """Rewrite package imports of the standalone modules to try the flat module in the build directory first."""
+    def replace(match):
+        module = STANDALONE_MODULES.get(match.group("package"))
+        previous_line = content[:match.start()].rstrip().rsplit("\n", 1)[-1].strip()
+        if module is None or previous_line == "except ImportError:":
+            # Not a standalone module, or already rewritten
+            return match.group(0)
+        indent, names = match.group("indent"), match.group("names")
+        return (f"{indent}try:\n{indent}    from {module} import {names}\n"
+                f"{indent}except ImportError:\n{indent}    from {match.group('package')} import {names}")
+    return PACKAGE_IMPORT_PATTERN.sub(replace, content)
+
+def fix_module_imports(module_path):
+    """Rewrite the package imports of a copied module for standalone use."""
+    if not os.path.exists(module_path):
+        print(f"Error: Module not found at {module_path}")
+        return False
+    
+    with open(module_path, 'r') as f:
+        content = f.read()
+    with open(module_path, 'w') as f:
+        f.write(make_imports_standalone(content))
+    return True
+
+def copy_standalone_modules(source_dir, build_dir):
+    """Copy the standalone modules from the project at source_dir into build_dir and fix their imports."""
+    for package, module in STANDALONE_MODULES.items():
+        target_path = Path(build_dir) / f"{module}.py"
+        shutil.copy(Path(source_dir) / f"{package.replace('.', '/')}.py", target_path)
+        fix_module_imports(target_path)
+    print(f"Copied {len(STANDALONE_MODULES)} AMM modules for standalone use")
+
 def fix_mcp_server_imports(mcp_server_path):
     """Fix import issues in the MCP server file."""
     if not os.path.exists(mcp_server_path):
@@ -218,25 +277,7 @@ def fix_amm_engine_imports(amm_engine_path):
     with open(amm_engine_path, 'r') as f:
         content = f.read()
     
-    # Fix imports for standalone use - be careful with replacements to avoid duplicates
-    if "try:\n    from amm_models import" not in content:
-        content = content.replace(
-            "from amm_project.models.amm_models import",
-            "try:\n    from amm_models import\nexcept ImportError:\n    from amm_project.models.amm_models import"
-        )
-    
-    if "try:\n    from memory_models import" not in content:
-        content = content.replace(
-            "from amm_project.models.memory_models import",
-            "try:\n    from memory_models import\nexcept ImportError:\n    from amm_project.models.memory_models import"
-        )
-    
-    # Check for config import too
-    if "try:\n    from model_config import" not in content and "from amm_project.config.model_config import" in content:
-        content = content.replace(
-            "from amm_project.config.model_config import",
-            "try:\n    from model_config import\nexcept ImportError:\n    from amm_project.config.model_config import"
-        )
+    content = make_imports_standalone(content)
     
     # Write the updated file
     with open(amm_engine_path, 'w') as f:
@@ -257,12 +298,7 @@ def fix_model_imports(amm_models_path):
     with open(amm_models_path, 'r') as f:
         content = f.read()
     
-    # Fix imports for standalone use - check if already fixed
-    if "try:\n    from model_config import" not in content and "from amm_project.config.model_config import" in content:
-        content = content.replace(
-            "from amm_project.config.model_config import",
-            "try:\n    from model_config import\nexcept ImportError:\n    from amm_project.config.model_config import"
-        )
+    content = make_imports_standalone(content)
     
     # Write the updated file
     with open(amm_models_path, 'w') as f:
@@ -283,12 +319,7 @@ def fix_memory_models_imports(memory_models_path):
     with open(memory_models_path, 'r') as f:
         content = f.read()
     
-    # Fix imports for standalone use - check if already fixed
-    if "try:\n    from amm_models import" not in content and "from amm_project.models.amm_models import" in content:
-        content = content.replace(
-            "from amm_project.models.amm_models import",
-            "try:\n    from amm_models import\nexcept ImportError:\n    from amm_project.models.amm_models import"
-        )
+    content = make_imports_standalone(content)
     
     # Write the updated file
     with open(memory_models_path, 'w') as f:
@@ -349,6 +380,15 @@ if __name__ == "__main__":
     # Create __init__.py
     create_init_file(target_dir)
     
+    # Add the modules that builds from older versions lack, and fix the imports of all of them
+    source_dir = Path(__file__).parent
+    for package, module in STANDALONE_MODULES.items():
+        module_path = os.path.join(target_dir, f"{module}.py")
+        if not os.path.exists(module_path):
+            shutil.copy(source_dir / f"{package.replace('.', '/')}.py", module_path)
+            print(f"Added missing module: {module}.py")
+        fix_module_imports(module_path)
+    
     # Fix imports in all files
     fixed_mcp = fix_mcp_server_imports(mcp_server_path)
     fixed_engine = fix_amm_engine_imports(amm_engine_path)
@@ -12,6 +12,8 @@ import shutil
 from pathlib import Path
 import argparse
 
+from fix_imports import copy_standalone_modules
+
 def fix_mcp_build(build_dir):
     """
     Fix an MCP server build by copying necessary modules.
@@ -45,12 +47,9 @@ def fix_mcp_build(build_dir):
     # Step 2: Copy essential files for direct imports
     print("Copying essential modules...")
     
-    # Copy core models
+    # Copy the engine and every module it imports, importing each other directly
     try:
-        shutil.copy(source_dir / "amm_project" / "models" / "amm_models.py", build_path / "amm_models.py")
-        shutil.copy(source_dir / "amm_project" / "models" / "memory_models.py", build_path / "memory_models.py")
-        shutil.copy(source_dir / "amm_project" / "engine" / "amm_engine.py", build_path / "amm_engine.py")
-        shutil.copy(source_dir / "amm_project" / "config" / "model_config.py", build_path / "model_config.py")
+        copy_standalone_modules(source_dir, build_path)
         print("✓ Core modules copied successfully")
     except Exception as e:
         print(f"Error copying core modules: {e}")
@@ -85,10 +85,6 @@ def test_pdf_processor(pdf_path):
     # Create processor
     processor = PDFProcessor()
     
-    # Detect PDF type
-    pdf_type = processor.detect_pdf_type(pdf_path)
-    print(f"Detected PDF type: {pdf_type}")
-    
     # Process the PDF
     chunks = processor.process_file(pdf_path)
     
@@ -96,6 +92,8 @@ def test_pdf_processor(pdf_path):
         print("Error: No chunks extracted from PDF")
         return False
     
+    # The type is determined from the per-page text yield of the extraction pass
+    print(f"Detected PDF type: {chunks[0]['metadata']['pdf_type']}")
     print(f"Successfully extracted {len(chunks)} chunks from PDF")
     
     # Display sample chunks
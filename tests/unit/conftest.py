@@ -0,0 +1,65 @@
+# tests/unit/conftest.py
+"""
+Shared fixtures for the AMMEngine unit tests.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from amm_project.models.amm_models import AMMDesign
+from amm_project.engine.amm_engine import AMMEngine
+
+def fake_embed_content(embedding_vector):
+    """Stands in for genai.embed_content: one vector for a text, a list of vectors for a batch."""
+    def embed_content(model, content, task_type):
+        if isinstance(content, list):
+            return {"embedding": [embedding_vector(text) for text in content]}
+        return {"embedding": embedding_vector(content)}
+    return embed_content
+
+@pytest.fixture
+def embedding_vector():
+    """Maps a text to its fake embedding. Test modules override this to give texts meaningful vectors."""
+    return lambda text: [1.0, 0.0]
+
+@pytest.fixture
+def generated_text():
+    """Maps a prompt to the fake model output. Test modules override this for prompt-dependent answers."""
+    return lambda prompt: "answer"
+
+@pytest.fixture
+def mock_genai(monkeypatch, embedding_vector, generated_text):
+    """Patches the Gemini SDK used by AMMEngine and sets a test API key.
+
+    Sync and async embeddings come from embedding_vector, sync and async generation from generated_text.
+    The EMBEDDING and MODEL overrides are cleared so the design's models are used.
+    """
+    monkeypatch.setenv("GEMINI_API_KEY", "test_key_123")
+    monkeypatch.delenv("EMBEDDING", raising=False)
+    monkeypatch.delenv("MODEL", raising=False)
+    with patch('amm_project.engine.amm_engine.genai') as mock_genai:
+        embed_content = fake_embed_content(embedding_vector)
+        mock_genai.embed_content.side_effect = embed_content
+        mock_genai.embed_content_async = AsyncMock(side_effect=embed_content)
+        generate = lambda prompt, **kwargs: MagicMock(text=generated_text(prompt))
+        mock_model = mock_genai.GenerativeModel.return_value
+        mock_model.generate_content.side_effect = generate
+        mock_model.generate_content_async = AsyncMock(side_effect=generate)
+        yield mock_genai
+
+@pytest.fixture
+def make_engine(tmp_path):
+    """Factory for AMMEngine instances storing their data under tmp_path, closed after the test.
+
+    make_engine(design=None, base_data_path=None, **design_settings) uses the given design or builds
+    one from AMMDesign fields. Test modules override this fixture to bake in their design settings.
+    """
+    engines = []
+    def build(design=None, base_data_path=None, **design_settings):
+        design = design or AMMDesign(**{"name": "TestDesign", **design_settings})
+        engine = AMMEngine(design=design, base_data_path=str(base_data_path or tmp_path))
+        engines.append(engine)
+        return engine
+    yield build
+    for engine in engines:
+        engine.close()
@@ -0,0 +1,89 @@
+# tests/unit/test_adaptive_memory_relevance.py
+
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from amm_project.models.amm_models import AdaptiveMemoryConfig, AdaptiveMemoryStrategy
+from amm_project.models.memory_models import InteractionRecordPydantic
+
+def topic_vector(text):
+    """3-dimensional embedding: one axis per topic mentioned in the text."""
+    text = text.lower()
+    if "python" in text and "weather" in text:
+        return [0.6, 0.8, 0.0]
+    if "python" in text:
+        return [1.0, 0.0, 0.0]
+    if "weather" in text:
+        return [0.0, 1.0, 0.0]
+    return [0.0, 0.0, 1.0]
+
+@pytest.fixture
+def embedding_vector():
+    return topic_vector
+
+@pytest.fixture
+def make_engine(make_engine):
+    def build(strategy=AdaptiveMemoryStrategy.RELEVANT, **memory_settings):
+        return make_engine(design_id="relevance_design", name="RelevanceDesign", adaptive_memory=AdaptiveMemoryConfig(strategy=strategy, **memory_settings))
+    return build
+
+def wait_for_vectors(engine, expected, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while engine.interaction_index.count() < expected:
+        assert time.monotonic() < deadline, "interaction vectors were not written in time"
+        time.sleep(0.02)
+
+def add(engine, query, response, age=timedelta(0)):
+    record = InteractionRecordPydantic(query=query, response=response, timestamp=datetime.now(timezone.utc) - age)
+    return engine.add_interaction_record(record)
+
+def test_relevant_strategy_returns_most_similar(mock_genai, make_engine):
+    engine = make_engine(recency_weight=0.0)
+    add(engine, "How do I sort a list in Python?", "Use sorted().")
+    add(engine, "Will it rain tomorrow?", "Check the weather forecast.")
+    add(engine, "Tell me a joke", "Why did the chicken cross the road?")
+    wait_for_vectors(engine, 3)
+
+    chunks = engine._retrieve_adaptive_memory("python dictionaries", limit=1)
+
+    assert [chunk["query_text"] for chunk in chunks] == ["How do I sort a list in Python?"]
+
+def test_recency_weight_blends_with_similarity(mock_genai, make_engine):
+    engine = make_engine(recency_weight=0.0, recency_half_life_hours=24.0)
+    add(engine, "Python question", "An old but exact match.", age=timedelta(days=30))
+    add(engine, "Python and weather", "A recent partial match.")
+    wait_for_vectors(engine, 2)
+
+    assert engine._retrieve_adaptive_memory("python", limit=1)[0]["query_text"] == "Python question"
+    engine.design.adaptive_memory.recency_weight = 0.5
+    assert engine._retrieve_adaptive_memory("python", limit=1)[0]["query_text"] == "Python and weather"
+
+def test_existing_interactions_are_backfilled(mock_genai, make_engine):
+    recent_engine = make_engine(strategy=AdaptiveMemoryStrategy.RECENT)
+    assert recent_engine.interaction_index is None
+    add(recent_engine, "Python question", "Answer")
+    add(recent_engine, "Weather question", "Answer")
+    recent_engine.close()
+
+    engine = make_engine()
+    wait_for_vectors(engine, 2)
+    assert engine._retrieve_adaptive_memory("weather", limit=1)[0]["query_text"] == "Weather question"
+
+def test_falls_back_to_recent_without_vectors(mock_genai, make_engine):
+    engine = make_engine()
+    mock_genai.embed_content.side_effect = ValueError("embedding unavailable")
+    add(engine, "First", "One")
+    add(engine, "Second", "Two")
+    engine.close()  # Waits for the (failed) background indexing
+
+    chunks = engine._retrieve_adaptive_memory("anything", limit=5)
+    assert [chunk["query_text"] for chunk in chunks] == ["Second", "First"]
+
+def test_deleted_interaction_is_removed_from_index(mock_genai, make_engine):
+    engine = make_engine()
+    record_id = add(engine, "Python question", "Answer")
+    wait_for_vectors(engine, 1)
+
+    assert engine.delete_interaction_record(record_id)
+    assert engine.interaction_index.count() == 0
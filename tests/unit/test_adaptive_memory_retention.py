@@ -0,0 +1,65 @@
+# tests/unit/test_adaptive_memory_retention.py
+
+import gzip
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from amm_project.models.amm_models import AMMDesign, AdaptiveMemoryConfig
+from amm_project.models.memory_models import InteractionRecordPydantic
+from amm_project.engine.amm_engine import AMMEngine, ADAPTIVE_MEMORY_ARCHIVE_DIRNAME
+
+NOW = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+pytestmark = pytest.mark.usefixtures("mock_genai")
+
+@pytest.fixture
+def make_engine(make_engine):
+    def build(**memory_settings):
+        # Prune explicitly with a fixed clock instead of from the background worker
+        with patch.object(AMMEngine, '_start_retention_worker'):
+            return make_engine(design_id="retention_design", name="RetentionDesign", adaptive_memory=AdaptiveMemoryConfig(**memory_settings))
+    return build
+
+def add_aged(engine, query, age_days):
+    record = InteractionRecordPydantic(query=query, response="response", timestamp=NOW - timedelta(days=age_days))
+    return engine.add_interaction_record(record)
+
+def test_prune_deletes_expired_records_in_batches(make_engine):
+    engine = make_engine(retention_policy_days=30, retention_delete_batch_size=2)
+    for i in range(5):
+        add_aged(engine, f"old {i}", age_days=40 + i)
+    add_aged(engine, "recent", age_days=1)
+
+    assert engine.prune_adaptive_memory(now=NOW) == 5
+    assert [record.query for record in engine.get_recent_interaction_records(limit=10)] == ["recent"]
+    assert engine.prune_adaptive_memory(now=NOW) == 0
+
+def test_prune_archives_records_when_enabled(tmp_path, make_engine):
+    engine = make_engine(retention_policy_days=7, archive_pruned_records=True)
+    add_aged(engine, "expired question", age_days=10)
+    add_aged(engine, "kept question", age_days=2)
+
+    assert engine.prune_adaptive_memory(now=NOW) == 1
+
+    archive_path = tmp_path / ADAPTIVE_MEMORY_ARCHIVE_DIRNAME / "pruned_interactions_20250601.jsonl.gz"
+    with gzip.open(archive_path, "rt", encoding="utf-8") as archive_file:
+        archived = [json.loads(line) for line in archive_file]
+    assert [row["query"] for row in archived] == ["expired question"]
+
+def test_prune_without_retention_policy_is_noop(make_engine):
+    engine = make_engine()
+    add_aged(engine, "ancient", age_days=3650)
+    assert engine.prune_adaptive_memory(now=NOW) == 0
+    assert len(engine.get_recent_interaction_records(limit=10)) == 1
+
+def test_retention_worker_prunes_on_start_and_stops_on_close(tmp_path):
+    design = AMMDesign(name="RetentionWorker", adaptive_memory=AdaptiveMemoryConfig(retention_policy_days=1))
+    with patch.object(AMMEngine, 'prune_adaptive_memory', return_value=0) as mock_prune:
+        engine = AMMEngine(design=design, base_data_path=str(tmp_path))
+        assert engine._retention_thread is not None
+        engine.close()
+
+    assert engine._retention_thread is None
+    mock_prune.assert_called_once()
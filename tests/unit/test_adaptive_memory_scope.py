@@ -0,0 +1,70 @@
+# tests/unit/test_adaptive_memory_scope.py
+
+import time
+import pytest
+from unittest.mock import patch
+
+from amm_project.models.amm_models import AdaptiveMemoryConfig, AdaptiveMemoryScope, AdaptiveMemoryStrategy
+from amm_project.models.memory_models import InteractionRecordPydantic
+
+@pytest.fixture
+def make_engine(make_engine):
+    def build(**memory_settings):
+        return make_engine(design_id="scope_design", name="ScopeDesign", adaptive_memory=AdaptiveMemoryConfig(**memory_settings))
+    return build
+
+def add(engine, query, session_id=None, user_id=None):
+    return engine.add_interaction_record(InteractionRecordPydantic(query=query, response="response", session_id=session_id, user_id=user_id))
+
+def queries(chunks):
+    return sorted(chunk["query_text"] for chunk in chunks)
+
+@pytest.fixture
+def populated_engine(mock_genai, make_engine):
+    def build(**memory_settings):
+        engine = make_engine(**memory_settings)
+        add(engine, "alice session 1", session_id="s1", user_id="alice")
+        add(engine, "alice session 2", session_id="s2", user_id="alice")
+        add(engine, "bob session 3", session_id="s3", user_id="bob")
+        return engine
+    return build
+
+def test_session_scope_prefers_session_then_user(populated_engine):
+    engine = populated_engine()
+    assert queries(engine._retrieve_adaptive_memory("q", session_id="s1", user_id="alice")) == ["alice session 1"]
+    assert queries(engine._retrieve_adaptive_memory("q", user_id="alice")) == ["alice session 1", "alice session 2"]
+    assert len(engine._retrieve_adaptive_memory("q")) == 3
+
+def test_user_scope_ignores_session(populated_engine):
+    engine = populated_engine(scope=AdaptiveMemoryScope.USER)
+    assert queries(engine._retrieve_adaptive_memory("q", session_id="s3", user_id="bob")) == ["bob session 3"]
+    assert queries(engine._retrieve_adaptive_memory("q", session_id="s1", user_id="alice")) == ["alice session 1", "alice session 2"]
+
+def test_global_scope_ignores_identity(populated_engine):
+    engine = populated_engine(scope=AdaptiveMemoryScope.GLOBAL)
+    assert len(engine._retrieve_adaptive_memory("q", session_id="s1", user_id="alice")) == 3
+
+def test_relevant_strategy_is_scoped(populated_engine):
+    engine = populated_engine(strategy=AdaptiveMemoryStrategy.RELEVANT)
+    deadline = time.monotonic() + 5
+    while engine.interaction_index.count() < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+    assert queries(engine._retrieve_adaptive_memory("q", session_id="s3")) == ["bob session 3"]
+    assert queries(engine._retrieve_adaptive_memory("q", user_id="alice")) == ["alice session 1", "alice session 2"]
+
+def test_process_query_stores_and_scopes_by_identity(mock_genai, make_engine):
+    engine = make_engine()
+    engine.process_query("first question", session_id="s1", user_id="alice")
+    engine.process_query("other tenant", session_id="s9", user_id="bob")
+
+    with patch.object(engine, '_retrieve_adaptive_memory', wraps=engine._retrieve_adaptive_memory) as mock_retrieve:
+        engine.process_query("follow-up", session_id="s1", user_id="alice")
+    assert mock_retrieve.call_args.kwargs["session_id"] == "s1"
+
+    prompt = mock_genai.GenerativeModel.return_value.generate_content.call_args.args[0]
+    assert "first question" in prompt
+    assert "other tenant" not in prompt
+    records = engine.get_recent_interaction_records(limit=10, user_id="alice")
+    assert [(record.query, record.session_id) for record in records] == [("first question", "s1"), ("follow-up", "s1")]
@@ -0,0 +1,174 @@
+# tests/unit/test_async_engine.py
+
+import asyncio
+import time
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from amm_project.models.amm_models import AdaptiveMemoryConfig, KnowledgeSourceConfig, KnowledgeSourceType, RetrievalConfig
+
+@pytest.mark.asyncio
+async def test_process_query_async_uses_async_apis(mock_genai, make_engine):
+    design_settings = {
+        "knowledge_sources": [KnowledgeSourceConfig(id="ks1", name="Facts", type=KnowledgeSourceType.TEXT, content="The sky is blue.")]
+    }
+    engine = make_engine(**design_settings)
+
+    response = await engine.process_query_async("What colour is the sky?")
+
+    assert response == "answer"
+    mock_genai.embed_content_async.assert_awaited_once()
+    assert mock_genai.embed_content_async.call_args.kwargs["task_type"] == "RETRIEVAL_QUERY"
+    mock_genai.GenerativeModel.return_value.generate_content_async.assert_awaited_once()
+    prompt = mock_genai.GenerativeModel.return_value.generate_content_async.call_args.args[0]
+    assert "The sky is blue." in prompt
+    mock_genai.GenerativeModel.return_value.generate_content.assert_not_called()
+
+    # The interaction was stored via the I/O executor
+    records = engine.get_recent_interaction_records(limit=1)
+    assert records[0].response == "answer"
+
+@pytest.mark.asyncio
+async def test_process_query_async_without_client(mock_genai, make_engine):
+    engine = make_engine(adaptive_memory=AdaptiveMemoryConfig(enabled=False))
+    engine.ai_model_client = None
+    assert await engine.process_query_async("Hello") == "Error: AI model client not initialized."
+
+@pytest.mark.asyncio
+async def test_concurrent_queries_do_not_serialize(mock_genai, make_engine):
+    engine = make_engine(adaptive_memory=AdaptiveMemoryConfig(enabled=False))
+    in_flight = 0
+    peak = 0
+
+    async def slow_generation(prompt):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return MagicMock(text="done")
+
+    mock_genai.GenerativeModel.return_value.generate_content_async.side_effect = slow_generation
+    results = await asyncio.gather(*(engine.process_query_async(f"query {i}") for i in range(5)))
+
+    assert results == ["done"] * 5
+    assert peak == 5
+
+@pytest.mark.asyncio
+@patch('amm_project.engine.amm_engine.asyncio.sleep', new_callable=AsyncMock)
+async def test_async_query_embedding_retries_and_caches(mock_sleep, mock_genai, make_engine):
+    engine = make_engine(adaptive_memory=AdaptiveMemoryConfig(enabled=False))
+    mock_genai.embed_content_async.side_effect = [Exception("429 Resource has been exhausted"), {"embedding": [1.0, 2.0]}]
+
+    assert await engine._embed_content_async("probe", task_type="RETRIEVAL_QUERY") == [1.0, 2.0]
+    assert await engine._embed_content_async(" probe ", task_type="RETRIEVAL_QUERY") == [1.0, 2.0]
+
+    assert mock_genai.embed_content_async.await_count == 2
+    mock_sleep.assert_awaited_once()
+
+class FakeStream:
+    """Async iterable of response chunks, like the result of generate_content_async(..., stream=True)."""
+    def __init__(self, texts):
+        self.texts = texts
+
+    async def __aiter__(self):
+        for text in self.texts:
+            yield MagicMock(text=text)
+
+@pytest.mark.asyncio
+async def test_stream_query_async_yields_chunks_and_stores_once(mock_genai, make_engine):
+    engine = make_engine()
+    mock_model = mock_genai.GenerativeModel.return_value
+    mock_model.generate_content_async = AsyncMock(return_value=FakeStream(["Hello", "", " world"]))
+
+    chunks = [chunk async for chunk in engine.stream_query_async("Greet me")]
+
+    assert chunks == ["Hello", " world"]
+    assert mock_model.generate_content_async.call_args.kwargs["stream"] is True
+    records = engine.get_recent_interaction_records(limit=5)
+    assert [record.response for record in records] == ["Hello world"]
+
+@pytest.mark.asyncio
+async def test_stream_query_async_abandoned_stream_is_not_stored(mock_genai, make_engine):
+    engine = make_engine()
+    mock_genai.GenerativeModel.return_value.generate_content_async = AsyncMock(return_value=FakeStream(["partial", " answer"]))
+
+    stream = engine.stream_query_async("Greet me")
+    assert await stream.__anext__() == "partial"
+    await stream.aclose()
+
+    assert engine.get_recent_interaction_records(limit=5) == []
+
+# --- Tests for concurrent retrieval with per-stage budgets --- #
+
+def slow_stage(seconds, result):
+    def stage(*args, **kwargs):
+        time.sleep(seconds)
+        return result
+    return stage
+
+def test_retrieval_stages_run_concurrently(mock_genai, make_engine):
+    engine = make_engine()
+    engine.lancedb_table = MagicMock()
+    fixed = [{"text": "fact", "source": "ks1"}]
+    adaptive = [{"text": "User: hi\nAI: hello"}]
+
+    with patch.object(engine, '_retrieve_fixed_knowledge', side_effect=slow_stage(0.2, fixed)), \
+         patch.object(engine, '_retrieve_adaptive_memory', side_effect=slow_stage(0.2, adaptive)):
+        started_at = time.monotonic()
+        assert engine._retrieve_context("query")[:2] == (fixed, adaptive)
+        elapsed = time.monotonic() - started_at
+
+    assert elapsed < 0.35
+
+def test_slow_stage_degrades_to_empty_context(mock_genai, make_engine):
+    design_settings = {"retrieval": RetrievalConfig(fixed_knowledge_timeout_seconds=0.05)}
+    engine = make_engine(**design_settings)
+    engine.lancedb_table = MagicMock()
+    adaptive = [{"text": "User: hi\nAI: hello"}]
+
+    with patch.object(engine, '_retrieve_fixed_knowledge', side_effect=slow_stage(0.5, [{"text": "late"}])), \
+         patch.object(engine, '_retrieve_adaptive_memory', return_value=adaptive):
+        assert engine._retrieve_context("query") == ([], adaptive, None)
+
+@pytest.mark.asyncio
+async def test_async_slow_stage_degrades_to_empty_context(mock_genai, make_engine):
+    design_settings = {"retrieval": RetrievalConfig(adaptive_memory_timeout_seconds=0.05)}
+    engine = make_engine(**design_settings)
+    engine.lancedb_table = MagicMock()
+    fixed = [{"text": "fact", "source": "ks1"}]
+
+    with patch.object(engine, '_retrieve_fixed_knowledge_async', AsyncMock(return_value=fixed)), \
+         patch.object(engine, '_retrieve_adaptive_memory', side_effect=slow_stage(0.5, [{"text": "late"}])):
+        assert (await engine._retrieve_context_async("query"))[:2] == (fixed, [])
+
+# --- Tests for the GenerativeModel pool --- #
+
+def test_generative_model_is_reused_across_queries(mock_genai, make_engine):
+    engine = make_engine(adaptive_memory=AdaptiveMemoryConfig(enabled=False))
+    mock_genai.GenerativeModel.side_effect = lambda **kwargs: MagicMock(generate_content=MagicMock(return_value=MagicMock(text="ok")))
+
+    assert engine.process_query("first") == "ok"
+    assert engine.process_query("second") == "ok"
+
+    assert mock_genai.GenerativeModel.call_count == 1
+    assert mock_genai.types.GenerationConfig.call_count == 1
+
+def test_generative_model_rebuilt_when_config_changes(mock_genai, make_engine, monkeypatch):
+    engine = make_engine(adaptive_memory=AdaptiveMemoryConfig(enabled=False))
+    mock_genai.GenerativeModel.side_effect = lambda **kwargs: MagicMock()
+
+    monkeypatch.setenv("MODEL", "gemini-1.5-flash")
+    default_model = engine._get_generative_model()
+    monkeypatch.setenv("MODEL", "gemini-2.0-flash")
+    env_model = engine._get_generative_model()
+    assert env_model is not default_model
+    assert mock_genai.GenerativeModel.call_args.kwargs["model_name"] == "gemini-2.0-flash"
+
+    engine.design.gemini_config.temperature = 0.1
+    assert engine._get_generative_model() is not env_model
+
+    monkeypatch.setenv("MODEL", "gemini-1.5-flash")
+    engine.design.gemini_config.temperature = 0.7
+    assert engine._get_generative_model() is default_model
+    assert mock_genai.GenerativeModel.call_count == 3
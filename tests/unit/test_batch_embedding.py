@@ -0,0 +1,55 @@
+# tests/unit/test_batch_embedding.py
+
+import pytest
+from unittest.mock import patch
+
+from amm_project.models.amm_models import AdaptiveMemoryConfig, EmbeddingConfig
+
+@pytest.fixture
+def embedding_vector():
+    # Derived from the text's length, so each input's vector is recognisable
+    return lambda text: [float(len(text)), 1.0]
+
+@pytest.fixture
+def make_engine(make_engine):
+    def build(**embedding_settings):
+        return make_engine(name="BatchDesign", embedding=EmbeddingConfig(**embedding_settings), adaptive_memory=AdaptiveMemoryConfig(enabled=False))
+    return build
+
+def test_batches_respect_batch_size(mock_genai, make_engine):
+    engine = make_engine(batch_size=3, max_concurrent_requests=2, cache_enabled=False)
+    texts = [f"text number {i}" for i in range(7)]
+
+    embeddings = engine._embed_contents_batch(texts)
+
+    assert embeddings == [[float(len(text)), 1.0] for text in texts]
+    batch_sizes = sorted(len(call.kwargs["content"]) for call in mock_genai.embed_content.call_args_list)
+    assert batch_sizes == [1, 3, 3]
+
+def test_cached_and_duplicate_texts_are_not_requested(mock_genai, make_engine):
+    engine = make_engine()
+    engine._embed_contents_batch(["alpha", "beta"])
+    mock_genai.embed_content.reset_mock()
+
+    embeddings = engine._embed_contents_batch(["alpha", "gamma", "gamma", "beta"])
+
+    assert embeddings[1] == embeddings[2] == [5.0, 1.0]
+    mock_genai.embed_content.assert_called_once()
+    assert mock_genai.embed_content.call_args.kwargs["content"] == ["gamma"]
+
+@patch('amm_project.engine.amm_engine.time.sleep')
+def test_rate_limited_batches_are_retried(mock_sleep, mock_genai, make_engine):
+    engine = make_engine(cache_enabled=False, max_retries=2)
+    mock_genai.embed_content.side_effect = [Exception("429 Resource has been exhausted"), {"embedding": [[5.0, 1.0]]}]
+
+    assert engine._embed_contents_batch(["alpha"]) == [[5.0, 1.0]]
+    assert mock_genai.embed_content.call_count == 2
+    mock_sleep.assert_called_once()
+
+@patch('amm_project.engine.amm_engine.time.sleep')
+def test_failed_batches_return_none(mock_sleep, mock_genai, make_engine):
+    engine = make_engine(cache_enabled=False, batch_size=2)
+    mock_genai.embed_content.side_effect = ValueError("invalid request")
+
+    assert engine._embed_contents_batch(["alpha", "beta", "gamma"]) == [None, None, None]
+    mock_sleep.assert_not_called()
@@ -0,0 +1,124 @@
+# tests/unit/test_embedding_cache.py
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from amm_project.models.amm_models import AMMDesign, EmbeddingConfig
+from amm_project.engine.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+
+MODEL = "models/text-embedding-004"
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embedding_cache.sqlite", max_entries=10, max_size_mb=None)
+    yield cache
+    cache.close()
+
+def test_put_and_get_roundtrip(cache):
+    cache.put(MODEL, "RETRIEVAL_DOCUMENT", "hello world", [0.1, 0.2, 0.3])
+    assert cache.get(MODEL, "RETRIEVAL_DOCUMENT", "hello world") == [0.1, 0.2, 0.3]
+    assert cache.stats()["hits"] == 1
+
+def test_key_includes_model_and_task_type(cache):
+    cache.put(MODEL, "RETRIEVAL_DOCUMENT", "hello world", [0.1, 0.2])
+    assert cache.get(MODEL, "RETRIEVAL_QUERY", "hello world") is None
+    assert cache.get("other-model", "RETRIEVAL_DOCUMENT", "hello world") is None
+    assert cache.stats()["misses"] == 2
+
+def test_persists_across_instances(tmp_path):
+    db_path = tmp_path / "embedding_cache.sqlite"
+    first = EmbeddingCache(db_path)
+    first.put(MODEL, "RETRIEVAL_DOCUMENT", "persisted text", [1.0, 2.0])
+    first.close()
+
+    second = EmbeddingCache(db_path)
+    assert second.get(MODEL, "RETRIEVAL_DOCUMENT", "persisted text") == [1.0, 2.0]
+    assert second.stats()["entries"] == 1
+    second.close()
+
+def test_lru_eviction_keeps_recently_used(cache):
+    for i in range(10):
+        cache.put(MODEL, "RETRIEVAL_DOCUMENT", f"text {i}", [float(i)])
+    # Touch the oldest entry so it becomes most recently used
+    assert cache.get(MODEL, "RETRIEVAL_DOCUMENT", "text 0") == [0.0]
+    cache.put(MODEL, "RETRIEVAL_DOCUMENT", "text 10", [10.0])
+
+    assert cache.stats()["entries"] <= 10
+    assert cache.get(MODEL, "RETRIEVAL_DOCUMENT", "text 0") == [0.0]
+    assert cache.get(MODEL, "RETRIEVAL_DOCUMENT", "text 1") is None
+
+def test_size_limit_eviction(tmp_path):
+    # Each vector is 128 doubles = 1 KiB, limit to ~4 KiB
+    cache = EmbeddingCache(tmp_path / "embedding_cache.sqlite", max_entries=1000, max_size_mb=4 / 1024)
+    for i in range(8):
+        cache.put(MODEL, "RETRIEVAL_DOCUMENT", f"text {i}", [float(i)] * 128)
+    assert cache.stats()["size_bytes"] <= 4 * 1024
+    assert cache.get(MODEL, "RETRIEVAL_DOCUMENT", "text 7") is not None
+    cache.close()
+
+def test_unsupported_vector_is_not_cached(cache):
+    cache.put(MODEL, "RETRIEVAL_DOCUMENT", "mocked", MagicMock())
+    assert cache.stats()["entries"] == 0
+
+def test_engine_embed_content_uses_cache(mock_genai, make_engine):
+    design = AMMDesign(name="CachedEmbeddings")
+    engine = make_engine(design)
+    assert engine.embedding_cache is not None
+
+    assert engine._embed_content("same text") == [1.0, 0.0]
+    assert engine._embed_content("same text") == [1.0, 0.0]
+    assert mock_genai.embed_content.call_count == 1
+
+    # A new engine on the same data path reuses the persisted embedding
+    restarted = make_engine(design)
+    assert restarted._embed_content("same text") == [1.0, 0.0]
+    assert mock_genai.embed_content.call_count == 1
+
+def test_engine_embedding_cache_disabled(mock_genai, make_engine):
+    engine = make_engine(name="NoCache", embedding=EmbeddingConfig(cache_enabled=False))
+    assert engine.embedding_cache is None
+
+# --- Tests for the in-process query embedding cache --- #
+
+def test_query_cache_normalizes_text():
+    cache = QueryEmbeddingCache(max_entries=4)
+    cache.put(MODEL, "What is  AMM?", [0.1])
+    assert cache.get(MODEL, "  What is AMM? ") == [0.1]
+    assert cache.get(MODEL, "what is amm?") is None # Case is kept unless casefolding is enabled
+    assert cache.get("other-model", "What is AMM?") is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2, "evictions": 0}
+
+    cache = QueryEmbeddingCache(max_entries=4, casefold=True)
+    cache.put(MODEL, "What is  AMM?", [0.1])
+    assert cache.get(MODEL, "  what is amm? ") == [0.1]
+
+def test_query_cache_lru_eviction():
+    cache = QueryEmbeddingCache(max_entries=2)
+    cache.put(MODEL, "first", [1.0])
+    cache.put(MODEL, "second", [2.0])
+    cache.get(MODEL, "first")
+    cache.put(MODEL, "third", [3.0])
+
+    assert cache.get(MODEL, "second") is None
+    assert cache.get(MODEL, "first") == [1.0]
+    assert cache.stats()["evictions"] == 1
+
+def test_query_cache_ttl_expiry():
+    cache = QueryEmbeddingCache(ttl_seconds=10)
+    with patch('amm_project.engine.embedding_cache.time.monotonic', return_value=100.0):
+        cache.put(MODEL, "probe", [1.0])
+    with patch('amm_project.engine.embedding_cache.time.monotonic', return_value=105.0):
+        assert cache.get(MODEL, "probe") == [1.0]
+    with patch('amm_project.engine.embedding_cache.time.monotonic', return_value=111.0):
+        assert cache.get(MODEL, "probe") is None
+    assert cache.stats()["entries"] == 0
+
+def test_engine_query_embeddings_use_in_process_cache(mock_genai, make_engine):
+    engine = make_engine(name="QueryCache")
+    assert engine._embed_content("health probe", task_type="RETRIEVAL_QUERY") == [1.0, 0.0]
+    assert engine._embed_content("health  probe", task_type="RETRIEVAL_QUERY") == [1.0, 0.0]
+
+    assert mock_genai.embed_content.call_count == 1
+    assert engine.query_embedding_cache.stats()["hits"] == 1
+    # Queries are kept out of the persistent knowledge embedding cache
+    assert engine.embedding_cache.stats()["entries"] == 0
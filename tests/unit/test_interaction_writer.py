@@ -0,0 +1,146 @@
+# tests/unit/test_interaction_writer.py
+
+import queue
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+
+from amm_project.models.amm_models import AdaptiveMemoryConfig
+from amm_project.models.memory_models import InteractionRecordPydantic
+from amm_project.engine.interaction_writer import InteractionWriteBuffer, _open_writers
+from amm_project.engine.memory_store import SQLInteractionStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLInteractionStore(f"sqlite:///{tmp_path / 'memory.sqlite'}")
+    yield store
+    store.close()
+
+def record(i):
+    return InteractionRecordPydantic(query=f"query {i}", response=f"response {i}", session_id="s1")
+
+def stored_queries(store):
+    return [record.query for record in sorted(store.all_records(), key=lambda record: record.id)]
+
+def test_flushes_when_batch_is_full(store):
+    flushed_batches = []
+    writer = InteractionWriteBuffer(store, max_batch_size=3, flush_interval_seconds=60, on_flushed=flushed_batches.append)
+    for i in range(3):
+        assert writer.submit(record(i))
+    writer.flush(timeout=5)
+
+    assert stored_queries(store) == ["query 0", "query 1", "query 2"]
+    assert [len(batch) for batch in flushed_batches] == [3]
+    assert all(written.id is not None for written in flushed_batches[0])
+    writer.close()
+
+def test_flushes_after_interval(store):
+    writer = InteractionWriteBuffer(store, max_batch_size=100, flush_interval_seconds=0.05)
+    writer.submit(record(0))
+    time.sleep(0.5)
+
+    assert stored_queries(store) == ["query 0"]
+    assert writer.metrics()["flushes"] == 1
+    writer.close()
+
+def test_close_drains_queue_and_rejects_new_records(store):
+    writer = InteractionWriteBuffer(store, max_batch_size=100, flush_interval_seconds=60)
+    for i in range(5):
+        writer.submit(record(i))
+    writer.close()
+
+    assert len(stored_queries(store)) == 5
+    assert not writer.submit(record(5))
+    assert writer.metrics()["written"] == 5
+
+def test_full_queue_rejects_and_counts(store):
+    writer = InteractionWriteBuffer(store, max_batch_size=100, flush_interval_seconds=60, max_queue_size=1)
+    with patch.object(writer._queue, 'put_nowait', side_effect=queue.Full):
+        assert not writer.submit(record(0))
+    assert writer.metrics()["rejected"] == 1
+    writer.close()
+
+@pytest.fixture
+def no_retry_delay():
+    with patch('amm_project.engine.interaction_writer.RETRY_BASE_DELAY_SECONDS', 0):
+        yield
+
+def test_failed_batch_is_counted(store, no_retry_delay):
+    failing_store = MagicMock(add_many=MagicMock(side_effect=RuntimeError("disk I/O error")))
+    writer = InteractionWriteBuffer(failing_store, max_batch_size=2, flush_interval_seconds=60)
+    writer.submit(record(0))
+    writer.submit(record(1))
+    writer.flush(timeout=5)
+
+    assert writer.metrics()["failed"] == 2
+    assert writer.metrics()["written"] == 0
+    writer.close()
+
+def test_failed_batch_is_retried(store, no_retry_delay):
+    add_many = store.add_many
+    failures = [RuntimeError("database is locked")]
+    def fail_once(records):
+        if failures:
+            raise failures.pop()
+        return add_many(records)
+    with patch.object(store, 'add_many', side_effect=fail_once):
+        writer = InteractionWriteBuffer(store, max_batch_size=2, flush_interval_seconds=60)
+        writer.submit(record(0))
+        writer.submit(record(1))
+        writer.flush(timeout=5)
+
+    assert stored_queries(store) == ["query 0", "query 1"]
+    assert writer.metrics()["failed"] == 0
+    writer.close()
+
+def test_batch_that_keeps_failing_is_written_record_by_record(store, no_retry_delay):
+    add_many = store.add_many
+    def add_good_records(records):
+        if len(records) > 1 or records[0].query == "query 1":
+            raise ValueError("bad record")
+        return add_many(records)
+    with patch.object(store, 'add_many', side_effect=add_good_records):
+        writer = InteractionWriteBuffer(store, max_batch_size=3, flush_interval_seconds=60)
+        for i in range(3):
+            writer.submit(record(i))
+        writer.flush(timeout=5)
+
+    assert stored_queries(store) == ["query 0", "query 2"]
+    assert (writer.metrics()["written"], writer.metrics()["failed"]) == (2, 1)
+    writer.close()
+
+def test_records_accepted_during_close_are_written(store):
+    writer = InteractionWriteBuffer(store, max_batch_size=10, flush_interval_seconds=60)
+    accepted = []
+    def submit_many():
+        for i in range(200):
+            if writer.submit(record(i)):
+                accepted.append(i)
+    submitter = threading.Thread(target=submit_many)
+    submitter.start()
+    writer.close()
+    submitter.join()
+
+    assert len(stored_queries(store)) == len(accepted)
+    assert writer.metrics()["queue_depth"] == 0
+
+def test_close_drops_the_exit_hook_reference(store):
+    writer = InteractionWriteBuffer(store)
+    assert writer in _open_writers
+    writer.close()
+    assert writer not in _open_writers
+
+def test_engine_process_query_uses_write_behind(mock_genai, make_engine):
+    engine = make_engine(name="WriteBehind", adaptive_memory=AdaptiveMemoryConfig(write_behind_enabled=True, write_behind_flush_interval_seconds=60))
+
+    with patch.object(engine, 'add_interaction_record') as mock_add:
+        engine.process_query("Hello", session_id="s1")
+    mock_add.assert_not_called()
+    assert engine.get_adaptive_memory_metrics()["queue_depth"] == 1
+
+    assert engine.flush_interaction_records(timeout=5)
+    records = engine.get_recent_interaction_records(limit=5)
+    assert [(r.query, r.response, r.session_id) for r in records] == [("Hello", "answer", "s1")]
+    engine.close()
+    assert engine.interaction_writer is None
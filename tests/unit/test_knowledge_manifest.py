@@ -0,0 +1,172 @@
+# tests/unit/test_knowledge_manifest.py
+
+import pytest
+from unittest.mock import patch
+
+from amm_project.models.amm_models import (
+    AMMDesign,
+    AdaptiveMemoryConfig,
+    KnowledgeSourceConfig,
+    KnowledgeSourceType
+)
+from amm_project.engine.amm_engine import AMMEngine
+from amm_project.engine.knowledge_manifest import KnowledgeManifest, MANIFEST_FILENAME, fingerprints_match
+from amm_project.utils.hashing import hash_file
+
+def fake_embedding(text_to_embed, task_type="RETRIEVAL_DOCUMENT"):
+    """Deterministic 4-dimensional embedding derived from the text length."""
+    return [float(len(text_to_embed)), 1.0, 0.5, 0.25]
+
+@pytest.fixture
+def engine_env(mock_genai):
+    with patch.object(AMMEngine, '_embed_content', side_effect=fake_embedding) as mock_embed:
+        yield mock_embed
+
+def make_design(sources):
+    return AMMDesign(
+        design_id="manifest_test_design",
+        name="ManifestDesign",
+        knowledge_sources=sources,
+        adaptive_memory=AdaptiveMemoryConfig(enabled=False)
+    )
+
+def text_source(source_id, content):
+    return KnowledgeSourceConfig(id=source_id, name=f"Source {source_id}", type=KnowledgeSourceType.TEXT, content=content)
+
+def test_fingerprints_match_ignores_mtime():
+    recorded = {"type": "file", "size": 10, "mtime": 1.0, "content_hash": "abc"}
+    assert fingerprints_match({**recorded, "mtime": 2.0}, recorded)
+    assert not fingerprints_match({**recorded, "content_hash": "def"}, recorded)
+    assert not fingerprints_match(recorded, None)
+
+def test_manifest_save_and_load(tmp_path):
+    manifest = KnowledgeManifest(tmp_path / MANIFEST_FILENAME, embedding_model="model-a")
+    manifest.set_source("ks1", {"content_hash": "abc"}, ["ks1"])
+    assert manifest.save()
+
+    loaded = KnowledgeManifest.load(tmp_path / MANIFEST_FILENAME)
+    assert loaded.embedding_model == "model-a"
+    assert loaded.get_row_ids("ks1") == ["ks1"]
+    assert loaded.remove_source("ks1") == ["ks1"]
+    assert loaded.get_fingerprint("ks1") is None
+
+def test_restart_does_not_duplicate_rows(engine_env, tmp_path):
+    design = make_design([text_source("ks1", "alpha content"), text_source("ks2", "beta content")])
+
+    engine = AMMEngine(design=design, base_data_path=str(tmp_path))
+    assert engine.lancedb_table.count_rows() == 2
+    assert engine_env.call_count == 2
+    assert (tmp_path / MANIFEST_FILENAME).is_file()
+
+    engine_env.reset_mock()
+    restarted = AMMEngine(design=design, base_data_path=str(tmp_path))
+    assert restarted.lancedb_table.count_rows() == 2
+    engine_env.assert_not_called()
+
+def test_only_changed_sources_are_reembedded(engine_env, tmp_path):
+    AMMEngine(design=make_design([text_source("ks1", "alpha"), text_source("ks2", "beta")]), base_data_path=str(tmp_path))
+
+    engine_env.reset_mock()
+    changed = make_design([text_source("ks1", "alpha"), text_source("ks2", "beta, revised")])
+    engine = AMMEngine(design=changed, base_data_path=str(tmp_path))
+
+    engine_env.assert_called_once_with(text_to_embed="beta, revised", task_type="RETRIEVAL_DOCUMENT")
+    rows = engine.lancedb_table.to_pandas()
+    assert sorted(rows["text"].tolist()) == ["alpha", "beta, revised"]
+
+def test_removed_sources_are_deleted(engine_env, tmp_path):
+    AMMEngine(design=make_design([text_source("ks1", "alpha"), text_source("ks2", "beta")]), base_data_path=str(tmp_path))
+
+    engine_env.reset_mock()
+    engine = AMMEngine(design=make_design([text_source("ks1", "alpha")]), base_data_path=str(tmp_path))
+
+    engine_env.assert_not_called()
+    assert engine.lancedb_table.to_pandas()["id"].tolist() == ["ks1"]
+    assert KnowledgeManifest.load(tmp_path / MANIFEST_FILENAME).get_fingerprint("ks2") is None
+
+def test_touched_file_is_not_reembedded(engine_env, tmp_path):
+    knowledge_file = tmp_path / "notes.txt"
+    knowledge_file.write_text("file knowledge")
+    source = KnowledgeSourceConfig(id="file_ks", name="Notes", type=KnowledgeSourceType.FILE, path=str(knowledge_file))
+    data_path = tmp_path / "instance"
+
+    AMMEngine(design=make_design([source]), base_data_path=str(data_path))
+    knowledge_file.write_text("file knowledge")  # Same content, new mtime
+
+    engine_env.reset_mock()
+    engine = AMMEngine(design=make_design([source]), base_data_path=str(data_path))
+    engine_env.assert_not_called()
+    assert engine.lancedb_table.count_rows() == 1
+
+def test_table_without_manifest_is_rebuilt(engine_env, tmp_path):
+    design = make_design([text_source("ks1", "alpha")])
+    AMMEngine(design=design, base_data_path=str(tmp_path))
+    (tmp_path / MANIFEST_FILENAME).unlink()
+
+    engine = AMMEngine(design=design, base_data_path=str(tmp_path))
+    assert engine.lancedb_table.count_rows() == 1
+
+def test_table_writes_merge_on_row_id(engine_env, tmp_path):
+    engine = AMMEngine(design=make_design([text_source("ks1", "alpha"), text_source("ks2", "beta")]), base_data_path=str(tmp_path))
+    row = lambda row_id, text: {"id": row_id, "text": text, "vector": fake_embedding(text), "source": "Merged"}
+
+    # A stale ID that is written again is updated in place; duplicate IDs keep the last row
+    assert engine._apply_fixed_knowledge_changes([row("ks1", "alpha, v2"), row("ks3", "gamma"), row("ks3", "gamma, v2")], ["ks1", "ks2"])
+    rows = engine.lancedb_table.to_pandas().sort_values("id")
+    assert rows["id"].tolist() == ["ks1", "ks3"]
+    assert rows["text"].tolist() == ["alpha, v2", "gamma, v2"]
+
+def test_partially_embedded_source_is_retried(engine_env, tmp_path):
+    pdf_file = tmp_path / "manual.pdf"
+    pdf_file.write_bytes(b"%PDF-1.4 placeholder")
+    source = KnowledgeSourceConfig(id="pdf_ks", name="Manual", type=KnowledgeSourceType.FILE, path=str(pdf_file))
+    chunks = [{"id": f"pdf_p{i}-{i}_hash{i}", "text": f"chunk {i}", "metadata": {"chunk_index": i, "total_chunks": 4}} for i in range(4)]
+    data_path = tmp_path / "instance"
+
+    with patch('amm_project.engine.amm_engine.PDFProcessor.process_file', return_value=chunks), \
+         patch.object(AMMEngine, '_embed_contents_batch', return_value=[[1.0, 0.0, 0.0, 0.0], None, [0.0, 1.0, 0.0, 0.0], None]):
+        engine = AMMEngine(design=make_design([source]), base_data_path=str(data_path))
+    assert engine.lancedb_table.count_rows() == 2
+
+    with patch('amm_project.engine.amm_engine.PDFProcessor.process_file', return_value=chunks), \
+         patch.object(AMMEngine, '_embed_contents_batch', side_effect=lambda texts, task_type: [fake_embedding(text) for text in texts]) as mock_batch:
+        engine = AMMEngine(design=make_design([source]), base_data_path=str(data_path))
+        mock_batch.assert_called_once()
+        assert engine.lancedb_table.count_rows() == 4
+
+        mock_batch.reset_mock()
+        engine = AMMEngine(design=make_design([source]), base_data_path=str(data_path))
+        mock_batch.assert_not_called()
+
+def test_pdf_is_hashed_once_per_ingestion(engine_env, tmp_path):
+    pdf_file = tmp_path / "manual.pdf"
+    pdf_file.write_bytes(b"%PDF-1.4 placeholder")
+    source = KnowledgeSourceConfig(id="pdf_ks", name="Manual", type=KnowledgeSourceType.FILE, path=str(pdf_file))
+    chunks = [{"id": "pdf_p1-1_hash0", "text": "chunk 0", "metadata": {"chunk_index": 0, "total_chunks": 1}}]
+
+    with patch('amm_project.engine.amm_engine.PDFProcessor.process_file', return_value=chunks) as mock_process, \
+         patch('amm_project.engine.amm_engine.hash_file', wraps=hash_file) as mock_hash:
+        AMMEngine(design=make_design([source]), base_data_path=str(tmp_path / "instance"))
+    # The fingerprint's content hash is handed to the PDF cache instead of hashing the file again
+    mock_hash.assert_called_once()
+    assert mock_process.call_args.kwargs["file_hash"] == hash_file(pdf_file)
+
+def test_pdf_is_reingested_when_extraction_settings_change(engine_env, tmp_path):
+    pdf_file = tmp_path / "scan.pdf"
+    pdf_file.write_bytes(b"%PDF-1.4 placeholder")
+    source = KnowledgeSourceConfig(id="pdf_ks", name="Scan", type=KnowledgeSourceType.FILE, path=str(pdf_file))
+    chunks = [{"id": "pdf_p1-1_hash0", "text": "chunk 0", "metadata": {"chunk_index": 0, "total_chunks": 1}}]
+    data_path = tmp_path / "instance"
+    without_ocr = {"ocr": False, "min_page_text_chars": 50, "ocr_dpi": None}
+    with_ocr = {"ocr": True, "min_page_text_chars": 50, "ocr_dpi": 200}
+
+    with patch('amm_project.engine.amm_engine.PDFProcessor.process_file', return_value=chunks) as mock_process:
+        with patch('amm_project.engine.amm_engine.PDFProcessor.extraction_settings', return_value=without_ocr):
+            AMMEngine(design=make_design([source]), base_data_path=str(data_path))
+            AMMEngine(design=make_design([source]), base_data_path=str(data_path))
+        assert mock_process.call_count == 1
+
+        # OCR became available, so scanned pages now yield text
+        with patch('amm_project.engine.amm_engine.PDFProcessor.extraction_settings', return_value=with_ocr):
+            AMMEngine(design=make_design([source]), base_data_path=str(data_path))
+        assert mock_process.call_count == 2
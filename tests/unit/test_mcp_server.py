@@ -4,6 +4,7 @@ Unit tests for MCP server implementation.
 import os
 import sys
 import json
+import subprocess
 import pytest
 from pathlib import Path
 from unittest.mock import patch, MagicMock, mock_open
@@ -167,6 +168,14 @@ def test_generate_endpoint_error_handling(test_client, patched_mcp_server):
         assert "detail" in data
         assert "Error" in data["detail"]
 
+def test_shutdown_closes_the_engine(patched_mcp_server):
+    """Test that the lifespan handler closes the engine when the server stops."""
+    model_server = MagicMock()
+    patched_mcp_server['model_server'] = model_server
+    with TestClient(patched_mcp_server['app']):
+        model_server.engine.close.assert_not_called()
+    model_server.engine.close.assert_called_once()
+
 def test_api_key_validation(patched_mcp_server):
     """Test API key validation."""
     # Set API_KEY_REQUIRED to true
@@ -217,3 +226,19 @@ def test_build_amm_with_mcp_server():
         assert output_path is not None
         assert "test_output" in output_path
         assert "test_amm" in output_path
+
+def test_standalone_mcp_build_imports_its_own_modules(tmp_path):
+    """A generated MCP server imports the engine and every module it uses from the build directory."""
+    from build_amm import build_amm, BuildType
+
+    design_path = tmp_path / "design.json"
+    design_path.write_text(json.dumps(MINIMAL_DESIGN))
+    build_dir = Path(build_amm(design_json_path=str(design_path), output_root_dir=str(tmp_path / "builds"), build_type=BuildType.MCP_SERVER))
+
+    # Only the build directory is on the path, so any import left pointing at amm_project fails
+    script = "import sys, mcp_server; assert 'amm_project' not in sys.modules; assert mcp_server.model_server is not None; print(mcp_server.AMMEngine.__module__)"
+    env = {**os.environ, "PYTHONPATH": str(build_dir), "AMM_DESIGN_PATH": str(build_dir / "design.json"),
+           "AMM_BUILD_DIR": str(build_dir), "GEMINI_API_KEY": "test_key"}
+    result = subprocess.run([sys.executable, "-c", script], cwd=build_dir, env=env, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout[-2000:] + result.stderr[-2000:]
+    assert result.stdout.strip().splitlines()[-1] == "amm_engine"
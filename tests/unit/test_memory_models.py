@@ -0,0 +1,70 @@
+# tests/unit/test_memory_models.py
+
+import sqlite3
+import pytest
+
+from amm_project.models.memory_models import create_db_engine_and_tables, get_session_local, InteractionRecordORM
+
+EXPECTED_INDEXES = {
+    "ix_interaction_records_timestamp",
+    "ix_interaction_records_session_id_timestamp",
+    "ix_interaction_records_user_id_timestamp",
+}
+
+def index_names(db_path):
+    with sqlite3.connect(db_path) as connection:
+        rows = connection.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'interaction_records'").fetchall()
+    return {name for (name,) in rows}
+
+def test_new_database_has_indexes_and_pragmas(tmp_path):
+    db_path = tmp_path / "memory.sqlite"
+    engine = create_db_engine_and_tables(f"sqlite:///{db_path}")
+
+    assert EXPECTED_INDEXES <= index_names(db_path)
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1 # NORMAL
+        assert connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2 # INCREMENTAL
+    engine.dispose()
+
+def test_existing_database_is_migrated_in_place(tmp_path):
+    db_path = tmp_path / "legacy.sqlite"
+    with sqlite3.connect(db_path) as connection:
+        # Schema as created by earlier versions (indexes on id, session_id and user_id only)
+        connection.executescript("""
+            CREATE TABLE interaction_records (
+                id INTEGER NOT NULL PRIMARY KEY, session_id VARCHAR, user_id VARCHAR,
+                query TEXT NOT NULL, response TEXT NOT NULL, timestamp DATETIME NOT NULL, additional_metadata JSON
+            );
+            CREATE INDEX ix_interaction_records_id ON interaction_records (id);
+            CREATE INDEX ix_interaction_records_session_id ON interaction_records (session_id);
+            CREATE INDEX ix_interaction_records_user_id ON interaction_records (user_id);
+            INSERT INTO interaction_records (query, response, timestamp) VALUES ('legacy query', 'legacy response', '2025-01-01 00:00:00.000000');
+        """)
+
+    engine = create_db_engine_and_tables(f"sqlite:///{db_path}")
+
+    assert EXPECTED_INDEXES <= index_names(db_path)
+    session = get_session_local(engine)()
+    assert session.query(InteractionRecordORM).one().query == "legacy query"
+    session.close()
+    # Running the migration again is a no-op
+    create_db_engine_and_tables(f"sqlite:///{db_path}").dispose()
+    engine.dispose()
+
+@pytest.mark.parametrize("where_clause, expected_index", [
+    ("", "ix_interaction_records_timestamp"),
+    ("WHERE session_id = 's1'", "ix_interaction_records_session_id_timestamp"),
+    ("WHERE user_id = 'u1'", "ix_interaction_records_user_id_timestamp"),
+])
+def test_recent_history_queries_use_indexes(tmp_path, where_clause, expected_index):
+    db_path = tmp_path / "memory.sqlite"
+    create_db_engine_and_tables(f"sqlite:///{db_path}").dispose()
+
+    with sqlite3.connect(db_path) as connection:
+        plan = connection.execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM interaction_records {where_clause} ORDER BY timestamp DESC LIMIT 10"
+        ).fetchall()
+    plan_text = " ".join(row[-1] for row in plan)
+    assert expected_index in plan_text
+    assert "TEMP B-TREE" not in plan_text
@@ -0,0 +1,147 @@
+# tests/unit/test_memory_pooling.py
+
+import sqlite3
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from amm_project.models.amm_models import AdaptiveMemoryConfig, RetrievalConfig
+from amm_project.models.memory_models import create_db_engine_and_tables, retry_on_lock, is_lock_error, InteractionRecordPydantic
+
+def lock_error(message="database is locked"):
+    return OperationalError("INSERT INTO interaction_records ...", {}, sqlite3.OperationalError(message))
+
+def test_file_database_uses_sized_queue_pool_with_busy_timeout(tmp_path):
+    engine = create_db_engine_and_tables(f"sqlite:///{tmp_path / 'memory.sqlite'}", pool_size=3, busy_timeout_seconds=2.5)
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == 3
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 2500
+
+    # Connections are not tied to the thread that opened them
+    errors = []
+    def use_connection():
+        try:
+            with engine.connect() as connection:
+                connection.exec_driver_sql("SELECT 1")
+        except Exception as e:
+            errors.append(e)
+    thread = threading.Thread(target=use_connection)
+    thread.start()
+    thread.join()
+    assert errors == []
+    engine.dispose()
+
+def test_in_memory_database_shares_one_connection():
+    engine = create_db_engine_and_tables("sqlite:///:memory:")
+    assert isinstance(engine.pool, StaticPool)
+    with engine.connect() as connection:
+        connection.exec_driver_sql("INSERT INTO interaction_records (query, response, timestamp) VALUES ('q', 'r', '2024-01-01')")
+        connection.commit()
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT COUNT(*) FROM interaction_records").scalar() == 1
+
+def test_retry_on_lock_retries_then_succeeds():
+    session = MagicMock()
+    operation = MagicMock(side_effect=[lock_error(), lock_error("database is busy"), "done"])
+    with patch('amm_project.models.memory_models.time.sleep') as mock_sleep:
+        assert retry_on_lock(operation, session=session, retries=3, initial_delay_seconds=0.1) == "done"
+    assert operation.call_count == 3
+    assert session.rollback.call_count == 2
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.1, 0.2]
+
+def test_retry_on_lock_gives_up_and_ignores_other_errors():
+    operation = MagicMock(side_effect=lock_error())
+    with patch('amm_project.models.memory_models.time.sleep'):
+        with pytest.raises(OperationalError):
+            retry_on_lock(operation, retries=2)
+    assert operation.call_count == 3
+
+    operation = MagicMock(side_effect=lock_error("no such table: interaction_records"))
+    with pytest.raises(OperationalError):
+        retry_on_lock(operation, retries=2)
+    assert operation.call_count == 1
+    assert not is_lock_error(ValueError("database is locked"))
+
+@pytest.fixture
+def make_engine(make_engine):
+    def build(retrieval=None, **memory_settings):
+        return make_engine(name="Pooling", adaptive_memory=AdaptiveMemoryConfig(**memory_settings), retrieval=retrieval or RetrievalConfig())
+    return build
+
+def count_sessions(engine):
+    opened = []
+    factory = engine.memory_store.session_factory
+    def counting_factory():
+        session = factory()
+        opened.append(session)
+        return session
+    engine.memory_store.session_factory = counting_factory
+    return opened
+
+def test_process_query_uses_one_session_for_retrieval_and_storage(mock_genai, make_engine):
+    engine = make_engine()
+    engine.process_query("first", session_id="s1")
+    opened = count_sessions(engine)
+
+    engine.process_query("second", session_id="s1")
+    assert len(opened) == 1
+    prompt = mock_genai.GenerativeModel.return_value.generate_content.call_args.args[0]
+    assert "first" in prompt
+    assert [r.query for r in engine.get_recent_interaction_records(limit=5)] == ["first", "second"]
+    assert len(opened) == 2 # Outside a query, each call gets its own session
+
+def test_shared_session_returns_its_connection_between_uses(mock_genai, make_engine):
+    engine = make_engine(db_pool_size=1)
+    pool = engine.memory_store.engine.pool
+    checked_out_during_generation = []
+    def generate(prompt):
+        checked_out_during_generation.append(pool.checkedout())
+        return MagicMock(text="answer")
+    mock_genai.GenerativeModel.return_value.generate_content.side_effect = generate
+
+    engine.process_query("first", session_id="s1")
+    engine.process_query("second", session_id="s1")
+    assert checked_out_during_generation == [0, 0]
+    assert pool.checkedout() == 0
+
+@pytest.mark.asyncio
+async def test_process_query_async_uses_one_session(mock_genai, make_engine):
+    engine = make_engine()
+    opened = count_sessions(engine)
+
+    assert await engine.process_query_async("hello", user_id="alice") == "answer"
+    assert len(opened) == 1
+    assert [r.query for r in engine.get_recent_interaction_records(limit=5, user_id="alice")] == ["hello"]
+
+def test_timed_out_retrieval_does_not_block_storage(mock_genai, make_engine):
+    engine = make_engine(retrieval=RetrievalConfig(adaptive_memory_timeout_seconds=0.05))
+    release = threading.Event()
+    original_retrieve = engine._retrieve_adaptive_memory
+    def slow_retrieve(*args, **kwargs):
+        with engine.memory_store._session():
+            release.wait(5) # Holds the query's shared session past the budget
+        return original_retrieve(*args, **kwargs)
+
+    with patch.object(engine, '_retrieve_adaptive_memory', side_effect=slow_retrieve):
+        assert engine.process_query("hello") == "answer"
+    # Stored through a separate session while the stage still held the shared one
+    assert [r.query for r in engine.get_recent_interaction_records(limit=5)] == ["hello"]
+    release.set()
+
+def test_add_interaction_record_retries_when_locked(mock_genai, make_engine):
+    engine = make_engine(db_busy_timeout_seconds=0.05, db_lock_retries=5)
+    blocker = engine.memory_store.engine.raw_connection()
+    blocker.execute("BEGIN IMMEDIATE") # Holds the write lock
+    releaser = threading.Timer(0.2, blocker.rollback)
+    releaser.start()
+
+    started_at = time.monotonic()
+    record_id = engine.add_interaction_record(InteractionRecordPydantic(query="q", response="r"))
+    assert record_id is not None
+    assert time.monotonic() - started_at >= 0.15
+    releaser.join()
+    blocker.close()
@@ -0,0 +1,137 @@
+# tests/unit/test_memory_store.py
+
+import os
+from datetime import datetime, timedelta, timezone
+import pytest
+from unittest.mock import patch
+
+from amm_project.models.amm_models import AdaptiveMemoryBackend, AdaptiveMemoryConfig
+from amm_project.models.memory_models import ConversationSummaryORM, ConversationSummaryPydantic, InteractionRecordORM, InteractionRecordPydantic
+from amm_project.engine.memory_store import InMemoryInteractionStore, SQLInteractionStore, create_interaction_store
+from amm_project.engine.amm_engine import AMMEngine
+
+# Point this at a disposable database (e.g. a local PostgreSQL container) to run the store tests against it
+POSTGRES_URL_ENV_VAR = "AMM_TEST_POSTGRES_URL"
+
+@pytest.fixture(params=["sqlite_file", "sqlite_memory", "dict", "postgresql"])
+def store(request, tmp_path):
+    if request.param == "dict":
+        store = InMemoryInteractionStore()
+    elif request.param == "sqlite_file":
+        store = SQLInteractionStore(f"sqlite:///{tmp_path / 'memory.sqlite'}")
+    elif request.param == "sqlite_memory":
+        store = SQLInteractionStore("sqlite://")
+    else:
+        postgres_url = os.getenv(POSTGRES_URL_ENV_VAR)
+        if not postgres_url:
+            pytest.skip(f"{POSTGRES_URL_ENV_VAR} not set")
+        store = SQLInteractionStore(postgres_url)
+        with store.session_factory() as session:
+            session.query(InteractionRecordORM).delete()
+            session.query(ConversationSummaryORM).delete()
+            session.commit()
+    yield store
+    store.close()
+
+def record(query, session_id=None, user_id=None, age_days=0):
+    return InteractionRecordPydantic(
+        query=query, response=f"response to {query}", session_id=session_id, user_id=user_id,
+        timestamp=datetime.now(timezone.utc) - timedelta(days=age_days)
+    )
+
+def test_add_assigns_ids_and_round_trips(store):
+    first = store.add(record("first", session_id="s1", user_id="alice"))
+    batch = store.add_many([record("second"), record("third")])
+
+    assert first.id is not None
+    assert len({first.id, *(r.id for r in batch)}) == 3
+    fetched = store.get_by_ids([first.id, 999_999])
+    assert [(r.query, r.session_id, r.user_id) for r in fetched] == [("first", "s1", "alice")]
+
+def test_recent_is_newest_first_and_filtered(store):
+    store.add_many([
+        record("old", session_id="s1", age_days=2),
+        record("new", session_id="s1"),
+        record("other", session_id="s2", age_days=1),
+    ])
+    assert [r.query for r in store.recent(10)] == ["new", "other", "old"]
+    assert [r.query for r in store.recent(1, filters={"session_id": "s1"})] == ["new"]
+    assert len(store.all_records()) == 3
+
+def test_records_after_id(store):
+    first, second, third = store.add_many([record("one", session_id="s1"), record("two", session_id="s2"), record("three", session_id="s1")])
+    assert [r.query for r in store.records_after(first.id, 10)] == ["two", "three"]
+    assert [r.query for r in store.records_after(0, 1, filters={"session_id": "s1"})] == ["one"]
+    assert [r.query for r in store.recent(10, filters={"session_id": "s1"}, after_id=first.id)] == ["three"]
+
+def test_summary_round_trip(store):
+    assert store.get_summary("s1") is None
+    store.save_summary(ConversationSummaryPydantic(session_id="s1", summary="first version", covered_through_id=3, turns_summarized=3))
+    store.save_summary(ConversationSummaryPydantic(session_id="s1", summary="second version", covered_through_id=7, turns_summarized=7))
+    summary = store.get_summary("s1")
+    assert (summary.summary, summary.covered_through_id, summary.turns_summarized) == ("second version", 7, 7)
+    assert store.get_summary("s2") is None
+
+def test_update_and_delete(store):
+    stored = store.add(record("question"))
+    updated = store.update(stored.id, {"response": "edited", "user_id": "bob"})
+    assert (updated.response, updated.user_id) == ("edited", "bob")
+    assert store.get_by_ids([stored.id])[0].response == "edited"
+    assert store.update(stored.id + 1000, {"response": "x"}) is None
+
+    assert store.delete(stored.id)
+    assert not store.delete(stored.id)
+    assert store.recent(10) == []
+
+def test_expired_and_delete_ids(store):
+    store.add_many([record("a", age_days=40), record("b", age_days=35), record("c")])
+    expired = store.expired(datetime.now(timezone.utc) - timedelta(days=30), limit=10)
+    assert [r.query for r in expired] == ["a", "b"]
+    assert [r.query for r in store.expired(datetime.now(timezone.utc) - timedelta(days=30), limit=1)] == ["a"]
+
+    assert store.delete_ids([r.id for r in expired]) == 2
+    assert [r.query for r in store.recent(10)] == ["c"]
+
+def test_in_memory_store_returns_copies():
+    store = InMemoryInteractionStore()
+    stored = store.add(record("question"))
+    stored.query = "mutated"
+    store.recent(1)[0].response = "mutated"
+    assert (store.recent(1)[0].query, store.recent(1)[0].response) == ("question", "response to question")
+
+def test_create_interaction_store_selects_backend(tmp_path, monkeypatch):
+    assert isinstance(create_interaction_store(AdaptiveMemoryConfig(backend=AdaptiveMemoryBackend.MEMORY), None), InMemoryInteractionStore)
+
+    default_store = create_interaction_store(AdaptiveMemoryConfig(), tmp_path / "default.sqlite")
+    assert default_store.engine.url.database == str((tmp_path / "default.sqlite").resolve())
+
+    monkeypatch.setenv("AMM_MEMORY_DB_URL", f"sqlite:///{tmp_path / 'shared.sqlite'}")
+    config = AdaptiveMemoryConfig(db_url=f"sqlite:///{tmp_path / 'configured.sqlite'}", db_url_env_var="AMM_MEMORY_DB_URL")
+    assert create_interaction_store(config, tmp_path / "default.sqlite").engine.url.database == str(tmp_path / "shared.sqlite")
+    monkeypatch.delenv("AMM_MEMORY_DB_URL")
+    assert create_interaction_store(config, tmp_path / "default.sqlite").engine.url.database == str(tmp_path / "configured.sqlite")
+
+    with pytest.raises(ValueError):
+        create_interaction_store(AdaptiveMemoryConfig(), None)
+
+def test_engine_with_in_memory_backend(mock_genai, make_engine):
+    with patch.object(AMMEngine, '_start_retention_worker'):
+        engine = make_engine(name="Stateless", adaptive_memory=AdaptiveMemoryConfig(backend=AdaptiveMemoryBackend.MEMORY, retention_policy_days=1))
+
+    engine.process_query("first", session_id="s1")
+    engine.process_query("second", session_id="s1")
+    prompt = mock_genai.GenerativeModel.return_value.generate_content.call_args.args[0]
+    assert "first" in prompt
+    assert [r.query for r in engine.get_recent_interaction_records(limit=5)] == ["first", "second"]
+    assert not engine.sqlite_path.exists()
+
+    assert engine.prune_adaptive_memory(now=datetime.now(timezone.utc) + timedelta(days=2)) == 2
+    assert engine.get_recent_interaction_records(limit=5) == []
+
+def test_engines_sharing_a_database_share_memory(mock_genai, make_engine, tmp_path):
+    memory_config = AdaptiveMemoryConfig(db_url=f"sqlite:///{tmp_path / 'shared.sqlite'}")
+    replica_a = make_engine(name="Replica", adaptive_memory=memory_config, base_data_path=tmp_path / "a")
+    replica_b = make_engine(name="Replica", adaptive_memory=memory_config, base_data_path=tmp_path / "b")
+
+    replica_a.process_query("asked on replica a", session_id="s1")
+    assert [r.query for r in replica_b.get_recent_interaction_records(limit=5, session_id="s1")] == ["asked on replica a"]
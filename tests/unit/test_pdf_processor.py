@@ -2,7 +2,9 @@
 Tests for the PDF processor module.
 """
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -13,7 +15,8 @@ sys.path.append(str(project_root))
 
 # Try importing the module directly - this will fail if dependencies aren't installed
 try:
-    from amm_project.utils.pdf_processor import PDFProcessor, process_pdf
+    from amm_project.utils.pdf_processor import PDFProcessor, make_chunk_id, process_pdf
+    from amm_project.utils.hashing import hash_file
     PDF_PROCESSOR_AVAILABLE = True
 except ImportError:
     PDF_PROCESSOR_AVAILABLE = False
@@ -69,11 +72,6 @@ class TestPDFProcessor(unittest.TestCase):
         self.assertEqual(processor.chunk_overlap, 100)
         self.assertEqual(processor.min_chunk_size, 20)
     
-    def test_detect_pdf_type(self):
-        """Test PDF type detection."""
-        # Skip this test until we have better mocks
-        self.skipTest("Needs better PDF mocking")
-    
     def test_extract_text(self):
         """Test text extraction."""
         # Skip this test until we have better mocks
@@ -93,22 +91,19 @@ class TestPDFProcessor(unittest.TestCase):
         # Skip real file processing and test the chunking directly
         mock_uuid.hex = "12345678"
         
-        # Create mock text directly
-        with patch.object(PDFProcessor, '_extract_text') as mock_extract:
-            mock_extract.return_value = "Test content for chunking. " * 30
+        # Create mock page text directly
+        with patch.object(PDFProcessor, 'iter_page_texts') as mock_extract:
+            mock_extract.return_value = iter(["Test content for chunking. " * 30])
+            
+            chunks = self.processor.process_file("fake_path.pdf")
             
-            with patch.object(PDFProcessor, 'detect_pdf_type') as mock_detect:
-                mock_detect.return_value = "text"
-                
-                chunks = self.processor.process_file("fake_path.pdf")
-                
-                # Verify chunking behavior
-                self.assertTrue(len(chunks) > 0)
-                # Check structure of first chunk
-                self.assertIn("id", chunks[0])
-                self.assertIn("text", chunks[0])
-                self.assertEqual(chunks[0]["source_type"], "pdf")
-                self.assertIn("metadata", chunks[0])
+            # Verify chunking behavior
+            self.assertTrue(len(chunks) > 0)
+            # Check structure of first chunk
+            self.assertIn("id", chunks[0])
+            self.assertIn("text", chunks[0])
+            self.assertEqual(chunks[0]["source_type"], "pdf")
+            self.assertIn("metadata", chunks[0])
     
     def test_process_pdf_utility(self):
         """Test the utility function."""
@@ -116,5 +111,205 @@ class TestPDFProcessor(unittest.TestCase):
         self.skipTest("Needs better PDF mocking")
 
 
+def make_pdf(page_texts):
+    """Build a minimal PDF with one line of Helvetica text per page (None for a page without text)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for text in page_texts:
+        escaped = (text or "").replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        stream = f"BT /F1 10 Tf 40 750 Td ({escaped}) Tj ET" if text else ""
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {content_id} 0 R /Resources << /Font << /F1 3 0 R >> >> >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return pdf
+
+
+@unittest.skipIf(not PDF_PROCESSOR_AVAILABLE, "PDF processor dependencies not available")
+class TestPDFPageExtraction(unittest.TestCase):
+    """Page-level extraction and chunking on real (generated) PDF files."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.page_texts = [f"Page {number} talks about topic {number}. It has a second sentence here." for number in range(1, 11)]
+        self.pdf_path = os.path.join(self.temp_dir.name, "manual.pdf")
+        with open(self.pdf_path, "wb") as f:
+            f.write(make_pdf(self.page_texts))
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_parallel_extraction_keeps_page_order(self):
+        """Page ranges extracted in worker processes come back in page order."""
+        processor = PDFProcessor({"parallel_min_pages": 1, "pages_per_task": 3, "max_workers": 2})
+        self.assertEqual(list(processor.iter_page_texts(self.pdf_path)), self.page_texts)
+        sequential = PDFProcessor({"parallel_min_pages": 1000})
+        self.assertEqual(list(sequential.iter_page_texts(self.pdf_path)), self.page_texts)
+    
+    def test_chunk_pages_matches_chunking_joined_text(self):
+        """Streaming pages through the chunker gives the same chunks as chunking the whole text."""
+        processor = PDFProcessor({"chunk_size": 150, "min_chunk_size": 20})
+        pages = self.page_texts[:3] + [""] + self.page_texts[3:]
+        chunks = list(processor._chunk_pages(pages))
+        self.assertEqual([text for text, _, _ in chunks], processor._chunk_text("\n\n".join(self.page_texts)))
+        # Page spans are 1-based and in order; the empty page 4 never starts or ends a chunk
+        spans = [(page_start, page_end) for _, page_start, page_end in chunks]
+        self.assertEqual(spans[0][0], 1)
+        self.assertEqual(spans[-1][1], len(pages))
+        self.assertTrue(all(start <= end for start, end in spans))
+        self.assertTrue(all(a[1] <= b[0] for a, b in zip(spans, spans[1:])))
+        self.assertNotIn(4, [page for span in spans for page in span])
+
+    def test_chunk_pages_matches_joined_text_across_long_sentences(self):
+        """A sentence longer than chunk_size that crosses pages is sliced as in the joined text."""
+        pages = ["word " * 50, "more " * 10 + "end. Next sentence here."]
+        for min_chunk_size in (1, 10, 50):
+            processor = PDFProcessor({"chunk_size": 100, "chunk_overlap": 20, "min_chunk_size": min_chunk_size})
+            chunks = list(processor._chunk_pages(pages))
+            self.assertEqual([text for text, _, _ in chunks], processor._chunk_text("\n\n".join(pages)))
+            if min_chunk_size == 10:
+                self.assertEqual([(start, end) for _, start, end in chunks], [(1, 1), (1, 1), (1, 2), (1, 2), (2, 2)])
+
+    def test_process_file_reports_page_spans(self):
+        """Chunks of a processed PDF carry the pages they came from."""
+        processor = PDFProcessor({"chunk_size": 200, "min_chunk_size": 20, "parallel_min_pages": 4, "pages_per_task": 2, "max_workers": 2})
+        chunks = processor.process_file(self.pdf_path)
+        self.assertTrue(chunks)
+        self.assertEqual(chunks[0]["metadata"]["page_start"], 1)
+        self.assertEqual(chunks[-1]["metadata"]["page_end"], 10)
+        self.assertIn("Page 10 talks", chunks[-1]["text"])
+    
+    def test_single_pass_detects_type_and_ocrs_only_scanned_pages(self):
+        """The type comes from the extraction pass, and only pages without a text layer are OCRed."""
+        with open(self.pdf_path, "wb") as f:
+            f.write(make_pdf([self.page_texts[0], None, self.page_texts[2]]))
+        processor = PDFProcessor({"chunk_size": 1000, "min_chunk_size": 20, "ocr_workers": 1})
+        processor.convert_from_path = MagicMock(return_value=["page image"])
+        processor.pytesseract = MagicMock()
+        processor.pytesseract.image_to_string.return_value = "Recovered by OCR from the scanned second page."
+        processor.PyPDF2 = MagicMock()
+        
+        with patch.object(processor.pdfplumber, "open", wraps=processor.pdfplumber.open) as mock_open_pdf:
+            chunks = processor.process_file(self.pdf_path)
+        
+        mock_open_pdf.assert_called_once()
+        processor.PyPDF2.PdfReader.assert_not_called()
+        processor.convert_from_path.assert_called_once_with(self.pdf_path, dpi=200, first_page=2, last_page=2)
+        self.assertEqual(chunks[0]["metadata"]["pdf_type"], "mixed")
+        self.assertIn("Page 1 talks", chunks[0]["text"])
+        self.assertIn("Recovered by OCR", chunks[0]["text"])
+        self.assertIn("Page 3 talks", chunks[0]["text"])
+    
+    def test_ocr_worker_pool_keeps_page_order(self):
+        """Scanned pages are OCRed by the worker pool and merged back in page order."""
+        from concurrent.futures import ThreadPoolExecutor
+        page_texts = [None if number % 3 == 0 else text for number, text in enumerate(self.page_texts, start=1)]
+        with open(self.pdf_path, "wb") as f:
+            f.write(make_pdf(page_texts))
+        processor = PDFProcessor({"ocr_workers": 2, "ocr_dpi": 150})
+        processor.convert_from_path = MagicMock()
+        processor.pytesseract = MagicMock()
+        
+        fake_ocr = MagicMock(side_effect=lambda path, page_number, dpi: f"OCR text of scanned page {page_number} at {dpi} dpi.")
+        with patch("amm_project.utils.pdf_processor.ProcessPoolExecutor", ThreadPoolExecutor), \
+                patch("amm_project.utils.pdf_processor._ocr_page_text", fake_ocr):
+            page_stats = {"pages": 0, "low_text_pages": 0, "ocr_pages": 0}
+            pages = list(processor._iter_document_pages(self.pdf_path, True, page_stats))
+        
+        self.assertEqual([call.args[1] for call in fake_ocr.call_args_list], [3, 6, 9])
+        self.assertEqual(pages, [text or f"OCR text of scanned page {number} at 150 dpi." for number, text in enumerate(page_texts, start=1)])
+        self.assertEqual(page_stats, {"pages": 10, "low_text_pages": 3, "ocr_pages": 3})
+        processor.convert_from_path.assert_not_called()
+    
+    def test_cache_skips_extraction_of_unchanged_files(self):
+        """Cached chunks and page texts are reused until the file content or the settings change."""
+        cache_dir = os.path.join(self.temp_dir.name, "pdf_cache")
+        first = PDFProcessor({"chunk_size": 200, "min_chunk_size": 20, "cache_dir": cache_dir}).process_file(self.pdf_path)
+        self.assertTrue(first)
+        
+        processor = PDFProcessor({"chunk_size": 200, "min_chunk_size": 20, "cache_dir": cache_dir})
+        with patch.object(processor, "iter_page_texts") as mock_extract:
+            self.assertEqual(processor.process_file(self.pdf_path), first)
+            # New chunker settings re-chunk the cached page texts
+            processor.chunk_size = 400
+            rechunked = processor.process_file(self.pdf_path)
+        mock_extract.assert_not_called()
+        self.assertLess(len(rechunked), len(first))
+        self.assertEqual(rechunked[-1]["metadata"]["page_end"], 10)
+        
+        # New content is extracted again
+        with open(self.pdf_path, "wb") as f:
+            f.write(make_pdf(self.page_texts[:2]))
+        with patch.object(processor, "iter_page_texts", wraps=processor.iter_page_texts) as mock_extract:
+            changed = processor.process_file(self.pdf_path)
+        mock_extract.assert_called_once()
+        self.assertEqual(changed[-1]["metadata"]["page_end"], 2)
+    
+    def test_cache_prunes_entries_of_previous_content(self):
+        """When a file changes, the cache entries of its previous content are deleted."""
+        cache_dir = Path(self.temp_dir.name, "pdf_cache")
+        processor = PDFProcessor({"chunk_size": 200, "min_chunk_size": 20, "cache_dir": str(cache_dir)})
+        processor.process_file(self.pdf_path)
+        old_hash = hash_file(self.pdf_path)
+        # Another path with the same content keeps the entries alive through the first change
+        copy_path = os.path.join(self.temp_dir.name, "copy.pdf")
+        shutil.copyfile(self.pdf_path, copy_path)
+        processor.process_file(copy_path)
+        self.assertEqual(len(list(cache_dir.glob(f"{old_hash}.*.json"))), 2)
+        
+        with open(self.pdf_path, "wb") as f:
+            f.write(make_pdf(self.page_texts[:2]))
+        processor.process_file(self.pdf_path)
+        self.assertEqual(len(list(cache_dir.glob(f"{old_hash}.*.json"))), 2)
+        with open(copy_path, "wb") as f:
+            f.write(make_pdf(self.page_texts[:3]))
+        processor.process_file(copy_path)
+        self.assertEqual(list(cache_dir.glob(f"{old_hash}.*.json")), [])
+        self.assertEqual(len(list(cache_dir.glob("*.chunks.*.json"))), 2)
+    
+    def test_known_file_hash_is_not_recomputed(self):
+        """A file hash passed by the caller is used for the cache lookup."""
+        processor = PDFProcessor({"min_chunk_size": 20, "cache_dir": os.path.join(self.temp_dir.name, "pdf_cache")})
+        file_hash = hash_file(self.pdf_path)
+        with patch("amm_project.utils.pdf_processor.hash_file") as mock_hash:
+            first = processor.process_file(self.pdf_path, file_hash=file_hash)
+            with patch.object(processor, "iter_page_texts") as mock_extract:
+                self.assertEqual(processor.process_file(self.pdf_path, file_hash=file_hash), first)
+        mock_hash.assert_not_called()
+        mock_extract.assert_not_called()
+    
+    def test_chunk_ids_are_deterministic_and_unique(self):
+        """Chunk IDs depend only on page span and content, and repeated chunks are dropped."""
+        processor = PDFProcessor({"chunk_size": 200, "min_chunk_size": 20})
+        first = processor.process_file(self.pdf_path)
+        second = processor.process_file(self.pdf_path)
+        self.assertEqual([chunk["id"] for chunk in first], [chunk["id"] for chunk in second])
+        self.assertEqual(len({chunk["id"] for chunk in first}), len(first))
+        self.assertEqual(first[0]["id"], make_chunk_id(first[0]["text"], 1, first[0]["metadata"]["page_end"]))
+        
+        with patch.object(processor, "_chunk_pages", return_value=iter([("Repeated boilerplate text.", 1, 1)] * 2)):
+            self.assertEqual(len(processor.process_file(self.pdf_path)), 1)
+    
+    def test_pdf_type_without_ocr(self):
+        """Scanned pages are still classified when OCR is disabled or unavailable."""
+        processor = PDFProcessor({"min_chunk_size": 20})
+        self.assertEqual(processor.process_file(self.pdf_path, ocr_if_needed=False)[0]["metadata"]["pdf_type"], "text")
+        with open(self.pdf_path, "wb") as f:
+            f.write(make_pdf([None, None]))
+        self.assertEqual(processor.process_file(self.pdf_path, ocr_if_needed=False), [])
+        self.assertEqual(processor._pdf_type_from_page_stats({"pages": 2, "low_text_pages": 2, "ocr_pages": 0}), "scanned")
+        self.assertEqual(processor._pdf_type_from_page_stats({"pages": 0, "low_text_pages": 0, "ocr_pages": 0}), "unknown")
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
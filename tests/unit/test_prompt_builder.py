@@ -0,0 +1,102 @@
+# tests/unit/test_prompt_builder.py
+
+from datetime import datetime, timezone
+import pytest
+
+from amm_project.models.amm_models import PromptBudgetConfig
+from amm_project.engine.prompt_builder import estimate_tokens, truncate_to_tokens, pack_texts, pack_context, TRUNCATION_MARKER
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+    assert estimate_tokens("abcdef", chars_per_token=2) == 3
+
+def test_truncate_to_tokens_cuts_at_word_boundary():
+    text = "alpha beta gamma delta epsilon zeta eta theta"
+    assert truncate_to_tokens(text, 100) == text
+    truncated = truncate_to_tokens(text, 6) # 24 characters including the marker
+    assert truncated.endswith(TRUNCATION_MARKER)
+    assert len(truncated) <= 24
+    assert text.startswith(truncated[:-len(TRUNCATION_MARKER)])
+    assert not truncated[:-len(TRUNCATION_MARKER)].endswith(("delt", "gam"))
+
+def test_pack_texts_keeps_prefix_and_truncates_first_overflow():
+    texts = ["a" * 40, "b" * 40, "c" * 400, "d" * 40]
+    kept, used, truncated = pack_texts(texts, budget_tokens=40, min_fragment_tokens=5)
+    assert kept[:2] == texts[:2]
+    assert len(kept) == 3 and kept[2].startswith("c") and kept[2].endswith(TRUNCATION_MARKER)
+    assert used <= 40
+    assert truncated
+
+    kept, used, truncated = pack_texts(texts, budget_tokens=40, min_fragment_tokens=30)
+    assert kept == texts[:2] # Too little budget left for a useful fragment
+    assert truncated
+
+    assert pack_texts(texts[:2], budget_tokens=1000) == (texts[:2], 21, False)
+
+def test_pack_context_gives_unused_budget_to_the_other_type():
+    fixed = ["f" * 400, "g" * 400]
+    # No adaptive memory: fixed knowledge may use the whole budget, not just its share
+    kept_fixed, kept_adaptive, truncated = pack_context(fixed, [], budget_tokens=250, fixed_share=0.5)
+    assert kept_fixed == fixed and kept_adaptive == [] and not truncated
+
+    adaptive = ["a" * 400, "b" * 400]
+    kept_fixed, kept_adaptive, truncated = pack_context(fixed, adaptive, budget_tokens=210, fixed_share=0.5, min_fragment_tokens=200)
+    assert kept_fixed == fixed[:1] and kept_adaptive == adaptive[:1] and truncated
+
+    assert pack_context(fixed, adaptive, budget_tokens=-5) == ([], [], True)
+
+@pytest.fixture
+def make_engine(make_engine):
+    return lambda **budget_settings: make_engine(name="Budget", prompt_budget=PromptBudgetConfig(**budget_settings))
+
+def fixed_chunk(source_name, text):
+    return {"text": text, "source_name": source_name}
+
+def adaptive_chunk(record_id, query):
+    return {"id": record_id, "text": f"User: {query}\nAI: reply", "query_text": query, "response_text": "reply", "timestamp": datetime.now(timezone.utc), "metadata": {}}
+
+def test_assemble_prompt_within_budget_keeps_everything(mock_genai, make_engine):
+    engine = make_engine()
+    prompt, stats = engine._assemble_prompt("question", [fixed_chunk("Doc", "fact one")], [adaptive_chunk(2, "newer"), adaptive_chunk(1, "older")])
+    assert "Chunk 1 (Source: Doc):\nfact one" in prompt
+    assert prompt.index("older") < prompt.index("newer") # Oldest turn first
+    assert stats["prompt_tokens"] == estimate_tokens(prompt)
+    assert not stats["context_truncated"]
+    assert [chunk["id"] for chunk in stats["adaptive_memory_chunks"]] == [2, 1]
+
+def test_assemble_prompt_packs_long_history_into_budget(mock_genai, make_engine):
+    engine = make_engine(max_prompt_tokens=400, min_truncated_chunk_tokens=1000)
+    history = [adaptive_chunk(record_id, f"question {record_id} " + "x" * 300) for record_id in range(50, 0, -1)]
+    fixed = [fixed_chunk(f"Doc {i}", "y" * 500) for i in range(3)]
+
+    prompt, stats = engine._assemble_prompt("current question", fixed, history)
+    assert stats["prompt_tokens"] <= 400
+    assert stats["context_truncated"]
+    assert 0 < len(stats["fixed_knowledge_chunks"]) < 3
+    # The newest interactions are the ones kept
+    kept_ids = [chunk["id"] for chunk in stats["adaptive_memory_chunks"]]
+    assert kept_ids and kept_ids == list(range(50, 50 - len(kept_ids), -1))
+    assert "User: current question\nAI:" in prompt
+
+def test_unlimited_budget_does_not_pack(mock_genai, make_engine):
+    engine = make_engine(max_prompt_tokens=None)
+    history = [adaptive_chunk(record_id, "z" * 10_000) for record_id in range(20)]
+    prompt, stats = engine._assemble_prompt("q", [], history)
+    assert len(stats["adaptive_memory_chunks"]) == 20
+    assert stats["prompt_tokens"] > 50_000
+
+def test_process_query_detailed_reports_prompt_metadata(mock_genai, make_engine):
+    engine = make_engine()
+    engine.process_query("first question", session_id="s1")
+    result = engine.process_query_detailed("second question", session_id="s1")
+
+    assert result["response"] == "answer"
+    prompt = mock_genai.GenerativeModel.return_value.generate_content.call_args.args[0]
+    assert result["prompt_tokens"] == estimate_tokens(prompt)
+    assert result["context_truncated"] is False
+    stored = engine.get_recent_interaction_records(limit=5)
+    assert result["memory_records_used"] == [stored[0].id]
+    assert result["knowledge_sources_used"] == []
+    assert engine.process_query("third") == "answer"
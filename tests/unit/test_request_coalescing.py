@@ -0,0 +1,105 @@
+# tests/unit/test_request_coalescing.py
+
+import asyncio
+import importlib
+import json
+import pytest
+from unittest.mock import patch
+from fastapi import HTTPException
+
+class SlowEngine:
+    """Engine whose queries wait until released, counting how often each one actually runs."""
+
+    def __init__(self, design, base_data_path=None):
+        self.design = design
+        self.calls = []
+        self.release = asyncio.Event()
+        self.fail = False
+
+    async def process_query_detailed_async(self, query_text, session_id=None, user_id=None):
+        self.calls.append((query_text, session_id, user_id))
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return {"response": f"answer {len(self.calls)} to {query_text}", "timestamp": "2025-01-01T00:00:00+00:00", "memory_records_used": []}
+
+@pytest.fixture
+def mcp_server(tmp_path, monkeypatch):
+    monkeypatch.setenv("AMM_BUILD_DIR", str(tmp_path)) # The module builds a default server on first import
+    monkeypatch.setenv("AMM_DESIGN_PATH", str(tmp_path / "missing_design.json"))
+    return importlib.import_module("amm_project.templates.mcp_server")
+
+@pytest.fixture
+def make_server(mcp_server, tmp_path, monkeypatch):
+    design_path = tmp_path / "design.json"
+    design_path.write_text(json.dumps({"name": "Coalescing"}))
+    def make(coalesce="true"):
+        monkeypatch.setenv("MCP_COALESCE_REQUESTS", coalesce)
+        with patch.object(mcp_server, "AMMEngine", SlowEngine):
+            return mcp_server.AMMModelServer(str(design_path), str(tmp_path))
+    return make
+
+async def run_together(server, requests):
+    tasks = [asyncio.ensure_future(server.process_request(request)) for request in requests]
+    await asyncio.sleep(0.01) # All requests are in flight
+    server.engine.release.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_requests_share_one_computation(mcp_server, make_server):
+    server = make_server()
+    request = mcp_server.MCPRequest(query="status?", context={"session_id": "s1"})
+    responses = await run_together(server, [request, request.model_copy(), request.model_copy()])
+
+    assert server.engine.calls == [("status?", "s1", None)]
+    assert {response.response for response in responses} == {"answer 1 to status?"}
+    assert [response.metadata.get("coalesced", False) for response in responses] == [False, True, True]
+    assert server.coalesced_request_count == 2
+    assert server._in_flight == {}
+
+    # Completed requests are not reused
+    server.engine.release.clear()
+    later = asyncio.ensure_future(server.process_request(request))
+    await asyncio.sleep(0.01)
+    server.engine.release.set()
+    assert (await later).response == "answer 2 to status?"
+
+@pytest.mark.asyncio
+async def test_requests_differing_in_query_parameters_or_scope_run_separately(mcp_server, make_server):
+    server = make_server()
+    await run_together(server, [
+        mcp_server.MCPRequest(query="status?", context={"session_id": "s1"}),
+        mcp_server.MCPRequest(query="status?", context={"session_id": "s2"}),
+        mcp_server.MCPRequest(query="status?", context={"session_id": "s1"}, parameters={"detail": "high"}),
+        mcp_server.MCPRequest(query="other?", context={"session_id": "s1"}),
+    ])
+    assert len(server.engine.calls) == 4
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiting_request(mcp_server, make_server):
+    server = make_server()
+    server.engine.fail = True
+    request = mcp_server.MCPRequest(query="status?")
+    results = await run_together(server, [request, request.model_copy()])
+    assert all(isinstance(result, HTTPException) and result.status_code == 500 for result in results)
+    assert len(server.engine.calls) == 1
+    assert server._in_flight == {}
+
+@pytest.mark.asyncio
+async def test_cancelled_request_does_not_cancel_shared_computation(mcp_server, make_server):
+    server = make_server()
+    request = mcp_server.MCPRequest(query="status?")
+    first = asyncio.ensure_future(server.process_request(request))
+    second = asyncio.ensure_future(server.process_request(request.model_copy()))
+    await asyncio.sleep(0.01)
+    first.cancel() # e.g. the client disconnected
+    server.engine.release.set()
+    assert (await second).response == "answer 1 to status?"
+
+@pytest.mark.asyncio
+async def test_coalescing_can_be_disabled(mcp_server, make_server):
+    server = make_server(coalesce="false")
+    request = mcp_server.MCPRequest(query="status?")
+    responses = await run_together(server, [request, request.model_copy()])
+    assert len(server.engine.calls) == 2
+    assert not any("coalesced" in response.metadata for response in responses)
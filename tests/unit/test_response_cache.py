@@ -0,0 +1,127 @@
+# tests/unit/test_response_cache.py
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from amm_project.models.amm_models import AdaptiveMemoryConfig, EmbeddingConfig, KnowledgeSourceConfig, KnowledgeSourceType, ResponseCacheConfig
+from amm_project.engine.response_cache import ResponseCache
+
+def test_hit_requires_similar_query_and_same_context():
+    cache = ResponseCache(similarity_threshold=0.9)
+    cache.put([1.0, 0.0], "context-a", "cached answer")
+
+    response, similarity = cache.get([0.99, 0.1], "context-a")
+    assert response == "cached answer" and similarity > 0.9
+    assert cache.get([0.5, 0.5], "context-a") is None # Too dissimilar
+    assert cache.get([1.0, 0.0], "context-b") is None # Different context
+    assert cache.get([0.0, 0.0], "context-a") is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 3, "evictions": 0}
+
+def test_put_replaces_similar_entry():
+    cache = ResponseCache(similarity_threshold=0.9)
+    cache.put([1.0, 0.0], "context", "old answer")
+    cache.put([0.99, 0.05], "context", "new answer")
+    assert cache.stats()["entries"] == 1
+    assert cache.get([1.0, 0.0], "context")[0] == "new answer"
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(ttl_seconds=10)
+    with patch('amm_project.engine.response_cache.time.monotonic', return_value=100.0):
+        cache.put([1.0, 0.0], "context", "answer")
+    with patch('amm_project.engine.response_cache.time.monotonic', return_value=105.0):
+        assert cache.get([1.0, 0.0], "context") is not None
+    with patch('amm_project.engine.response_cache.time.monotonic', return_value=111.0):
+        assert cache.get([1.0, 0.0], "context") is None
+    assert cache.stats()["entries"] == 0
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put([1.0, 0.0, 0.0], "context", "x")
+    cache.put([0.0, 1.0, 0.0], "context", "y")
+    cache.get([1.0, 0.0, 0.0], "context") # x is now the most recently used
+    cache.put([0.0, 0.0, 1.0], "other context", "z")
+    assert cache.get([0.0, 1.0, 0.0], "context") is None
+    assert cache.get([1.0, 0.0, 0.0], "context")[0] == "x"
+    assert cache.stats()["evictions"] == 1
+
+@pytest.fixture
+def embedding_vector():
+    # Paraphrases of the same question share a direction
+    return lambda text: [1.0, 0.02 * len(text)] if "refund" in text else [0.0, 1.0]
+
+@pytest.fixture
+def make_engine(make_engine):
+    def build(base_data_path=None, cache_enabled=True, memory_enabled=False, **design_settings):
+        return make_engine(
+            name="Cached",
+            base_data_path=base_data_path,
+            adaptive_memory=AdaptiveMemoryConfig(enabled=memory_enabled),
+            response_cache=ResponseCacheConfig(enabled=cache_enabled, similarity_threshold=0.99),
+            **design_settings
+        )
+    return build
+
+def test_similar_query_is_served_from_cache(mock_genai, make_engine):
+    engine = make_engine()
+    generate = mock_genai.GenerativeModel.return_value.generate_content
+
+    first = engine.process_query_detailed("What is the refund policy?")
+    second = engine.process_query_detailed("what's the refund policy")
+    assert (first["cache_hit"], second["cache_hit"]) == (False, True)
+    assert second["response"] == "answer"
+    assert generate.call_count == 1
+
+    assert engine.process_query_detailed("How is the weather?")["cache_hit"] is False
+    assert generate.call_count == 2
+
+def test_changed_context_or_disabled_cache_regenerates(mock_genai, tmp_path, make_engine):
+    generate = mock_genai.GenerativeModel.return_value.generate_content
+    engine = make_engine(tmp_path / "memory", memory_enabled=True)
+    engine.process_query("What is the refund policy?", session_id="s1")
+    # The first turn is now part of the conversation history, so the context differs
+    assert engine.process_query_detailed("What is the refund policy?", session_id="s1")["cache_hit"] is False
+    assert generate.call_count == 2
+    # Without a session the history is not part of the context, so repeated queries hit
+    # (here even the first one, which matches the session's first turn with its empty history)
+    assert engine.process_query_detailed("What is the refund policy?")["cache_hit"] is True
+    assert engine.process_query_detailed("What is the refund policy?")["cache_hit"] is True
+    assert generate.call_count == 2
+
+    engine = make_engine(tmp_path / "disabled", cache_enabled=False)
+    assert engine.response_cache is None
+    engine.process_query("What is the refund policy?")
+    assert engine.process_query_detailed("What is the refund policy?")["cache_hit"] is False
+    assert generate.call_count == 4
+
+def test_errors_are_not_cached(mock_genai, make_engine):
+    generate = mock_genai.GenerativeModel.return_value.generate_content
+    generate.side_effect = [RuntimeError("quota exceeded"), MagicMock(text="answer")]
+    engine = make_engine()
+    assert engine.process_query("What is the refund policy?").startswith("Error processing query")
+    assert engine.process_query_detailed("What is the refund policy?")["cache_hit"] is False
+
+@pytest.mark.asyncio
+async def test_async_and_streaming_use_the_cache(mock_genai, make_engine):
+    engine = make_engine()
+
+    assert (await engine.process_query_detailed_async("What is the refund policy?"))["cache_hit"] is False
+    assert (await engine.process_query_detailed_async("What is the refund policy?"))["cache_hit"] is True
+    assert [chunk async for chunk in engine.stream_query_async("What is the refund policy?")] == ["answer"]
+    assert mock_genai.GenerativeModel.return_value.generate_content_async.call_count == 1
+
+def test_retrieval_query_embedding_is_reused_for_the_cache(mock_genai, make_engine):
+    def embed(model, content, task_type):
+        return {"embedding": [[0.0, 1.0] for _ in content] if isinstance(content, list) else [1.0, 0.0]}
+    mock_genai.embed_content.side_effect = embed
+    engine = make_engine(
+        embedding=EmbeddingConfig(query_cache_enabled=False),
+        knowledge_sources=[KnowledgeSourceConfig(id="ks1", name="Facts", type=KnowledgeSourceType.TEXT, content="Refunds take 5 days.")]
+    )
+    assert engine.lancedb_table is not None
+    mock_genai.embed_content.reset_mock()
+
+    engine.process_query_detailed("What is the refund policy?")
+    assert engine.process_query_detailed("What is the refund policy?")["cache_hit"] is True
+    # One query embedding per request, shared by fixed knowledge retrieval and the response cache
+    query_embeds = [call for call in mock_genai.embed_content.call_args_list if call.kwargs["task_type"] == "RETRIEVAL_QUERY"]
+    assert len(query_embeds) == 2
@@ -0,0 +1,96 @@
+# tests/unit/test_session_summary.py
+
+import threading
+import pytest
+from unittest.mock import patch
+
+from amm_project.models.amm_models import AMMDesign, AdaptiveMemoryConfig, AdaptiveMemoryScope
+from amm_project.models.memory_models import InteractionRecordPydantic
+from amm_project.engine.amm_engine import AMMEngine
+from amm_project.engine.session_summary import build_summary_prompt, SUMMARY_CHUNK_HEADER
+
+def test_build_summary_prompt():
+    turns = [InteractionRecordPydantic(query="q1", response="r1"), InteractionRecordPydantic(query="q2", response="r2")]
+    prompt = build_summary_prompt(None, turns, max_words=100)
+    assert "(none yet)" in prompt and "at most 100 words" in prompt
+    assert prompt.index("User: q1\nAI: r1") < prompt.index("User: q2\nAI: r2")
+    assert "earlier facts" in build_summary_prompt("earlier facts", turns, max_words=100)
+
+@pytest.fixture
+def generated_text():
+    return lambda prompt: "session summary" if "running summary" in prompt else "answer"
+
+@pytest.fixture
+def make_engine(make_engine):
+    def build(base_data_path=None, **memory_settings):
+        memory_config = AdaptiveMemoryConfig(summarization_enabled=True, summarize_batch_turns=4, summary_verbatim_turns=2, retrieval_limit=50, **memory_settings)
+        return make_engine(name="Summaries", base_data_path=base_data_path, adaptive_memory=memory_config)
+    return build
+
+def run_turns(engine, count, session_id="s1"):
+    for turn in range(count):
+        engine.process_query(f"question {turn}", session_id=session_id)
+        # Let the background summary finish; the executor is recreated on next use
+        engine._get_background_executor().shutdown(wait=True)
+        engine._background_executor = None
+
+def test_summary_waits_for_batch_beyond_verbatim_turns(mock_genai, make_engine):
+    engine = make_engine()
+    run_turns(engine, 5)
+    assert engine.memory_store.get_summary("s1") is None
+
+    run_turns(engine, 1)
+    summary = engine.memory_store.get_summary("s1")
+    records = engine.get_recent_interaction_records(limit=10, session_id="s1")
+    assert summary.summary == "session summary"
+    assert summary.covered_through_id == records[3].id # The four oldest turns
+    assert summary.turns_summarized == 4
+
+def test_retrieval_returns_summary_plus_recent_turns(mock_genai, make_engine):
+    engine = make_engine()
+    run_turns(engine, 12)
+    summary = engine.memory_store.get_summary("s1")
+    assert summary.turns_summarized == 8
+
+    chunks = engine._retrieve_adaptive_memory("next", session_id="s1")
+    assert [chunk["query_text"] for chunk in chunks[:-1]] == [f"question {turn}" for turn in range(11, 7, -1)]
+    assert chunks[-1]["id"] is None and chunks[-1]["text"].startswith(SUMMARY_CHUNK_HEADER)
+
+    result = engine.process_query_detailed("next", session_id="s1")
+    prompt = mock_genai.GenerativeModel.return_value.generate_content.call_args_list[-1].args[0]
+    assert "question 7" not in prompt and "question 11" in prompt
+    assert prompt.index(SUMMARY_CHUNK_HEADER) < prompt.index("question 8")
+    assert None not in result["memory_records_used"]
+    # Other sessions are unaffected
+    assert engine._retrieve_adaptive_memory("q", session_id="s2") == []
+
+def test_prompt_size_stays_bounded(mock_genai, make_engine):
+    engine = make_engine()
+    sizes = []
+    for _ in range(5):
+        run_turns(engine, 6)
+        sizes.append(len(engine._retrieve_adaptive_memory("q", session_id="s1")))
+    assert max(sizes) <= 4 + 2 + 1 # Batch + verbatim turns + summary
+
+def test_summaries_run_off_the_io_executor(mock_genai, make_engine):
+    engine = make_engine()
+    threads = []
+    original_summarize = engine._summarize_session
+    def summarize(session_id):
+        threads.append(threading.current_thread().name)
+        return original_summarize(session_id)
+    with patch.object(engine, '_summarize_session', side_effect=summarize):
+        run_turns(engine, 7)
+    assert threads and all(name.startswith("amm-bg-") for name in threads)
+    assert engine.memory_store.get_summary("s1") is not None
+
+def test_summarization_disabled_or_without_session(mock_genai, tmp_path, make_engine):
+    engine = AMMEngine(design=AMMDesign(name="Plain", adaptive_memory=AdaptiveMemoryConfig(summarize_batch_turns=1, summary_verbatim_turns=0)), base_data_path=str(tmp_path / "plain"))
+    run_turns(engine, 3)
+    assert engine.memory_store.get_summary("s1") is None
+    engine.close()
+
+    engine = make_engine(base_data_path=tmp_path / "user", scope=AdaptiveMemoryScope.USER)
+    for turn in range(8):
+        engine.process_query(f"question {turn}", user_id="alice")
+    assert len(engine._retrieve_adaptive_memory("q", user_id="alice")) == 8
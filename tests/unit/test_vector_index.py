@@ -0,0 +1,108 @@
+# tests/unit/test_vector_index.py
+
+import hashlib
+import pytest
+from unittest.mock import patch
+
+from amm_project.models.amm_models import (
+    AMMDesign,
+    AdaptiveMemoryConfig,
+    KnowledgeSourceConfig,
+    KnowledgeSourceType,
+    VectorIndexConfig,
+    VectorIndexType
+)
+from lancedb.index import HnswSq, IvfPq
+
+from amm_project.engine.amm_engine import AMMEngine
+
+def hashed_embedding(text_to_embed, task_type="RETRIEVAL_DOCUMENT"):
+    """Deterministic 8-dimensional embedding derived from a hash of the text."""
+    digest = hashlib.sha256(text_to_embed.encode("utf-8")).digest()
+    return [byte / 255.0 for byte in digest[:8]]
+
+@pytest.fixture
+def engine_env(mock_genai):
+    with patch.object(AMMEngine, '_embed_content', side_effect=hashed_embedding):
+        yield
+
+def make_design(num_sources, **index_settings):
+    return AMMDesign(
+        design_id="vector_index_design",
+        name="VectorIndexDesign",
+        knowledge_sources=[
+            KnowledgeSourceConfig(id=f"ks{i}", name=f"Source {i}", type=KnowledgeSourceType.TEXT, content=f"knowledge item {i}")
+            for i in range(num_sources)
+        ],
+        adaptive_memory=AdaptiveMemoryConfig(enabled=False),
+        vector_index=VectorIndexConfig(**index_settings)
+    )
+
+@pytest.mark.parametrize("row_count, dimension, expected", [
+    (50_000, 768, {"index_type": "IVF_HNSW_SQ", "num_partitions": 1}),
+    (4_000_000, 768, {"index_type": "IVF_PQ", "num_partitions": 2000, "num_sub_vectors": 48}),
+    (2_000_000, 100, {"index_type": "IVF_PQ", "num_partitions": 1414, "num_sub_vectors": 25}),
+])
+def test_select_vector_index_params(engine_env, tmp_path, row_count, dimension, expected):
+    engine = AMMEngine(design=make_design(0), base_data_path=str(tmp_path))
+    assert engine._select_vector_index_params(row_count, dimension) == expected
+
+def test_explicit_index_type_and_partitions(engine_env, tmp_path):
+    design = make_design(0, index_type=VectorIndexType.IVF_PQ, num_partitions=64, num_sub_vectors=32)
+    engine = AMMEngine(design=design, base_data_path=str(tmp_path))
+    assert engine._select_vector_index_params(20_000, 768) == {"index_type": "IVF_PQ", "num_partitions": 64, "num_sub_vectors": 32}
+
+def test_no_index_below_threshold(engine_env, tmp_path):
+    engine = AMMEngine(design=make_design(5), base_data_path=str(tmp_path))
+    assert engine.lancedb_table.count_rows() == 5
+    assert engine.vector_index_type is None
+    assert engine.lancedb_table.list_indices() == []
+
+def test_index_built_above_threshold_and_used_for_search(engine_env, tmp_path):
+    engine = AMMEngine(design=make_design(300, min_rows_for_index=256, nprobes=4, refine_factor=2), base_data_path=str(tmp_path))
+
+    assert engine.vector_index_type == "IVF_HNSW_SQ"
+    assert len(engine.lancedb_table.list_indices()) == 1
+
+    results = engine._retrieve_fixed_knowledge("knowledge item 42", limit=1)
+    assert results[0]["text"] == "knowledge item 42"
+
+    # A restart with unchanged sources reuses the index instead of rebuilding it
+    with patch('lancedb.table.LanceTable.create_index') as mock_create_index:
+        restarted = AMMEngine(design=make_design(300, min_rows_for_index=256), base_data_path=str(tmp_path))
+    mock_create_index.assert_not_called()
+    assert restarted.vector_index_type is not None
+
+def test_index_disabled(engine_env, tmp_path):
+    engine = AMMEngine(design=make_design(300, enabled=False, min_rows_for_index=256), base_data_path=str(tmp_path))
+    assert engine.vector_index_type is None
+    assert engine.lancedb_table.list_indices() == []
+
+def test_index_config_objects():
+    assert isinstance(AMMEngine._build_vector_index_config({"index_type": "IVF_PQ", "num_partitions": 64, "num_sub_vectors": 32}), IvfPq)
+    config = AMMEngine._build_vector_index_config({"index_type": "IVF_HNSW_SQ", "num_partitions": 1})
+    assert isinstance(config, HnswSq) and config.num_partitions == 1
+
+def test_small_change_updates_index_and_large_change_rebuilds(engine_env, tmp_path):
+    AMMEngine(design=make_design(300, min_rows_for_index=256), base_data_path=str(tmp_path))
+
+    with patch('lancedb.table.LanceTable.create_index') as mock_create_index, \
+         patch('lancedb.table.LanceTable.optimize') as mock_optimize:
+        engine = AMMEngine(design=make_design(310, min_rows_for_index=256), base_data_path=str(tmp_path))
+    mock_create_index.assert_not_called()
+    mock_optimize.assert_called_once()
+    assert engine.vector_index_type is not None
+
+    with patch('lancedb.table.LanceTable.create_index') as mock_create_index, \
+         patch('lancedb.table.LanceTable.optimize') as mock_optimize:
+        AMMEngine(design=make_design(400, min_rows_for_index=256), base_data_path=str(tmp_path))
+    mock_create_index.assert_called_once()
+    mock_optimize.assert_not_called()
+
+def test_optimized_index_covers_new_rows(engine_env, tmp_path):
+    AMMEngine(design=make_design(300, min_rows_for_index=256), base_data_path=str(tmp_path))
+    engine = AMMEngine(design=make_design(310, min_rows_for_index=256), base_data_path=str(tmp_path))
+
+    index_name = engine.lancedb_table.list_indices()[0].name
+    assert engine.lancedb_table.index_stats(index_name).num_unindexed_rows == 0
+    assert engine._retrieve_fixed_knowledge("knowledge item 305", limit=1)[0]["text"] == "knowledge item 305"
@@ -25,12 +25,9 @@ fi
 
 echo "Upgrading MCP server build: $BUILD_DIR"
 
-# Copy required modules to the build directory
+# Copy the engine and every module it imports to the build directory, importing each other directly
 echo "Copying core modules..."
-cp "$SCRIPT_DIR/amm_project/models/amm_models.py" "$BUILD_DIR/amm_models.py"
-cp "$SCRIPT_DIR/amm_project/models/memory_models.py" "$BUILD_DIR/memory_models.py"
-cp "$SCRIPT_DIR/amm_project/engine/amm_engine.py" "$BUILD_DIR/amm_engine.py"
-cp "$SCRIPT_DIR/amm_project/config/model_config.py" "$BUILD_DIR/model_config.py"
+python -c 'import sys; sys.path.insert(0, sys.argv[1]); from fix_imports import copy_standalone_modules; copy_standalone_modules(sys.argv[1], sys.argv[2])' "$SCRIPT_DIR" "$BUILD_DIR"
 
 # Create the wrapper script
 echo "Creating wrapper script..."